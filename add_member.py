@@ -1,6 +1,8 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
-import sqlite3
+from tkinter import filedialog, messagebox, ttk
+from background import run_in_background
+from member_import import import_members
+from repository import SERVICE_URL, get_repository
 from styles import ModernStyles
 
 class AddMemberWindow(tk.Toplevel):
@@ -142,6 +144,24 @@ class AddMemberWindow(tk.Toplevel):
         )
         save_btn.pack(side="left", padx=5)
         
+        import_btn = tk.Button(
+            button_frame,
+            text="Import File",
+            command=self.import_members,
+            # Imports write the database file, which a thin client of the service does not have
+            state="disabled" if SERVICE_URL else "normal",
+            font=('Segoe UI', 14, 'bold'),
+            bg=ModernStyles.COLORS['accent'],
+            fg=ModernStyles.COLORS['surface'],
+            activebackground=ModernStyles.COLORS['primary'],
+            activeforeground=ModernStyles.COLORS['surface'],
+            bd=0,
+            padx=20,
+            pady=12,
+            cursor="hand2"
+        )
+        import_btn.pack(side="left", padx=5)
+        
         cancel_btn = tk.Button(
             button_frame,
             text="Cancel",
@@ -176,37 +196,45 @@ class AddMemberWindow(tk.Toplevel):
                 messagebox.showerror("Error", "Please fill all fields")
                 return
             
-            conn = sqlite3.connect("gym.db")
-            cur = conn.cursor()
-            # Ensure table exists
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS members (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    age TEXT,
-                    gender TEXT,
-                    phone TEXT,
-                    address TEXT,
-                    membership_type TEXT,
-                    start_date TEXT,
-                    end_date TEXT
-                )
-            """)
-            cur.execute("""
-                INSERT INTO members (name, age, gender, phone, address, membership_type, start_date, end_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, data)
-            conn.commit()
-            member_id = cur.lastrowid
-            conn.close()
-            
-            self.parent.update_stats(self.parent.stats_frame)
-            messagebox.showinfo("Success", f"Member added successfully with ID: {member_id}")
-            self.destroy()
+            run_in_background(
+                self, get_repository().members.add, data,
+                on_success=self.on_member_saved,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to add member: {str(e)}")
+            )
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add member: {str(e)}")
     
+    def on_member_saved(self, member_id):
+        """Refresh the dashboard and close the form (runs on the UI thread)"""
+        self.parent.update_stats(self.parent.stats_frame)
+        messagebox.showinfo("Success", f"Member added successfully with ID: {member_id}")
+        self.destroy()
+    
+    def import_members(self):
+        """Bulk import members from a CSV or JSON file"""
+        path = filedialog.askopenfilename(
+            parent=self,
+            title="Import Members",
+            filetypes=[("Member files", "*.csv *.json *.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        run_in_background(
+            self, import_members, path,
+            on_success=self.on_members_imported,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to import members: {str(e)}")
+        )
+    
+    def on_members_imported(self, result):
+        """Report the import summary (runs on the UI thread)"""
+        self.parent.update_stats(self.parent.stats_frame)
+        message = f"Imported {result.imported} members"
+        if result.rejected:
+            message += f"\n{result.rejected} rows rejected, see {result.error_path}"
+        messagebox.showinfo("Import Complete", message, parent=self)
+    
     def update_stats(self, parent):
         for widget in parent.winfo_children():
             widget.destroy()
@@ -0,0 +1,487 @@
+"""Attendance analytics: peak hours, session lengths and visit frequency.
+
+``refresh`` streams the attendance rows of every completed day that is not
+rolled up yet through one cursor, ``CHUNK_SIZE`` rows at a time, into NumPy
+arrays, and adds them to the rollup tables from ``db.ANALYTICS_TABLES``:
+visits and session minutes per day, visits per day and hour, and visits and
+minutes per member and month. Reports only read the rollups, so a repeat
+report processes just the days added since the previous one.
+
+Headless usage::
+
+    python analytics.py report [--since 2025-01-01] [--until 2025-07-01] [--rebuild] [--db gym.db]
+
+Rows edited after their day was rolled up (e.g. a session closed the next
+morning) are picked up with ``--rebuild``.
+"""
+import argparse
+import sys
+import tkinter as tk
+from datetime import date, timedelta
+from tkinter import messagebox, ttk
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import archive
+from background import run_in_background
+from db import get_database
+from repository import MemberRepository
+from styles import ModernStyles
+
+CHUNK_SIZE = 100_000
+# Pending per-member partial sums are merged once they hold this many entries
+REDUCE_AT = 2_000_000
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+# Visits per member and month: 1, 2-3, 4-7, 8-11, 12-19, 20+
+FREQUENCY_BINS = (1, 2, 4, 8, 12, 20)
+FREQUENCY_LABELS = ("1", "2-3", "4-7", "8-11", "12-19", "20+")
+TOP_MEMBERS = 10
+
+# Timestamps are parsed by SQLite; naive local times become seconds with the calendar date intact
+STREAM_SQL = """
+    SELECT COALESCE(member_id, 0),
+           CAST(strftime('%s', checkin_time) AS INTEGER),
+           CASE WHEN auto_closed THEN -1 ELSE COALESCE(CAST(strftime('%s', checkout_time) AS INTEGER), -1) END
+    FROM {attendance}
+    WHERE checkin_time >= ? AND checkin_time < ?
+"""
+
+SAVE_MEMBERS_SQL = """
+    INSERT INTO attendance_member_monthly (member_id, month, visits, closed, minutes)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (member_id, month) DO UPDATE SET
+        visits = visits + excluded.visits,
+        closed = closed + excluded.closed,
+        minutes = minutes + excluded.minutes
+"""
+
+
+def _group(keys, visits, closed, minutes):
+    """Sum the per-row values of equal keys"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return (
+        unique,
+        np.bincount(inverse, weights=visits, minlength=len(unique)),
+        np.bincount(inverse, weights=closed, minlength=len(unique)),
+        np.bincount(inverse, weights=minutes, minlength=len(unique)),
+    )
+
+
+class Rollup:
+    """Aggregates for a run of consecutive days, filled chunk by chunk"""
+
+    def __init__(self, first_day: date, days: int):
+        self.first = int(np.datetime64(first_day, "D").astype(np.int64))
+        self.days = days
+        self.visits = np.zeros(days, np.int64)
+        self.closed = np.zeros(days, np.int64)
+        self.minutes = np.zeros(days)
+        self.hourly = np.zeros(days * 24, np.int64)
+        self.pending = []
+        self.pending_size = 0
+
+    def add(self, rows):
+        """Add an (n, 3) int64 array of member_id, check-in and check-out seconds (-1 if open)"""
+        member, checkin, checkout = rows.T
+        day = checkin // 86400 - self.first
+        hour = checkin % 86400 // 3600
+        closed = checkout >= checkin
+        minutes = np.where(closed, (checkout - checkin) / 60, 0.0)
+
+        self.visits += np.bincount(day, minlength=self.days)
+        self.closed += np.bincount(day, weights=closed, minlength=self.days).astype(np.int64)
+        self.minutes += np.bincount(day, weights=minutes, minlength=self.days)
+        self.hourly += np.bincount(day * 24 + hour, minlength=self.days * 24)
+
+        month = (day + self.first).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        self.pending.append(_group(member << 16 | month, np.ones(len(rows)), closed, minutes))
+        self.pending_size += len(self.pending[-1][0])
+        if self.pending_size > REDUCE_AT:
+            self._reduce()
+
+    def _reduce(self):
+        if len(self.pending) > 1:
+            self.pending = [_group(*(np.concatenate(parts) for parts in zip(*self.pending)))]
+            self.pending_size = len(self.pending[0][0])
+
+    def save(self, conn):
+        """Write the rollup rows; every day in the run gets a daily row, even without visits"""
+        days = np.datetime_as_string(np.arange(self.first, self.first + self.days).astype("datetime64[D]"))
+        conn.executemany(
+            "INSERT INTO attendance_daily (day, visits, closed, minutes) VALUES (?, ?, ?, ?)",
+            zip(days.tolist(), self.visits.tolist(), self.closed.tolist(), self.minutes.tolist())
+        )
+        busy = np.flatnonzero(self.hourly)
+        conn.executemany(
+            "INSERT INTO attendance_hourly (day, hour, visits) VALUES (?, ?, ?)",
+            zip(days[busy // 24].tolist(), (busy % 24).tolist(), self.hourly[busy].tolist())
+        )
+        self._reduce()
+        if self.pending:
+            keys, visits, closed, minutes = self.pending[0]
+            months = np.datetime_as_string((keys & 0xFFFF).astype("datetime64[M]"))
+            conn.executemany(SAVE_MEMBERS_SQL, zip(
+                (keys >> 16).tolist(), months.tolist(), visits.astype(np.int64).tolist(),
+                closed.astype(np.int64).tolist(), minutes.tolist()
+            ))
+
+
+def refresh(db=None, today: Optional[date] = None, rebuild=False) -> int:
+    """Roll up every completed day after the last rolled-up one; returns the number of days added"""
+    db = db or get_database()
+    today = today or date.today()
+    if rebuild:
+        with db.transaction() as conn:
+            for table in ("attendance_daily", "attendance_hourly", "attendance_member_monthly"):
+                conn.execute(f"DELETE FROM {table}")
+
+    conn = db.connection()
+    last = conn.execute("SELECT MAX(day) FROM attendance_daily").fetchone()[0]
+    if last:
+        first_day = date.fromisoformat(last) + timedelta(days=1)
+    else:
+        sql, _ = archive.union(conn, "SELECT MIN(checkin_time) AS oldest FROM {attendance}")
+        oldest = conn.execute(f"SELECT MIN(oldest) FROM ({sql})").fetchone()[0]
+        if oldest is None:
+            return 0
+        first_day = date.fromisoformat(oldest[:10])
+    if first_day >= today:
+        return 0
+
+    # One statement is one read snapshot; the write lock is only taken to save the result.
+    # A rebuild reaches back into the archived years.
+    rollup = Rollup(first_day, (today - first_day).days)
+    cur = conn.execute(*archive.union(
+        conn, STREAM_SQL, (first_day.isoformat(), today.isoformat()), first_day.isoformat(), today.isoformat()
+    ))
+    while True:
+        rows = cur.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        rollup.add(np.array(rows, dtype=np.int64))
+
+    with db.transaction() as conn:
+        # Another refresh may have saved these days while we were reading
+        if conn.execute("SELECT MAX(day) FROM attendance_daily").fetchone()[0] != last:
+            return 0
+        rollup.save(conn)
+    return rollup.days
+
+
+class AttendanceReport(NamedTuple):
+    days: int
+    visits: int
+    heatmap: np.ndarray          # visits by weekday (Monday first) x hour of day
+    weekday_minutes: np.ndarray  # average closed-session minutes per weekday, nan without sessions
+    frequency: np.ndarray        # member-months per FREQUENCY_BINS bucket
+    member_minutes: np.ndarray   # 25th, 50th, 75th and 90th percentile of per-member average minutes
+    top_members: List[Tuple[int, str, int, float]]  # (member_id, name, visits, average minutes)
+
+
+def _day_numbers(column):
+    """SQL for a YYYY-MM-DD column as days since 1970-01-01"""
+    return f"CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+
+
+def _range(start, end, column="day"):
+    where, params = [], []
+    if start:
+        where.append(f"{column} >= ?")
+        params.append(start)
+    if end:
+        where.append(f"{column} < ?")
+        params.append(end)
+    return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+def _array(rows, columns):
+    return np.array(rows, dtype=np.float64).reshape(-1, columns)
+
+
+def build_report(db=None, start: Optional[str] = None, end: Optional[str] = None,
+                 top=TOP_MEMBERS, refresh_first=True) -> AttendanceReport:
+    """Report over the days in [start, end) (YYYY-MM-DD, open-ended when None).
+
+    Member statistics (frequency, session lengths, top members) cover the
+    whole months the range touches.
+    """
+    db = db or get_database()
+    if refresh_first:
+        refresh(db)
+    conn = db.connection()
+
+    where, params = _range(start, end)
+    daily = _array(conn.execute(
+        f"SELECT {_day_numbers('day')}, visits, closed, minutes FROM attendance_daily {where}", params
+    ).fetchall(), 4)
+    weekday = (daily[:, 0].astype(np.int64) + EPOCH_WEEKDAY) % 7
+    closed = np.bincount(weekday, weights=daily[:, 2], minlength=7)
+    minutes = np.bincount(weekday, weights=daily[:, 3], minlength=7)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weekday_minutes = np.where(closed > 0, minutes / closed, np.nan)
+
+    hourly = _array(conn.execute(
+        f"SELECT {_day_numbers('day')}, hour, visits FROM attendance_hourly {where}", params
+    ).fetchall(), 3)
+    cells = ((hourly[:, 0].astype(np.int64) + EPOCH_WEEKDAY) % 7) * 24 + hourly[:, 1].astype(np.int64)
+    heatmap = np.bincount(cells, weights=hourly[:, 2], minlength=7 * 24).reshape(7, 24).astype(np.int64)
+
+    month_where, month_params = _range(start and start[:7], end and _month_after(end), "month")
+    member_months = _array(conn.execute(
+        f"SELECT member_id, visits, closed, minutes FROM attendance_member_monthly {month_where}", month_params
+    ).fetchall(), 4)
+    frequency = np.bincount(np.searchsorted(FREQUENCY_BINS, member_months[:, 1], side="right") - 1,
+                            minlength=len(FREQUENCY_BINS))
+
+    members = np.column_stack(_group(*member_months.T))
+    timed = members[members[:, 2] > 0]
+    averages = timed[:, 3] / timed[:, 2]
+    member_minutes = np.percentile(averages, [25, 50, 75, 90]) if len(averages) else np.full(4, np.nan)
+
+    top_rows = members[np.argsort(-members[:, 1], kind="stable")[:top]]
+    names = MemberRepository(db).get_profiles(top_rows[:, 0].astype(np.int64).tolist())
+    top_members = [
+        (int(member_id), names.get(int(member_id), ("Unknown",))[0], int(count),
+         float(total / sessions) if sessions else float("nan"))
+        for member_id, count, sessions, total in top_rows
+    ]
+
+    return AttendanceReport(
+        days=len(daily), visits=int(daily[:, 1].sum()), heatmap=heatmap, weekday_minutes=weekday_minutes,
+        frequency=frequency, member_minutes=member_minutes, top_members=top_members,
+    )
+
+
+def _month_after(day):
+    """Exclusive month bound covering the month of an exclusive day bound"""
+    moment = np.datetime64(day, "D") - 1
+    return str(moment.astype("datetime64[M]") + 1)
+
+
+def format_report(report: AttendanceReport) -> str:
+    """Plain-text rendering used by the report command"""
+    shades = " .:-=+*#%@"
+    peak = report.heatmap.max() or 1
+    lines = [f"{report.visits} visits over {report.days} days", "", "Peak hours (visits by weekday and hour)"]
+    lines.append("     " + "".join(f"{hour:<3}" for hour in range(0, 24, 3)).rstrip())
+    for name, row in zip(WEEKDAYS, report.heatmap):
+        lines.append(f"{name}  " + "".join(shades[int(v * (len(shades) - 1) / peak)] for v in row))
+    busiest = np.unravel_index(report.heatmap.argmax(), report.heatmap.shape)
+    lines.append(f"Busiest: {WEEKDAYS[busiest[0]]} {busiest[1]:02d}:00 ({report.heatmap[busiest]} visits)")
+
+    lines += ["", "Average session length by weekday (minutes)"]
+    lines.append("  ".join(f"{name} {minutes:.0f}" if not np.isnan(minutes) else f"{name} -"
+                           for name, minutes in zip(WEEKDAYS, report.weekday_minutes)))
+
+    lines += ["", "Visits per member per month (member-months)"]
+    for label, count in zip(FREQUENCY_LABELS, report.frequency):
+        lines.append(f"{label:>6}  {count}")
+
+    lines += ["", "Average session length per member (minutes): "
+              + ", ".join(f"p{p} {v:.0f}" for p, v in zip((25, 50, 75, 90), report.member_minutes))]
+    lines += ["", "Most frequent members"]
+    for member_id, name, visits, minutes in report.top_members:
+        lines.append(f"{member_id:>8}  {name:<24} {visits:>6} visits  {minutes:>5.0f} min avg")
+    return "\n".join(lines)
+
+
+def _blend(color, weight):
+    """Mix the surface color towards color by weight (0..1)"""
+    base = ModernStyles.COLORS['surface']
+    channels = [
+        round(int(base[i:i + 2], 16) + (int(color[i:i + 2], 16) - int(base[i:i + 2], 16)) * weight)
+        for i in (1, 3, 5)
+    ]
+    return "#" + "".join(f"{c:02x}" for c in channels)
+
+
+PERIODS = {
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "Last 365 days": 365,
+    "All time": None,
+}
+
+
+class AnalyticsWindow(tk.Toplevel):
+    CELL = 26
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Attendance Analytics")
+        self.geometry("900x700")
+        self.configure(bg=ModernStyles.COLORS['background'])
+
+        # Configure modern styles
+        ModernStyles.configure_styles()
+
+        self.create_widgets()
+        self.load_report()
+
+    def create_widgets(self):
+        """Create period selector, heatmap and summary panels"""
+        # Header
+        header = tk.Frame(self, bg=ModernStyles.COLORS['primary'])
+        header.pack(fill="x")
+
+        title = tk.Label(
+            header,
+            text="Attendance Analytics",
+            font=('Segoe UI', 24, 'bold'),
+            bg=ModernStyles.COLORS['primary'],
+            fg=ModernStyles.COLORS['surface']
+        )
+        title.pack(pady=20)
+
+        # Period selector
+        controls = tk.Frame(self, bg=ModernStyles.COLORS['surface'])
+        controls.pack(fill="x", padx=20, pady=(20, 10))
+
+        tk.Label(
+            controls,
+            text="Period:",
+            font=('Segoe UI', 12),
+            bg=ModernStyles.COLORS['surface'],
+            fg=ModernStyles.COLORS['text_primary']
+        ).pack(side="left", padx=10, pady=10)
+
+        self.period = ttk.Combobox(controls, values=list(PERIODS), state="readonly", width=15)
+        self.period.set("Last 90 days")
+        self.period.pack(side="left", padx=10)
+        self.period.bind("<<ComboboxSelected>>", lambda e: self.load_report())
+
+        refresh_btn = tk.Button(
+            controls,
+            text="🔄 Refresh",
+            command=self.load_report,
+            font=('Segoe UI', 12, 'bold'),
+            bg=ModernStyles.COLORS['accent'],
+            fg=ModernStyles.COLORS['surface'],
+            activebackground=ModernStyles.COLORS['primary'],
+            activeforeground=ModernStyles.COLORS['surface'],
+            bd=0,
+            padx=20,
+            pady=8,
+            cursor="hand2"
+        )
+        refresh_btn.pack(side="left", padx=10)
+
+        self.summary = tk.Label(
+            controls,
+            text="Loading...",
+            font=('Segoe UI', 12),
+            bg=ModernStyles.COLORS['surface'],
+            fg=ModernStyles.COLORS['text_secondary']
+        )
+        self.summary.pack(side="right", padx=10)
+
+        # Peak hours heatmap
+        self.heatmap = tk.Canvas(
+            self,
+            height=self.CELL * 8 + 10,
+            bg=ModernStyles.COLORS['surface'],
+            highlightthickness=0
+        )
+        self.heatmap.pack(fill="x", padx=20, pady=10)
+
+        # Weekday session lengths, visit frequency and top members
+        details = tk.Frame(self, bg=ModernStyles.COLORS['background'])
+        details.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+
+        self.weekday_label = self.create_panel(details, "Avg Session (min)", 0)
+        self.frequency_label = self.create_panel(details, "Visits per Member-Month", 1)
+        self.top_label = self.create_panel(details, "Most Frequent Members", 2)
+
+    def create_panel(self, parent, title, column):
+        panel = tk.Frame(parent, bg=ModernStyles.COLORS['surface'], relief="raised", bd=1)
+        panel.grid(row=0, column=column, sticky="nsew", padx=5)
+        parent.grid_columnconfigure(column, weight=1)
+
+        tk.Label(
+            panel,
+            text=title,
+            font=('Segoe UI', 12, 'bold'),
+            bg=ModernStyles.COLORS['surface'],
+            fg=ModernStyles.COLORS['primary']
+        ).pack(pady=(10, 5))
+
+        label = tk.Label(
+            panel,
+            text="",
+            font=('Consolas', 10),
+            justify="left",
+            bg=ModernStyles.COLORS['surface'],
+            fg=ModernStyles.COLORS['text_primary']
+        )
+        label.pack(padx=10, pady=(0, 10), anchor="w")
+        return label
+
+    def load_report(self):
+        """Refresh the rollups and build the report off the UI thread"""
+        days = PERIODS[self.period.get()]
+        start = (date.today() - timedelta(days=days)).isoformat() if days else None
+        self.summary.config(text="Loading...")
+        run_in_background(
+            self, build_report, None, start,
+            on_success=self.show_report,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to build report: {str(e)}", parent=self)
+        )
+
+    def show_report(self, report):
+        self.summary.config(text=f"{report.visits} visits over {report.days} days")
+        self.draw_heatmap(report.heatmap)
+
+        self.weekday_label.config(text="\n".join(
+            f"{name}  {'-' if np.isnan(minutes) else f'{minutes:.0f}'}"
+            for name, minutes in zip(WEEKDAYS, report.weekday_minutes)
+        ))
+        self.frequency_label.config(text="\n".join(
+            f"{label:>6}  {count}" for label, count in zip(FREQUENCY_LABELS, report.frequency)
+        ))
+        self.top_label.config(text="\n".join(
+            f"{name[:18]:<18} {visits:>5}" for _, name, visits, _ in report.top_members
+        ) or "No visits")
+
+    def draw_heatmap(self, heatmap):
+        """Draw visits by weekday and hour as shaded cells"""
+        canvas = self.heatmap
+        canvas.delete("all")
+        cell, left = self.CELL, 40
+        peak = heatmap.max() or 1
+        for hour in range(0, 24, 3):
+            canvas.create_text(left + hour * cell + cell / 2, 10, text=f"{hour:02d}",
+                               fill=ModernStyles.COLORS['text_secondary'], font=('Segoe UI', 9))
+        for day, name in enumerate(WEEKDAYS):
+            y = 20 + day * cell
+            canvas.create_text(20, y + cell / 2, text=name,
+                               fill=ModernStyles.COLORS['text_secondary'], font=('Segoe UI', 9))
+            for hour in range(24):
+                visits = int(heatmap[day, hour])
+                canvas.create_rectangle(
+                    left + hour * cell, y, left + (hour + 1) * cell - 2, y + cell - 2,
+                    fill=_blend(ModernStyles.COLORS['accent'], visits / peak), outline=""
+                )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attendance analytics report")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--since", help="first day (YYYY-MM-DD) to include")
+    parser.add_argument("--until", help="first day (YYYY-MM-DD) to leave out")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollups from scratch")
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    args = parser.parse_args(argv)
+
+    db = get_database(args.db)
+    added = refresh(db, rebuild=args.rebuild)
+    print(f"Rolled up {added} new days")
+    print(format_report(build_report(db, args.since, args.until, refresh_first=False)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""Move old attendance history out of gym.db into per-year archive files.
+
+The desks only ever look at today's sessions, but ``attendance`` keeps every
+visit since the gym opened. ``archive`` moves closed sessions that checked in
+before a horizon (``HORIZON_DAYS`` ago by default) into
+``<db name>-attendance-<year>.db`` next to the database, in batches of
+``BATCH_SIZE`` so the desks are never locked out for long. SQLite commits
+the main and attached WAL databases one after the other, with the main
+database first, so one transaction could lose a batch in a crash between the
+two commits. Each batch is therefore copied and committed to the archive
+first, then deleted from the hot table and counted in a second transaction.
+A crash in between leaves the batch in both files. The next run finishes the
+move: the copy is INSERT OR IGNORE, and ``sessions`` counts the rows
+deleted, so each session is counted once. Open sessions are never archived.
+
+Queries that may reach into the past build their SQL with ``union``: it
+ATTACHes the archives whose years overlap the requested range and joins
+them to ``main.attendance`` with UNION ALL. Ranges inside the horizon
+touch only the hot table.
+
+Headless usage::
+
+    python archive.py run [--days 365] [--vacuum] [--db gym.db]
+    python archive.py status [--db gym.db]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from db import get_database
+
+HORIZON_DAYS = 365
+BATCH_SIZE = 20_000
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.attendance (
+        id INTEGER PRIMARY KEY,
+        member_id INTEGER,
+        checkin_time TEXT,
+        checkout_time TEXT,
+        auto_closed INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_attendance_checkin ON attendance (checkin_time, checkout_time)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_attendance_member ON attendance (member_id, checkin_time)",
+]
+
+MOVE_SQL = """
+    INSERT OR IGNORE INTO {schema}.attendance (id, member_id, checkin_time, checkout_time, auto_closed)
+    SELECT id, member_id, checkin_time, checkout_time, auto_closed FROM main.attendance
+    WHERE id IN (SELECT value FROM json_each(?))
+"""
+
+# Only rows the archive holds leave the hot table
+REMOVE_SQL = """
+    DELETE FROM main.attendance
+    WHERE id IN (SELECT value FROM json_each(?)) AND id IN (SELECT id FROM {schema}.attendance)
+"""
+
+
+def schema_name(year) -> str:
+    return f"archive_{year}"
+
+
+def _database_dir(conn):
+    path = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    return os.path.dirname(path)
+
+
+def _attached(conn):
+    return {row[1] for row in conn.execute("PRAGMA database_list")}
+
+
+def archive_path(db_path, year) -> str:
+    """Archive file for one year, next to the database"""
+    return f"{os.path.splitext(db_path)[0]}-attendance-{year}.db"
+
+
+def attach(conn, year, path) -> str:
+    """ATTACH the archive for year on conn unless it already is; returns its schema name"""
+    schema = schema_name(year)
+    if schema not in _attached(conn):
+        conn.execute("ATTACH DATABASE ? AS " + schema, (os.path.join(_database_dir(conn), path),))
+        # Archives written before sessions could be auto-closed lack the flag
+        columns = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(attendance)")}
+        if columns and "auto_closed" not in columns:
+            conn.execute(f"ALTER TABLE {schema}.attendance ADD COLUMN auto_closed INTEGER NOT NULL DEFAULT 0")
+    return schema
+
+
+def archives(conn) -> Dict[int, tuple]:
+    """{year: (path, sessions, archived_before)} for every archive file"""
+    return {
+        row[0]: tuple(row[1:])
+        for row in conn.execute("SELECT year, path, sessions, archived_before FROM attendance_archives ORDER BY year")
+    }
+
+
+def sources(conn, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+    """Attendance tables that can hold sessions checked in during [start, end), oldest archive first"""
+    tables = []
+    for year, (path, _, _) in archives(conn).items():
+        if (end is None or f"{year}-01-01" < end) and (start is None or start < f"{year + 1}-01-01"):
+            tables.append(f"{attach(conn, year, path)}.attendance")
+    tables.append("main.attendance")
+    return tables
+
+
+def union(conn, select, params=(), start=None, end=None):
+    """Expand select, which names its table ``{attendance}``, over every table holding [start, end).
+
+    Returns (sql, params); the SELECT's parameters are repeated for each arm.
+    Append an ORDER BY on result columns to merge the arms in order.
+    """
+    tables = sources(conn, start, end)
+    return (
+        "\nUNION ALL\n".join(select.format(attendance=table) for table in tables),
+        list(params) * len(tables),
+    )
+
+
+def _create_archive(conn, year, path):
+    schema = attach(conn, year, path)
+    conn.execute(f"PRAGMA {schema}.journal_mode = WAL")
+    for statement in ARCHIVE_SCHEMA:
+        conn.execute(statement.format(schema=schema))
+    return schema
+
+
+def archive(db=None, horizon_days=HORIZON_DAYS, today: Optional[date] = None,
+            batch_size=BATCH_SIZE, progress=None) -> Dict[int, int]:
+    """Move closed sessions older than horizon_days into per-year archives; returns {year: sessions moved}.
+
+    progress(year, moved) is called after every batch.
+    """
+    db = db or get_database()
+    cutoff = ((today or date.today()) - timedelta(days=horizon_days)).isoformat()
+    conn = db.connection()
+    oldest = conn.execute(
+        "SELECT MIN(checkin_time) FROM attendance WHERE checkin_time < ? AND checkout_time IS NOT NULL", (cutoff,)
+    ).fetchone()[0]
+    if oldest is None:
+        return {}
+
+    moved = {}
+    for year in range(int(oldest[:4]), int(cutoff[:4]) + 1):
+        start, end = f"{year}-01-01", min(f"{year + 1}-01-01", cutoff)
+        if conn.execute(
+            "SELECT 1 FROM attendance WHERE checkin_time >= ? AND checkin_time < ? AND checkout_time IS NOT NULL",
+            (start, end)
+        ).fetchone() is None:
+            continue
+        existing = archives(conn).get(year)
+        path = existing[0] if existing else os.path.basename(archive_path(db.path, year))
+        # ATTACH is not allowed inside a transaction
+        schema = _create_archive(conn, year, path)
+        moved[year] = 0
+        while True:
+            with db.transaction() as conn:
+                ids = [row[0] for row in conn.execute("""
+                    SELECT id FROM attendance
+                    WHERE checkin_time >= ? AND checkin_time < ? AND checkout_time IS NOT NULL
+                    LIMIT ?
+                """, (start, end, batch_size))]
+                if not ids:
+                    break
+                batch = json.dumps(ids)
+                conn.execute(MOVE_SQL.format(schema=schema), (batch,))
+            with db.transaction() as conn:
+                removed = conn.execute(REMOVE_SQL.format(schema=schema), (batch,)).rowcount
+                conn.execute("""
+                    INSERT INTO attendance_archives (year, path, sessions, archived_before) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (year) DO UPDATE SET
+                        sessions = sessions + excluded.sessions,
+                        archived_before = max(archived_before, excluded.archived_before)
+                """, (year, path, removed, end))
+            moved[year] += removed
+            if progress is not None:
+                progress(year, moved[year])
+            if len(ids) < batch_size:
+                break
+    return moved
+
+
+def status(db=None) -> dict:
+    """Hot-table size and the sessions held by each archive"""
+    db = db or get_database()
+    conn = db.connection()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return {
+        "hot_sessions": conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0],
+        "oldest_hot": conn.execute("SELECT MIN(checkin_time) FROM attendance").fetchone()[0],
+        "file_mb": conn.execute("PRAGMA page_count").fetchone()[0] * page_size / 2 ** 20,
+        "free_mb": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size / 2 ** 20,
+        "archives": archives(conn),
+    }
+
+
+def vacuum(db=None):
+    """Give the pages freed by archiving back to the file system"""
+    db = db or get_database()
+    try:
+        db.connection().execute("VACUUM")
+    except sqlite3.OperationalError as e:
+        raise RuntimeError(f"VACUUM failed, retry when the desks are idle: {e}") from e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old attendance sessions into per-year files")
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument("--days", type=int, default=HORIZON_DAYS, help="keep sessions newer than this in gym.db")
+    parser.add_argument("--vacuum", action="store_true", help="shrink gym.db after archiving")
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    args = parser.parse_args(argv)
+
+    db = get_database(args.db)
+    if args.command == "run":
+        moved = archive(db, args.days, progress=lambda year, count: print(f"\r{year}: {count} sessions", end=""))
+        print()
+        for year, count in moved.items():
+            print(f"Archived {count} sessions from {year}")
+        if args.vacuum:
+            vacuum(db)
+
+    info = status(db)
+    print(f"Hot table: {info['hot_sessions']} sessions since {info['oldest_hot']}, "
+          f"{info['file_mb']:.1f} MB ({info['free_mb']:.1f} MB free)")
+    for year, (path, sessions, archived_before) in info["archives"].items():
+        print(f"{year}: {sessions} sessions before {archived_before} in {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
-from datetime import datetime
-import sqlite3
+from tkinter import filedialog, messagebox, ttk
+from background import run_in_background
+from export import export
+from live_table import ROW_LIMIT, LiveTable
+from repository import ALREADY_CHECKED_IN, NO_OPEN_SESSION, NOT_FOUND, SERVICE_URL, get_repository
 from styles import ModernStyles
 
 class AttendanceWindow(tk.Toplevel):
@@ -88,6 +90,24 @@ class AttendanceWindow(tk.Toplevel):
         )
         checkout_btn.pack(side="left", padx=10)
         
+        export_btn = tk.Button(
+            input_frame,
+            text="📤 Export",
+            command=self.export_attendance,
+            # Exports read the database file, which a thin client of the service does not have
+            state="disabled" if SERVICE_URL else "normal",
+            font=('Segoe UI', 12, 'bold'),
+            bg=ModernStyles.COLORS['primary'],
+            fg=ModernStyles.COLORS['surface'],
+            activebackground=ModernStyles.COLORS['primary'],
+            activeforeground=ModernStyles.COLORS['surface'],
+            bd=0,
+            padx=20,
+            pady=8,
+            cursor="hand2"
+        )
+        export_btn.pack(side="left", padx=10)
+        
         # Attendance table
         table_frame = tk.Frame(self, bg=ModernStyles.COLORS['surface'])
         table_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -131,45 +151,22 @@ class AttendanceWindow(tk.Toplevel):
             messagebox.showerror("Error", "Please enter Member ID")
             return
         
-        try:
-            # Check if member exists
-            conn = sqlite3.connect("gym.db")
-            cur = conn.cursor()
-            
-            # Verify member exists
-            cur.execute("SELECT name FROM members WHERE id=?", (member_id,))
-            member = cur.fetchone()
-            
-            if not member:
-                messagebox.showerror("Error", "Member not found")
-                conn.close()
-                return
-            
-            # Check if already checked in today
-            today = datetime.now().strftime("%Y-%m-%d")
-            cur.execute("""
-                SELECT id FROM attendance 
-                WHERE member_id=? AND date(checkin_time)=? AND checkout_time IS NULL
-            """, (member_id, today))
-            
-            if cur.fetchone():
-                messagebox.showwarning("Warning", "Member already checked in today")
-                conn.close()
-                return
-            
-            # Record check-in
-            cur.execute(
-                "INSERT INTO attendance (member_id, checkin_time) VALUES (?, ?)",
-                (member_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            )
-            conn.commit()
-            conn.close()
-            
-            messagebox.showinfo("Success", f"Check-in recorded for {member[0]}")
-            self.load_attendance()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to record check-in: {str(e)}")
+        run_in_background(
+            self, get_repository().check_in_member, member_id,
+            on_success=self.on_checked_in,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to record check-in: {str(e)}")
+        )
+    
+    def on_checked_in(self, result):
+        """Report the check-in outcome (runs on the UI thread)"""
+        status, name = result
+        if status == NOT_FOUND:
+            messagebox.showerror("Error", "Member not found")
+        elif status == ALREADY_CHECKED_IN:
+            messagebox.showwarning("Warning", "Member already checked in today")
+        else:
+            messagebox.showinfo("Success", f"Check-in recorded for {name}")
+            self.live.refresh()
     
     def check_out(self):
         """Record check-out"""
@@ -178,64 +175,54 @@ class AttendanceWindow(tk.Toplevel):
             messagebox.showerror("Error", "Please enter Member ID")
             return
         
-        try:
-            conn = sqlite3.connect("gym.db")
-            cur = conn.cursor()
-            
-            # Find open check-in
-            today = datetime.now().strftime("%Y-%m-%d")
-            cur.execute("""
-                SELECT id FROM attendance 
-                WHERE member_id=? AND date(checkin_time)=? AND checkout_time IS NULL
-            """, (member_id, today))
-            
-            attendance_record = cur.fetchone()
-            
-            if not attendance_record:
-                messagebox.showwarning("Warning", "No open check-in found for today")
-                conn.close()
-                return
-            
-            # Record check-out
-            cur.execute(
-                "UPDATE attendance SET checkout_time=? WHERE id=?",
-                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), attendance_record[0])
-            )
-            conn.commit()
-            conn.close()
-            
+        run_in_background(
+            self, get_repository().check_out_member, member_id,
+            on_success=self.on_checked_out,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to record check-out: {str(e)}")
+        )
+    
+    def on_checked_out(self, status):
+        """Report the check-out outcome (runs on the UI thread)"""
+        if status == NO_OPEN_SESSION:
+            messagebox.showwarning("Warning", "No open check-in found for today")
+        else:
             messagebox.showinfo("Success", "Check-out recorded successfully")
-            self.load_attendance()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to record check-out: {str(e)}")
+            self.live.refresh()
+    
+    def export_attendance(self):
+        """Stream every attendance record to a CSV, JSON Lines or Excel file"""
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title="Export Attendance",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Compressed CSV", "*.csv.gz"), ("JSON Lines", "*.jsonl"), ("Excel", "*.xlsx")]
+        )
+        if not path:
+            return
+        
+        run_in_background(
+            self, export, "attendance", path,
+            on_success=lambda result: messagebox.showinfo(
+                "Export Complete", f"Exported {result.rows} rows to {result.path}", parent=self
+            ),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to export attendance: {str(e)}")
+        )
     
     def load_attendance(self):
-        """Load attendance records"""
-        try:
-            conn = sqlite3.connect("gym.db")
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT a.id, a.member_id, m.name, a.checkin_time, a.checkout_time,
-                       CASE 
-                           WHEN a.checkout_time IS NULL THEN 'Active'
-                           ELSE CAST((julianday(a.checkout_time) - julianday(a.checkin_time)) * 24 * 60 AS INTEGER) || ' min'
-                       END as duration
-                FROM attendance a
-                JOIN members m ON a.member_id = m.id
-                ORDER BY a.checkin_time DESC
-                LIMIT 100
-            """)
-            rows = cur.fetchall()
-            conn.close()
-            
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Add new items
-            for row in rows:
-                self.tree.insert("", "end", values=row)
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load attendance: {str(e)}")
+        """Load the latest sessions, then follow new check-ins and check-outs"""
+        repo = get_repository()
+        self.live = LiveTable(
+            self, self.tree,
+            load=lambda: repo.attendance.recent(ROW_LIMIT),
+            changes=lambda after, open_ids: repo.attendance.changes(after, open_ids, ROW_LIMIT),
+            version=repo.data_version,
+            # Sessions without a check-out time are the rows that can still change
+            is_pending=lambda row: row[4] is None,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load attendance: {str(e)}")
+        )
+        self.live.reload()
+        self.live.start_polling()
+    
+    def destroy(self):
+        self.live.stop_polling()
+        super().destroy()
@@ -0,0 +1,201 @@
+"""Worker threads for database and PDF jobs so the Tk mainloop never blocks.
+
+Windows hand slow work to ``run_in_background``. The job runs on a worker
+thread, and its result or exception is delivered back on the Tk thread
+through a queue that is polled with ``after()``. Jobs belong to an owner
+window. The owner shows a busy cursor while it has jobs pending (except
+``quiet`` ones, such as periodic polls), and its jobs are cancelled when it
+is destroyed.
+
+``UIStallMonitor`` measures how late the Tk thread services a periodic
+heartbeat, so we can check that callbacks stay within a frame (16 ms).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+WORKER_COUNT = 2
+POLL_INTERVAL_MS = 10
+HEARTBEAT_MS = 50
+FRAME_BUDGET_MS = 16
+
+
+class UIStallMonitor:
+    """Tracks how long the UI thread was unavailable between heartbeats"""
+
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, clock=time.perf_counter):
+        self.budget_ms = budget_ms
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = 0
+            self.total_stall_ms = 0.0
+            self.max_stall_ms = 0.0
+            self.over_budget = 0
+
+    def record(self, stall_ms):
+        with self.lock:
+            self.samples += 1
+            self.total_stall_ms += stall_ms
+            self.max_stall_ms = max(self.max_stall_ms, stall_ms)
+            if stall_ms > self.budget_ms:
+                self.over_budget += 1
+
+    def start(self, root, interval_ms=HEARTBEAT_MS):
+        """Schedule a heartbeat on root and record how late each one fires"""
+        def beat(expected):
+            now = self.clock()
+            self.record(max(0.0, (now - expected) * 1000))
+            root.after(interval_ms, beat, self.clock() + interval_ms / 1000)
+
+        root.after(interval_ms, beat, self.clock() + interval_ms / 1000)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "samples": self.samples,
+                "total_stall_ms": round(self.total_stall_ms, 3),
+                "max_stall_ms": round(self.max_stall_ms, 3),
+                "over_budget": self.over_budget,
+                "budget_ms": self.budget_ms,
+            }
+
+
+class Task:
+    """Handle for a submitted job"""
+
+    def __init__(self, owner, on_success, on_error, quiet=False):
+        self.owner = owner
+        self.on_success = on_success
+        self.on_error = on_error
+        self.quiet = quiet
+        self.future = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class BackgroundExecutor:
+    """Thread pool whose results are delivered on the Tk thread"""
+
+    def __init__(self, workers=WORKER_COUNT, monitor=None):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gym-worker")
+        self.results = queue.Queue()
+        self.pending = {}
+        self.monitor = monitor or UIStallMonitor()
+        self.root = None
+        self._watched = set()
+
+    def attach(self, root, poll_ms=POLL_INTERVAL_MS):
+        """Start delivering results on root's event loop"""
+        if self.root is not None:
+            return
+        self.root = root
+
+        def poll():
+            root.after(poll_ms, poll)
+            self.drain()
+
+        root.after(poll_ms, poll)
+        self.monitor.start(root)
+
+    def submit(self, func, *args, owner=None, on_success=None, on_error=None, quiet=False):
+        """Run func(*args) on a worker; call on_success(result) or on_error(exc) on the Tk thread"""
+        task = Task(owner, on_success, on_error, quiet)
+        if owner is not None:
+            self._track(owner, task)
+        task.future = self.pool.submit(func, *args)
+        task.future.add_done_callback(lambda future: self.results.put((task, future)))
+        return task
+
+    def drain(self):
+        """Run the callbacks of finished jobs; must be called on the Tk thread"""
+        while True:
+            try:
+                task, future = self.results.get_nowait()
+            except queue.Empty:
+                return
+            self._untrack(task)
+            if task.cancelled:
+                continue
+            try:
+                result = future.result()
+            except CancelledError:
+                continue
+            except Exception as e:
+                if task.on_error is not None:
+                    task.on_error(e)
+                continue
+            if task.on_success is not None:
+                task.on_success(result)
+
+    def cancel(self, owner):
+        """Cancel every job belonging to owner; callbacks will not run"""
+        for task in self.pending.pop(owner, []):
+            task.cancel()
+
+    def busy(self, owner):
+        return any(not task.quiet for task in self.pending.get(owner, ()))
+
+    def shutdown(self):
+        for owner in list(self.pending):
+            self.cancel(owner)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _track(self, owner, task):
+        if owner not in self._watched:
+            self._watched.add(owner)
+            owner.bind("<Destroy>", lambda e: self._on_destroy(owner, e), add="+")
+        was_busy = self.busy(owner)
+        self.pending.setdefault(owner, []).append(task)
+        if not was_busy and not task.quiet:
+            self._set_busy(owner, True)
+
+    def _untrack(self, task):
+        tasks = self.pending.get(task.owner)
+        if tasks and task in tasks:
+            was_busy = self.busy(task.owner)
+            tasks.remove(task)
+            if not tasks:
+                del self.pending[task.owner]
+            if was_busy and not self.busy(task.owner):
+                self._set_busy(task.owner, False)
+
+    def _on_destroy(self, owner, event):
+        if event.widget is owner:
+            self._watched.discard(owner)
+            self.cancel(owner)
+
+    @staticmethod
+    def _set_busy(owner, busy):
+        try:
+            owner.configure(cursor="watch" if busy else "")
+        except Exception:
+            pass
+
+
+_executor = None
+
+
+def get_executor(widget=None):
+    """Return the shared executor, attaching it to widget's Tk root if needed"""
+    global _executor
+    if _executor is None:
+        _executor = BackgroundExecutor()
+    if widget is not None and _executor.root is None:
+        _executor.attach(widget._root())
+    return _executor
+
+
+def run_in_background(owner, func, *args, on_success=None, on_error=None, quiet=False):
+    """Run func(*args) off the UI thread on behalf of the owner window; quiet jobs leave the cursor alone"""
+    return get_executor(owner).submit(
+        func, *args, owner=owner, on_success=on_success, on_error=on_error, quiet=quiet
+    )
@@ -0,0 +1,93 @@
+"""Attendance archiving: hot-table size, check-in and dashboard latency before and after.
+
+Generates a database with years of attendance history, measures the desk
+paths, archives every closed session older than the horizon into per-year
+files (then VACUUMs gym.db), and measures again on fresh connections.
+
+Usage: python -m benchmarks.bench_archive [--attendance 10000000] [--members 100000] [--days 365]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import archive
+from benchmarks import datagen
+from db import close_databases, get_database
+from repository import ALREADY_CHECKED_IN, GymRepository
+
+CHECKINS = 2000
+DASHBOARD_REFRESHES = 500
+
+
+def latencies(func, iterations):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def measure(path, seed=3):
+    """Hot-table size plus p50/p99 of a check-in/check-out pair and of a dashboard refresh"""
+    close_databases()
+    db = get_database(path)
+    repo = GymRepository(db)
+    rng = random.Random(seed)
+    ids = [row[0] for row in db.execute("SELECT id FROM members")]
+
+    def check_in_out(i):
+        member_id = rng.choice(ids)
+        status, _ = repo.check_in_member(member_id)
+        repo.check_out_member(member_id)
+        if status == ALREADY_CHECKED_IN:
+            repo.check_in_member(member_id)
+
+    def dashboard(i):
+        repo.dashboard_stats()
+        repo.attendance.count_active_today()
+        repo.attendance.recent(100)
+
+    info = archive.status(db)
+    return {
+        "hot_sessions": info["hot_sessions"],
+        "file_mb": info["file_mb"] - info["free_mb"],
+        "checkin": latencies(check_in_out, CHECKINS),
+        "dashboard": latencies(dashboard, DASHBOARD_REFRESHES),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attendance", type=int, default=10_000_000)
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--history-days", type=int, default=1095)
+    parser.add_argument("--days", type=int, default=archive.HORIZON_DAYS, help="archive horizon")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = datagen.generate(
+            os.path.join(directory, "gym.db"), args.members, args.attendance, transactions=0,
+            days=args.history_days, log=lambda message: None,
+        )
+        before = measure(path)
+
+        start = time.perf_counter()
+        moved = archive.archive(get_database(path), args.days)
+        archived_in = time.perf_counter() - start
+        archive.vacuum(get_database(path))
+        after = measure(path)
+        close_databases()
+
+    print(f"Archived {sum(moved.values())} sessions into {len(moved)} yearly files in {archived_in:.1f}s")
+    print(f"{'':<8} {'hot rows':>10} {'gym.db MB':>10} {'check-in p50/p99 ms':>20} {'dashboard p50/p99 ms':>21}")
+    for label, r in (("before", before), ("after", after)):
+        print(f"{label:<8} {r['hot_sessions']:>10} {r['file_mb']:>10.1f} "
+              f"{r['checkin'][0]:>9.3f} /{r['checkin'][1]:>8.3f} {r['dashboard'][0]:>10.3f} /{r['dashboard'][1]:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
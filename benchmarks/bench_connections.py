@@ -0,0 +1,90 @@
+"""Compare connect-per-call SQL against the shared repository layer.
+
+Measures check-in and payment throughput (ops/sec) for:
+  * legacy: sqlite3.connect()/close() around every action, as the windows used to
+  * repository: long-lived WAL connection with cached statements
+
+Usage: python -m benchmarks.bench_connections [--ops N]
+"""
+import argparse
+import sqlite3
+from datetime import datetime
+
+from benchmarks.common import seed_members, temp_database, timed
+from repository import GymRepository
+from db import get_database
+
+
+def legacy_check_in(path, member_id):
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM members WHERE id=?", (member_id,))
+    cur.fetchone()
+    today = datetime.now().strftime("%Y-%m-%d")
+    cur.execute("""
+        SELECT id FROM attendance
+        WHERE member_id=? AND date(checkin_time)=? AND checkout_time IS NULL
+    """, (member_id, today))
+    cur.fetchone()
+    cur.execute(
+        "INSERT INTO attendance (member_id, checkin_time) VALUES (?, ?)",
+        (member_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_payment(path, member_id):
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM members WHERE id=?", (member_id,))
+    cur.fetchone()
+    cur.execute(
+        "INSERT INTO transactions (member_id, amount_paid, date) VALUES (?, ?, ?)",
+        (member_id, 50.0, datetime.now().strftime("%Y-%m-%d"))
+    )
+    conn.commit()
+    conn.close()
+
+
+def repo_check_in(repo, member_id):
+    repo.members.get_name(member_id)
+    repo.attendance.find_open_session_today(member_id)
+    repo.attendance.check_in(member_id)
+
+
+def repo_payment(repo, member_id):
+    repo.members.get_name(member_id)
+    repo.transactions.add(member_id, 50.0)
+
+
+def run(ops):
+    results = {}
+    with temp_database() as path:
+        ids = seed_members(path, 1000)
+        repo = GymRepository(get_database(path))
+        pick = lambda i: ids[i % len(ids)]  # noqa: E731
+        results["check_in"] = {
+            "legacy": timed(lambda i: legacy_check_in(path, pick(i)), ops),
+            "repository": timed(lambda i: repo_check_in(repo, pick(i)), ops),
+        }
+        results["payment"] = {
+            "legacy": timed(lambda i: legacy_payment(path, pick(i)), ops),
+            "repository": timed(lambda i: repo_payment(repo, pick(i)), ops),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=2000, help="operations per measurement")
+    args = parser.parse_args()
+
+    for action, timings in run(args.ops).items():
+        speedup = timings["repository"] / timings["legacy"]
+        print(f"{action:<10} legacy {timings['legacy']:>9.0f} ops/s   "
+              f"repository {timings['repository']:>9.0f} ops/s   x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Streaming export: rows/sec and peak Python memory as the table grows.
+
+Exports the attendance table of databases with 10x more rows each time, in
+every format. A streaming export should show the same peak at every size.
+
+Usage: python -m benchmarks.bench_export [--sizes 10000 100000 500000] [--formats csv csv.gz jsonl xlsx]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import datagen
+from db import close_databases, get_database
+import export
+
+SIZES = (10_000, 100_000, 500_000)
+FORMATS = ("csv", "csv.gz", "jsonl", "xlsx")
+
+
+def measure(db, path):
+    """Time one export, then repeat it under tracemalloc for the memory peak"""
+    start = time.perf_counter()
+    result = export.export("attendance", path, db=db)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    export.export("attendance", path, db=db)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result.rows, elapsed, peak, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'format':<7} {'seconds':>8} {'rows/s':>10} {'peak MB':>8} {'file MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = datagen.generate(
+                os.path.join(directory, f"gym-{size}.db"), members=max(100, size // 100),
+                attendance=size, transactions=0, log=lambda message: None,
+            )
+            db = get_database(path)
+            for fmt in args.formats:
+                rows, elapsed, peak, file_size = measure(db, os.path.join(directory, f"attendance.{fmt}"))
+                print(f"{rows:>10} {fmt:<7} {elapsed:>8.2f} {rows / elapsed:>10,.0f} "
+                      f"{peak / 2 ** 20:>8.2f} {file_size / 2 ** 20:>8.1f}")
+            close_databases()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Check-in burst through the service's writer queue, with and without group commit.
+
+A class lets out: ``--scanners`` turnstiles and desks each scan
+``--scans`` members back to back (check-in/check-out toggles, with every
+fifth scan a payment), waiting for each acknowledgement before the next scan.
+The writes go through ``service.WriteQueue`` in-process, so the numbers are
+the writer's and not HTTP's. Without batching every scan commits (and
+fsyncs) on its own; with group commit the writer commits whatever arrived
+within ``batch_ms`` together (``0``: whatever was already queued).
+
+Reports scans/sec, commits/sec, scans per commit and p50/p99 time to
+acknowledgement per mode.
+
+Usage: python -m benchmarks.bench_group_commit [--scanners 8] [--scans 200] [--batch-ms 0 2 5 10]
+"""
+import argparse
+import random
+import threading
+import time
+
+import sql_stats
+from benchmarks.common import seed_members, temp_database
+from db import get_database
+from repository import GymRepository
+from service import GROUP_COMMIT_OPS, WriteQueue
+
+
+def burst(repo, writer, member_ids, scanners, scans, seed=7):
+    """Run the burst; returns (elapsed seconds, acknowledgement latencies)"""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(scanners + 1)
+
+    def scanner(index):
+        rng = random.Random(seed + index)
+        own = []
+        barrier.wait()
+        for i in range(scans):
+            member_id = rng.choice(member_ids)
+            start = time.perf_counter()
+            if i % 5 == 4:
+                writer.submit(repo.record_payment, member_id, 30.0, None, "Cash").result()
+            else:
+                writer.submit(repo.toggle_member, member_id).result()
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=scanner, args=(i,)) for i in range(scanners)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def run(batch_ms, scanners, scans, members, batch_ops=GROUP_COMMIT_OPS):
+    with temp_database() as path:
+        member_ids = seed_members(path, members)
+        db = get_database(path)
+        writer = WriteQueue(db, batch_ms, batch_ops)
+        try:
+            sql_stats.reset()
+            elapsed, latencies = burst(GymRepository(db), writer, member_ids, scanners, scans)
+            commits = sum(row["calls"] for row in sql_stats.snapshot()["statements"] if row["statement"] == "COMMIT")
+        finally:
+            writer.close()
+    ops = scanners * scans
+    return {
+        "mode": "off" if batch_ms is None else f"{batch_ms:g} ms",
+        "scans_per_sec": ops / elapsed,
+        "commits_per_sec": commits / elapsed,
+        "scans_per_commit": ops / commits if commits else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scanners", type=int, default=8)
+    parser.add_argument("--scans", type=int, default=200, help="scans per scanner")
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--batch-ms", type=float, nargs="+", default=[0, 2, 5, 10])
+    parser.add_argument("--batch-ops", type=int, default=GROUP_COMMIT_OPS)
+    args = parser.parse_args()
+
+    print(f"{args.scanners} scanners x {args.scans} scans")
+    print(f"{'batching':<9} {'scans/sec':>10} {'commits/sec':>12} {'scans/commit':>13} {'p50 ms':>8} {'p99 ms':>8}")
+    for batch_ms in [None, *args.batch_ms]:
+        r = run(batch_ms, args.scanners, args.scans, args.members, args.batch_ops)
+        print(f"{r['mode']:<9} {r['scans_per_sec']:>10.0f} {r['commits_per_sec']:>12.0f} "
+              f"{r['scans_per_commit']:>13.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Bulk member import: rows/sec and peak Python memory for CSV and JSON files.
+
+Usage: python -m benchmarks.bench_import [--rows 100000]
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import MEMBERSHIP_TYPES, temp_database
+from db import get_database
+import member_import
+
+
+def sample(i):
+    return {
+        "name": f"Member {i}", "age": 18 + i % 50, "gender": "Female" if i % 2 else "Male",
+        "phone": f"01{i:09d}", "address": f"{i % 500} Main Road",
+        "membership_type": MEMBERSHIP_TYPES[i % 4], "start_date": "2025-01-01", "end_date": "2025-12-31",
+    }
+
+
+def write_files(directory, rows):
+    csv_path = os.path.join(directory, "members.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=member_import.FIELDS)
+        writer.writeheader()
+        writer.writerows(sample(i) for i in range(rows))
+    json_path = os.path.join(directory, "members.json")
+    with open(json_path, "w") as f:
+        f.write("[")
+        for i in range(rows):
+            f.write(("," if i else "") + json.dumps(sample(i)))
+        f.write("]")
+    return csv_path, json_path
+
+
+def measure(path):
+    """Time one import, then repeat it under tracemalloc for the memory peak"""
+    with temp_database() as db_path:
+        start = time.perf_counter()
+        result = member_import.import_members(path, db=get_database(db_path))
+        elapsed = time.perf_counter() - start
+    with temp_database() as db_path:
+        tracemalloc.start()
+        member_import.import_members(path, db=get_database(db_path))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result.imported, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for path in write_files(directory, args.rows):
+            imported, elapsed, peak = measure(path)
+            print(f"{os.path.basename(path):<13} {imported} rows in {elapsed:.2f}s "
+                  f"({imported / elapsed:,.0f} rows/s, peak {peak / 2 ** 20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
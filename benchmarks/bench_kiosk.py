@@ -0,0 +1,69 @@
+"""Synthetic scanner burst: kiosk toggles vs. the check-in/check-out window path.
+
+Reports scans per second and p50/p99 latency per scan.
+
+Usage: python -m benchmarks.bench_kiosk [--members N] [--scans N]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import seed_members, temp_database
+from db import get_database
+from kiosk import OpenSessionIndex
+from repository import ALREADY_CHECKED_IN, GymRepository
+
+
+def window_scan(repo, member_id):
+    """What a desk did before kiosk mode: try check-in, fall back to check-out"""
+    status, _ = repo.check_in_member(member_id)
+    if status == ALREADY_CHECKED_IN:
+        repo.check_out_member(member_id)
+
+
+def burst(scan, member_ids):
+    latencies = []
+    start = time.perf_counter()
+    for member_id in member_ids:
+        t = time.perf_counter()
+        scan(member_id)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "scans_per_sec": len(member_ids) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def run(members, scans, seed=7):
+    rng = random.Random(seed)
+    results = {}
+    for mode in ("window", "kiosk"):
+        with temp_database() as path:
+            ids = seed_members(path, members)
+            # A class of regulars scanning in and out repeatedly
+            regulars = rng.sample(ids, min(len(ids), 300))
+            sequence = [rng.choice(regulars) for _ in range(scans)]
+            if mode == "kiosk":
+                index = OpenSessionIndex(get_database(path))
+                results[mode] = burst(index.toggle, sequence)
+            else:
+                repo = GymRepository(get_database(path))
+                results[mode] = burst(lambda member_id: window_scan(repo, member_id), sequence)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=10_000)
+    parser.add_argument("--scans", type=int, default=2000)
+    args = parser.parse_args()
+
+    for mode, r in run(args.members, args.scans).items():
+        print(f"{mode:<7} {r['scans_per_sec']:>8.0f} scans/s   p50 {r['p50_ms']:.2f} ms   p99 {r['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
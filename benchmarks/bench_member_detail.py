@@ -0,0 +1,127 @@
+"""Member detail window: summary and history latency for members with thousands of visits.
+
+Generates a database where a few hundred members share millions of
+sessions, so most have 5k+ visits, and times for the members with
+``--min-visits`` to ``--max-visits`` visits:
+
+* the summary as separate statements, one per figure the window shows
+  (profile, visit count, last visit, average session, total paid, last
+  payment), the way a panel would naively load it;
+* ``GymRepository.member_summary``, the same figures in one statement;
+* the first page of visit history, and page ``--deep-page`` reached by
+  following the keyset cursor.
+
+Then archives sessions older than a year into per-year files and times the
+summary and first page again, now that they read the archives too.
+
+Usage: python -m benchmarks.bench_member_detail [--attendance 2000000] [--members 300] [--min-visits 5000] [--max-visits 20000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import archive
+from benchmarks import datagen
+from db import close_databases, get_database
+from repository import GymRepository
+
+ITERATIONS = 200
+
+# What the window would run without member_summary
+SEPARATE_SQL = [
+    "SELECT id, name, age, gender, phone, membership_type, start_date, end_date, membership_status "
+    "FROM members WHERE id = ?",
+    "SELECT COUNT(*) FROM attendance WHERE member_id = ?",
+    "SELECT MAX(checkin_time) FROM attendance WHERE member_id = ?",
+    "SELECT AVG(checkout_at - checkin_at) / 60.0 FROM attendance "
+    "WHERE member_id = ? AND checkout_at IS NOT NULL AND NOT auto_closed",
+    "SELECT SUM(amount_paid) FROM transactions WHERE member_id = ?",
+    "SELECT amount_paid, date FROM transactions WHERE member_id = ? ORDER BY date DESC, id DESC LIMIT 1",
+]
+
+
+def latencies(func, member_ids, iterations, seed=5):
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(iterations):
+        member_id = rng.choice(member_ids)
+        start = time.perf_counter()
+        func(member_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def deep_page(repo, member_id, page):
+    before = None
+    for _ in range(page):
+        rows = repo.member_visits(member_id, before)
+        if not rows:
+            break
+        before = (rows[-1][1], rows[-1][0])
+    return rows
+
+
+def measure(path, min_visits, max_visits, iterations, deep, separate=True):
+    """{path: (p50 ms, p99 ms)} on a fresh connection, plus the members timed"""
+    close_databases()
+    db = get_database(path)
+    repo = GymRepository(db)
+    conn = db.connection()
+    # Archived visits count too
+    sql, params = archive.union(conn, "SELECT member_id FROM {attendance}")
+    member_ids = [row[0] for row in conn.execute(f"""
+        SELECT member_id FROM ({sql}) GROUP BY member_id HAVING COUNT(*) BETWEEN ? AND ?
+    """, (*params, min_visits, max_visits))]
+    results = {}
+    if separate:
+        results["separate statements"] = latencies(
+            lambda member_id: [conn.execute(sql, (member_id,)).fetchall() for sql in SEPARATE_SQL],
+            member_ids, iterations,
+        )
+    results["member_summary"] = latencies(repo.member_summary, member_ids, iterations)
+    results["visits, first page"] = latencies(repo.member_visits, member_ids, iterations)
+    results[f"visits, page {deep}"] = latencies(
+        lambda member_id: deep_page(repo, member_id, deep), member_ids, max(1, iterations // deep)
+    )
+    return results, member_ids
+
+
+def report(title, results, member_ids, repo):
+    visits = sorted(repo.member_summary(member_id).visits for member_id in member_ids)
+    print(f"{title}: {len(member_ids)} members, {visits[0]}-{visits[-1]} visits each")
+    for name, (p50, p99) in results.items():
+        print(f"  {name:<22} p50 {p50:>8.3f} ms   p99 {p99:>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attendance", type=int, default=2_000_000)
+    parser.add_argument("--members", type=int, default=300)
+    parser.add_argument("--transactions", type=int, default=60_000)
+    parser.add_argument("--min-visits", type=int, default=5000)
+    parser.add_argument("--max-visits", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--deep-page", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = datagen.generate(
+            os.path.join(directory, "gym.db"), args.members, args.attendance, args.transactions,
+            log=lambda message: None,
+        )
+        results, member_ids = measure(path, args.min_visits, args.max_visits, args.iterations, args.deep_page)
+        report("hot table only", results, member_ids, GymRepository(get_database(path)))
+
+        archive.archive(get_database(path))
+        results, member_ids = measure(
+            path, args.min_visits, args.max_visits, args.iterations, args.deep_page, separate=False
+        )
+        report("after archiving", results, member_ids, GymRepository(get_database(path)))
+        close_databases()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Headless benchmark of opening and searching the member directory.
+
+Compares the old full load (every row fetched up front) with the keyset
+pager used by ViewMemberWindow: time to first page plus total count, and
+the peak Python memory held by the fetched rows (tracemalloc). Also times a
+full-text search page with and without the membership-type filter.
+
+Usage: python -m benchmarks.bench_member_directory [--sizes 10000 100000 1000000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.common import seed_members, temp_database
+from db import get_database
+from repository import GymRepository
+from view_member import MemberPager
+
+
+def measure(func):
+    """Return (seconds, peak bytes, result) for one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def open_paged(repo):
+    pager = MemberPager(repo.members)
+    rows = pager.reset()
+    return rows, repo.members.count()
+
+
+def run(size):
+    with temp_database() as path:
+        seed_members(path, size)
+        repo = GymRepository(get_database(path))
+        legacy_time, legacy_peak, rows = measure(repo.members.list_all)
+        del rows
+        paged_time, paged_peak, _ = measure(lambda: open_paged(repo))
+        search_time, _, _ = measure(lambda: repo.members.page(search="ember 12"))
+        filtered_time, _, _ = measure(
+            lambda: repo.members.page(search="ember 12", membership_type="Lifetime")
+        )
+    return {
+        "members": size,
+        "full_load_ms": legacy_time * 1000,
+        "full_load_peak_mb": legacy_peak / 2 ** 20,
+        "paged_open_ms": paged_time * 1000,
+        "paged_peak_mb": paged_peak / 2 ** 20,
+        "search_ms": search_time * 1000,
+        "search_filtered_ms": filtered_time * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'members':>9} {'full ms':>10} {'full MB':>9} {'paged ms':>9} {'paged MB':>9} "
+          f"{'search ms':>10} {'+type ms':>9}")
+    for size in args.sizes:
+        r = run(size)
+        print(f"{r['members']:>9} {r['full_load_ms']:>10.1f} {r['full_load_peak_mb']:>9.1f} "
+              f"{r['paged_open_ms']:>9.2f} {r['paged_peak_mb']:>9.2f} "
+              f"{r['search_ms']:>10.2f} {r['search_filtered_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
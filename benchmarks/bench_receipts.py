@@ -0,0 +1,68 @@
+"""Receipts per second: one generate_receipt_pdf call per payment vs. the batch API, and reprints.
+
+A reprint reads the stored PDF (``receipts.pdf``); it is compared with
+rendering the same receipt again, which is what every reprint used to cost.
+
+Usage: python -m benchmarks.bench_receipts [--count N] [--workers W]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import db
+from benchmarks.common import seed_members, temp_database
+from repository import get_repository
+
+import receipt_generator
+
+
+def run(count, workers):
+    with temp_database() as path, tempfile.TemporaryDirectory() as out_dir:
+        db.DB_PATH = path
+        ids = seed_members(path, 500)
+        payments = [(ids[i % len(ids)], 50.0, "Cash") for i in range(count)]
+
+        cwd = os.getcwd()
+        os.chdir(out_dir)
+        try:
+            start = time.perf_counter()
+            for member_id, amount, method in payments:
+                receipt_generator.generate_receipt_pdf(member_id, amount, method)
+            single = count / (time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+
+        start = time.perf_counter()
+        receipt_generator.generate_receipts_batch(payments, output_dir=out_dir, workers=workers)
+        batch = count / (time.perf_counter() - start)
+
+        repo = get_repository()
+        receipts = repo.receipts.find(limit=count)
+        profiles = repo.members.get_profiles(receipt.member_id for receipt in receipts)
+        start = time.perf_counter()
+        for receipt in receipts:
+            receipt_generator.render_receipt(receipt, profiles[receipt.member_id])
+        render = len(receipts) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for receipt in receipts:
+            repo.receipts.pdf(receipt.number)
+        reprint = len(receipts) / (time.perf_counter() - start)
+    return single, batch, render, reprint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500, help="receipts per mode")
+    parser.add_argument("--workers", type=int, default=None, help="batch worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    single, batch, render, reprint = run(args.count, args.workers)
+    print(f"single  {single:8.1f} receipts/s")
+    print(f"batch   {batch:8.1f} receipts/s  (x{batch / single:.1f}, workers={args.workers or os.cpu_count()})")
+    print(f"reprint {reprint:8.1f} receipts/s from the stored PDF vs. {render:.1f}/s rendering again "
+          f"(x{reprint / render:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Schema migrations: the desk's range queries and warm start before and after migration 2.
+
+Generates a database at schema version 1 (TEXT timestamps, no constraints),
+times the attendance window's queries (latest sessions with durations, the
+open-session lookup behind check-in/check-out, the active-today count) and
+the dashboard read behind ``main.update_stats`` with the SQL as it was,
+migrates to the current version, and times the current SQL from
+``repository``. Warm start compares re-running every CREATE (what
+``connect_db`` did on each start before versioning) with the
+``user_version`` check.
+
+Usage: python -m benchmarks.bench_schema [--attendance 2000000] [--members 50000] [--iterations 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+import db
+from benchmarks import datagen
+from repository import (
+    ACTIVE_TODAY_SQL, DASHBOARD_SQL, DATE_FORMAT, OPEN_SESSION_SQL, RECENT_ATTENDANCE_SQL, day_bounds,
+)
+
+# The same statements at schema version 1
+LEGACY_RECENT_ATTENDANCE_SQL = """
+    SELECT a.id, a.member_id, m.name, a.checkin_time, a.checkout_time,
+           CASE
+               WHEN a.checkout_time IS NULL THEN 'Active'
+               ELSE CAST((julianday(a.checkout_time) - julianday(a.checkin_time)) * 24 * 60 AS INTEGER) || ' min'
+           END as duration
+    FROM attendance a
+    JOIN members m ON a.member_id = m.id
+    ORDER BY a.checkin_time DESC
+    LIMIT ?
+"""
+
+LEGACY_OPEN_SESSION_SQL = """
+    SELECT id FROM attendance
+    WHERE member_id=? AND checkout_time IS NULL
+      AND checkin_time >= ? AND checkin_time < ?
+"""
+
+LEGACY_ACTIVE_TODAY_SQL = """
+    SELECT COUNT(*) FROM attendance
+    WHERE checkin_time >= ? AND checkin_time < ? AND checkout_time IS NULL
+"""
+
+
+def text_bounds(day):
+    return day.strftime(DATE_FORMAT), (day + timedelta(days=1)).strftime(DATE_FORMAT)
+
+
+def queries(legacy, member_ids, rng):
+    """{name: (sql, params factory)} for one schema"""
+    today = date.today()
+    bounds = text_bounds(today) if legacy else day_bounds(today)
+    dashboard = (today.strftime(DATE_FORMAT), today.strftime("%Y-%m"))
+    return {
+        "latest 100 sessions": (LEGACY_RECENT_ATTENDANCE_SQL if legacy else RECENT_ATTENDANCE_SQL, lambda: (100,)),
+        "open-session lookup": (
+            LEGACY_OPEN_SESSION_SQL if legacy else OPEN_SESSION_SQL,
+            lambda: (rng.choice(member_ids), *bounds),
+        ),
+        "active today": (LEGACY_ACTIVE_TODAY_SQL if legacy else ACTIVE_TODAY_SQL, lambda: bounds),
+        "dashboard stats": (DASHBOARD_SQL, lambda: dashboard),
+    }
+
+
+def measure(path, legacy, iterations, seed=7):
+    """{query: (p50 ms, p99 ms)} on a fresh connection"""
+    conn = sqlite3.connect(path)
+    member_ids = [row[0] for row in conn.execute("SELECT id FROM members")]
+    rng = random.Random(seed)
+    results = {}
+    for name, (sql, params) in queries(legacy, member_ids, rng).items():
+        samples = []
+        for _ in range(iterations):
+            args = params()
+            start = time.perf_counter()
+            conn.execute(sql, args).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        results[name] = samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+    conn.close()
+    return results
+
+
+def warm_start(path, iterations=50):
+    """(ms for a start that re-runs the baseline schema, ms for connect_db on an up-to-date database)"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        db.MIGRATIONS[0](conn)
+        conn.execute("ROLLBACK")
+        conn.close()
+    creates = (time.perf_counter() - start) * 1000 / iterations
+    start = time.perf_counter()
+    for _ in range(iterations):
+        db.connect_db(path)
+    return creates, (time.perf_counter() - start) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attendance", type=int, default=2_000_000)
+    parser.add_argument("--members", type=int, default=50_000)
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = datagen.generate(
+            os.path.join(directory, "gym.db"), args.members, args.attendance, args.transactions,
+            log=lambda message: None, schema_version=1,
+        )
+        before = measure(path, legacy=True, iterations=args.iterations)
+        start = time.perf_counter()
+        db.connect_db(path)
+        migrated_in = time.perf_counter() - start
+        after = measure(path, legacy=False, iterations=args.iterations)
+        creates_ms, connect_ms = warm_start(path)
+
+    print(f"Migrated {args.attendance} sessions to schema version {db.SCHEMA_VERSION} in {migrated_in:.1f}s")
+    print(f"{'':<22} {'v1 p50/p99 ms':>20} {f'v{db.SCHEMA_VERSION} p50/p99 ms':>20}")
+    for name in before:
+        (b50, b99), (a50, a99) = before[name], after[name]
+        print(f"{name:<22} {b50:>9.3f} /{b99:>8.3f} {a50:>9.3f} /{a99:>8.3f}")
+    print(f"warm start: re-running CREATEs {creates_ms:.2f} ms, user_version check {connect_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
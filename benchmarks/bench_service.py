@@ -0,0 +1,178 @@
+"""Load test: N front desks sharing one database, with and without the service.
+
+Each desk is a separate process running a front-desk mix (check-in/out
+toggles, payments, member searches, dashboard refreshes) as fast as it can
+for a fixed time. Desks either:
+  * legacy: open gym.db for every action, as the windows used to
+  * direct: keep their own repository connection to gym.db
+  * service: call a service.py process over HTTP (one writer thread)
+
+Reports throughput, lock-error rate ("database is locked" / busy) and
+p50/p99 latency per mode.
+
+Usage: python -m benchmarks.bench_service [--desks 4] [--seconds 10] [--members 5000] [--modes legacy direct service]
+"""
+import argparse
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.bench_connections import legacy_check_in, legacy_payment
+from benchmarks.common import ROOT, seed_members, temp_database
+from db import Database, close_databases
+from repository import ALREADY_CHECKED_IN, GymRepository
+from service import ServiceClient, ServiceError
+
+MODES = ("legacy", "direct", "service")
+STARTUP_TIMEOUT = 10
+
+
+def is_lock_error(error):
+    if isinstance(error, ServiceError):
+        return error.status == 503
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def desk_actions(mode, target):
+    """Return (check_in_or_out, pay, search, stats) callables for one desk"""
+    if mode == "legacy":
+        def legacy_read(sql, params=()):
+            conn = sqlite3.connect(target)
+            conn.execute(sql, params).fetchall()
+            conn.close()
+
+        return (
+            lambda member_id: legacy_check_in(target, member_id),
+            lambda member_id: legacy_payment(target, member_id),
+            lambda term: legacy_read("SELECT * FROM members WHERE name LIKE ? ORDER BY id DESC", (f"%{term}%",)),
+            lambda: legacy_read("SELECT COUNT(*) FROM members"),
+        )
+
+    repo = ServiceClient(target) if mode == "service" else GymRepository(Database(target))
+
+    def check_in_or_out(member_id):
+        status, _ = repo.check_in_member(member_id)
+        if status == ALREADY_CHECKED_IN:
+            repo.check_out_member(member_id)
+
+    return (
+        check_in_or_out,
+        lambda member_id: repo.record_payment(member_id, 30.0),
+        lambda term: repo.members.page(search=term),
+        repo.dashboard_stats,
+    )
+
+
+def run_desk(mode, target, member_ids, seconds, seed):
+    """Run one desk until the deadline; returns (ops, lock errors, other errors, latencies)"""
+    rng = random.Random(seed)
+    check_in_or_out, pay, search, stats = desk_actions(mode, target)
+    ops = lock_errors = other_errors = 0
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        start = time.perf_counter()
+        try:
+            if roll < 0.45:
+                check_in_or_out(rng.choice(member_ids))
+            elif roll < 0.65:
+                pay(rng.choice(member_ids))
+            elif roll < 0.85:
+                search(f"ember {rng.randrange(100)}")
+            else:
+                stats()
+        except Exception as e:
+            if is_lock_error(e):
+                lock_errors += 1
+            else:
+                other_errors += 1
+        latencies.append(time.perf_counter() - start)
+        ops += 1
+    return ops, lock_errors, other_errors, latencies
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(path):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "service.py"), "--db", path, "--port", str(port)],
+        stdout=subprocess.DEVNULL, cwd=ROOT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while True:
+        try:
+            urllib.request.urlopen(f"{url}/stats", timeout=1).read()
+            return process, url
+        except OSError:
+            if time.monotonic() > deadline:
+                process.kill()
+                raise
+            time.sleep(0.05)
+
+
+def run(mode, desks, seconds, members):
+    with temp_database() as path:
+        member_ids = seed_members(path, members)
+        if mode == "legacy":
+            # The original gym.db used SQLite's default rollback journal, where readers block the writer
+            close_databases()
+            conn = sqlite3.connect(path)
+            conn.execute("PRAGMA journal_mode = DELETE")
+            conn.close()
+        process = None
+        target = path
+        if mode == "service":
+            process, target = start_service(path)
+        try:
+            with ProcessPoolExecutor(max_workers=desks) as pool:
+                futures = [pool.submit(run_desk, mode, target, member_ids, seconds, seed)
+                           for seed in range(desks)]
+                results = [future.result() for future in futures]
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    ops = sum(r[0] for r in results)
+    latencies = sorted(latency for r in results for latency in r[3])
+    return {
+        "mode": mode,
+        "desks": desks,
+        "ops_per_sec": ops / seconds,
+        "lock_error_rate": sum(r[1] for r in results) / ops if ops else 0.0,
+        "other_errors": sum(r[2] for r in results),
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--desks", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'desks':>5} {'ops/sec':>9} {'lock err %':>10} {'other err':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode in args.modes:
+        r = run(mode, args.desks, args.seconds, args.members)
+        print(f"{r['mode']:<8} {r['desks']:>5} {r['ops_per_sec']:>9.0f} {r['lock_error_rate'] * 100:>10.2f} "
+              f"{r['other_errors']:>9} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
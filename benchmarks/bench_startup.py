@@ -0,0 +1,106 @@
+"""Cold start: import time and time to the main window's first frame, against a budget.
+
+Each run is a fresh interpreter:
+  * import: ``import main`` timed inside the child, plus the heavy modules it pulled in
+  * first frame: ``python main.py --startup-report`` timed from launch to the
+    moment the main window is mapped (needs a display)
+
+Exits 1 when a median is over budget or a lazily loaded module (reportlab,
+NumPy, Pillow, openpyxl) is imported at startup.
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--import-budget-ms 100] [--first-frame-budget-ms 1500] [--out startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT
+
+IMPORT_BUDGET_MS = 100
+FIRST_FRAME_BUDGET_MS = 1500
+LAZY_MODULES = ("reportlab", "numpy", "PIL", "openpyxl")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"import_ms": elapsed, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import():
+    out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def measure_first_frame(db_path):
+    """Milliseconds from launching main.py to its first frame, or None without a display"""
+    launched = time.time()
+    out = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--startup-report"], cwd=ROOT,
+        capture_output=True, text=True, env={**os.environ, "GYM_DB": db_path}, timeout=60,
+    )
+    if out.returncode != 0 or not out.stdout.strip():
+        return None
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    return (report["first_frame_at"] - launched) * 1000
+
+
+def over_budget(results, import_budget_ms=IMPORT_BUDGET_MS, first_frame_budget_ms=FIRST_FRAME_BUDGET_MS):
+    """Messages for every budget the results break"""
+    problems = []
+    if results["import_ms"] > import_budget_ms:
+        problems.append(f"import {results['import_ms']:.0f} ms > {import_budget_ms} ms")
+    if results["first_frame_ms"] is not None and results["first_frame_ms"] > first_frame_budget_ms:
+        problems.append(f"first frame {results['first_frame_ms']:.0f} ms > {first_frame_budget_ms} ms")
+    if results["loaded_at_startup"]:
+        problems.append(f"imported at startup: {', '.join(results['loaded_at_startup'])}")
+    return problems
+
+
+def run(runs):
+    imports = [measure_import() for _ in range(runs)]
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "gym.db")
+        frames = [measure_first_frame(db_path) for _ in range(runs)]
+    frames = [frame for frame in frames if frame is not None]
+    return {
+        "runs": runs,
+        "import_ms": statistics.median(result["import_ms"] for result in imports),
+        "first_frame_ms": statistics.median(frames) if frames else None,
+        "loaded_at_startup": sorted({module for result in imports for module in result["loaded"]}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--first-frame-budget-ms", type=float, default=FIRST_FRAME_BUDGET_MS)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    print(f"import main       {results['import_ms']:8.1f} ms (median of {args.runs})")
+    if results["first_frame_ms"] is None:
+        print("first frame       skipped (no display)")
+    else:
+        print(f"first frame       {results['first_frame_ms']:8.1f} ms (median of {args.runs})")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    problems = over_budget(results, args.import_budget_ms, args.first_frame_budget_ms)
+    for problem in problems:
+        print(f"OVER BUDGET {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
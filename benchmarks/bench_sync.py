@@ -0,0 +1,98 @@
+"""Branch sync: delta export and import time against database size and number of changes.
+
+For each ``--sizes`` attendance count, generates a branch database and a
+copy of it as a second branch that already knows the first's members. The
+first branch then checks members in and out and takes payments
+(``--changes`` writes in total). Times exporting those changes to a delta
+file and importing it into the second branch, and reports the delta size.
+Both should follow the number of changes, not the size of the database.
+
+Usage: python -m benchmarks.bench_sync [--sizes 100000 2000000] [--changes 100 1000 10000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import sync
+from benchmarks import datagen
+from db import close_databases, get_database
+from repository import GymRepository
+
+
+def make_changes(repo, count, seed=11):
+    """count front-desk writes: check-ins and check-outs, every fifth a payment"""
+    rng = random.Random(seed)
+    member_ids = [row[0] for row in repo.db.execute("SELECT id FROM members")]
+    with repo.db.transaction():
+        for i in range(count):
+            member_id = rng.choice(member_ids)
+            if i % 5 == 4:
+                repo.record_payment(member_id, 30.0, payment_method="Cash")
+            else:
+                repo.toggle_member(member_id)
+
+
+def run(directory, attendance, changes):
+    north_path = os.path.join(directory, f"north-{attendance}.db")
+    south_path = os.path.join(directory, f"south-{attendance}.db")
+    if not os.path.exists(north_path):
+        datagen.generate(north_path, max(1000, attendance // 100), attendance, attendance // 10, log=lambda m: None)
+        sync.set_branch("north", get_database(north_path))
+        close_databases()
+    close_databases()
+    shutil.copy(north_path, south_path)
+    north, south = get_database(north_path), get_database(south_path)
+    sync.set_branch("south", south)
+    since = north.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+    # South is caught up with north and has north's members under the same ids
+    with south.transaction() as conn:
+        conn.execute("""
+            INSERT OR IGNORE INTO sync_rows (table_name, origin, origin_id, local_id, version_at, version_branch)
+            SELECT 'members', 'north', id, id, '', 'north' FROM members
+        """)
+        conn.execute("INSERT INTO sync_peers (branch, applied_seq) VALUES ('north', ?)", (since,))
+
+    make_changes(GymRepository(north), changes)
+    delta = os.path.join(directory, "north.delta")
+    start = time.perf_counter()
+    header = sync.export_delta(delta, north, since=since)
+    exported = time.perf_counter() - start
+    start = time.perf_counter()
+    counts = sync.import_delta(delta, south)
+    imported = time.perf_counter() - start
+    close_databases()
+    os.remove(south_path)
+    return {
+        "rows": attendance,
+        "changes": header["changes"],
+        "applied": counts[sync.APPLIED],
+        "export_ms": exported * 1000,
+        "import_ms": imported * 1000,
+        "delta_kb": os.path.getsize(delta) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 2_000_000], help="attendance rows")
+    parser.add_argument("--changes", type=int, nargs="+", default=[100, 1000, 10_000])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="gym-bench-")
+    try:
+        print(f"{'sessions':>10} {'writes':>7} {'changed rows':>13} {'export ms':>10} {'import ms':>10} {'delta KB':>9}")
+        for size in args.sizes:
+            for changes in args.changes:
+                r = run(directory, size, changes)
+                print(f"{r['rows']:>10} {changes:>7} {r['changes']:>13} {r['export_ms']:>10.1f} "
+                      f"{r['import_ms']:>10.1f} {r['delta_kb']:>9.1f}")
+    finally:
+        close_databases()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Helpers shared by the benchmark scripts.
+
+Run the scripts from the repository root, e.g.
+``python -m benchmarks.bench_connections``.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Make the application modules importable when run as a script
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from db import close_databases, get_database  # noqa: E402
+
+MEMBERSHIP_TYPES = ["Monthly", "Quarterly", "Yearly", "Lifetime"]
+
+
+@contextmanager
+def temp_database():
+    """Yield the path of a fresh gym database in a temporary directory"""
+    tmpdir = tempfile.mkdtemp(prefix="gym-bench-")
+    path = os.path.join(tmpdir, "gym.db")
+    try:
+        get_database(path)
+        yield path
+    finally:
+        close_databases()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def seed_members(path, count, seed=42):
+    """Insert count synthetic members and return their ids"""
+    rng = random.Random(seed)
+    db = get_database(path)
+    rows = (
+        (f"Member {i}", rng.randint(16, 70), rng.choice(["Male", "Female", "Other"]),
+         f"01{rng.randint(100000000, 999999999)}", f"{rng.randint(1, 999)} Main Road",
+         rng.choice(MEMBERSHIP_TYPES), "2025-01-01", "2025-12-31")
+        for i in range(count)
+    )
+    with db.transaction() as conn:
+        conn.executemany("""
+            INSERT INTO members (name, age, gender, phone, address, membership_type, start_date, end_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    return [row[0] for row in db.execute("SELECT id FROM members ORDER BY id")]
+
+
+def timed(func, iterations):
+    """Call func(i) iterations times and return operations per second"""
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed else float("inf")
@@ -0,0 +1,189 @@
+"""Generate a realistic gym database for benchmarking.
+
+Members join over the covered period and pay according to their membership
+type. Attendance follows weekday and time-of-day peaks (early morning and
+after work), with a few heavy regulars and many occasional visitors. Sessions
+last roughly 30-120 minutes, and some of today's sessions are still open.
+
+Usage::
+
+    python -m benchmarks.datagen --out bench.db --members 100000 \\
+        --attendance 10000000 --transactions 2000000 [--days 1095] [--seed 1]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from benchmarks.common import MEMBERSHIP_TYPES
+from db import SCHEMA_VERSION, connect_db, has_search_index
+from repository import PAYMENT_METHODS
+import stats
+
+CHUNK = 50_000
+
+# Relative check-in volume per hour of day (index 0 = midnight) and per weekday (Monday first)
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 2, 8, 10, 8, 5, 4, 4, 5, 4, 3, 4, 6, 10, 12, 10, 7, 4, 2, 0]
+WEEKDAY_WEIGHTS = [1.15, 1.1, 1.05, 1.0, 0.9, 0.75, 0.6]
+
+MEMBERSHIP_DAYS = {"Monthly": 30, "Quarterly": 91, "Yearly": 365, "Lifetime": 36500}
+MEMBERSHIP_PRICE = {"Monthly": 30.0, "Quarterly": 80.0, "Yearly": 300.0, "Lifetime": 1500.0}
+MEMBERSHIP_MIX = [0.55, 0.2, 0.2, 0.05]
+PAYMENT_METHOD_MIX = [0.35, 0.3, 0.15, 0.1, 0.1]
+
+FIRST_NAMES = ["Arif", "Mainul", "Nadia", "Rahim", "Karim", "Sadia", "Tanvir", "Farhana", "Imran", "Ayesha",
+               "John", "Maria", "David", "Sara", "Omar", "Lina", "Kevin", "Priya", "Chen", "Fatima"]
+LAST_NAMES = ["Hossain", "Islam", "Rahman", "Ahmed", "Khan", "Chowdhury", "Smith", "Garcia", "Lee", "Patel"]
+STREETS = ["Main Road", "Lake View", "Station Road", "Hill Street", "College Road", "Park Lane"]
+
+
+def _chunks(rows, size=CHUNK):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _members(rng, count, first_day, days):
+    joined = sorted(rng.randrange(days) for _ in range(count))
+    for offset in joined:
+        kind = rng.choices(MEMBERSHIP_TYPES, MEMBERSHIP_MIX)[0]
+        start = first_day + timedelta(days=offset)
+        end = start + timedelta(days=MEMBERSHIP_DAYS[kind])
+        yield (
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", rng.randint(16, 70),
+            rng.choice(("Male", "Female", "Female", "Male", "Other")), f"01{rng.randint(300000000, 999999999)}",
+            f"{rng.randint(1, 400)} {rng.choice(STREETS)}", kind, start.isoformat(), end.isoformat(),
+        )
+
+
+def _daily_counts(rng, total, first_day, days):
+    weights = [WEEKDAY_WEIGHTS[(first_day + timedelta(days=d)).weekday()] * rng.uniform(0.8, 1.2)
+               for d in range(days)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    counts[-1] += total - sum(counts)
+    return counts
+
+
+def _attendance(rng, total, member_ids, first_day, days, now):
+    # Pareto weights: a few regulars account for most visits
+    visit_weights = list(accumulate(rng.paretovariate(1.5) for _ in member_ids))
+    hour_weights = list(accumulate(HOUR_WEIGHTS))
+    hours = list(range(24))
+    now_key = now.strftime("%Y-%m-%d %H:%M:%S")
+    for d, count in enumerate(_daily_counts(rng, total, first_day, days)):
+        # Format times by hand; datetime arithmetic per row dominates at 10M rows
+        day = (first_day + timedelta(days=d)).isoformat()
+        next_day = (first_day + timedelta(days=d + 1)).isoformat()
+        who = rng.choices(member_ids, cum_weights=visit_weights, k=count)
+        starts = sorted(h * 3600 + rng.randrange(3600) for h in rng.choices(hours, cum_weights=hour_weights, k=count))
+        for member_id, start in zip(who, starts):
+            end = start + int(60 * max(15, min(240, rng.gauss(75, 25))))
+            checkin = _stamp(day, start)
+            checkout = _stamp(day, end) if end < 86400 else _stamp(next_day, end - 86400)
+            if checkin > now_key:
+                # Today's future visits: shift into the last hour, still in progress
+                checkin = (now - timedelta(seconds=rng.randrange(3600))).strftime("%Y-%m-%d %H:%M:%S")
+                checkout = None
+            elif checkout > now_key:
+                checkout = None
+            yield member_id, checkin, checkout
+
+
+def _stamp(day, seconds):
+    return f"{day} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _transactions(rng, total, member_ids, member_types, first_day, days):
+    for d, count in enumerate(_daily_counts(rng, total, first_day, days)):
+        day = (first_day + timedelta(days=d)).isoformat()
+        for member_id in rng.choices(member_ids, k=count):
+            kind = member_types[member_id]
+            amount = round(MEMBERSHIP_PRICE[kind] * rng.choice((1, 1, 1, 0.9, 0.5)), 2)
+            yield member_id, amount, day, kind, rng.choices(PAYMENT_METHODS, PAYMENT_METHOD_MIX)[0]
+
+
+def generate(path, members, attendance, transactions, days=1095, seed=1, log=print,
+             schema_version=SCHEMA_VERSION):
+    """Create a database at path with the given row counts (at an older schema_version to benchmark migrations)"""
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    rng = random.Random(seed)
+    today = date.today()
+    first_day = today - timedelta(days=days - 1)
+    now = datetime.now()
+
+    connect_db(path, schema_version)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    # Triggers and secondary indexes are dropped during the load and created again at the end;
+    # the counters and search index are rebuilt in one pass
+    dropped = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE type IN ('trigger', 'index') AND sql IS NOT NULL"
+    ).fetchall()
+    for kind, name, _ in dropped:
+        conn.execute(f"DROP {kind.upper()} {name}")
+
+    def load(label, sql, rows):
+        start, inserted = time.perf_counter(), 0
+        for chunk in _chunks(rows):
+            conn.execute("BEGIN")
+            conn.executemany(sql, chunk)
+            conn.execute("COMMIT")
+            inserted += len(chunk)
+        log(f"{label:<13} {inserted:>10} rows in {time.perf_counter() - start:.1f}s")
+
+    load("members", """
+        INSERT INTO members (name, age, gender, phone, address, membership_type, start_date, end_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, _members(rng, members, first_day, days))
+    member_types = dict(conn.execute("SELECT id, membership_type FROM members"))
+    member_ids = list(member_types)
+    load("attendance", "INSERT INTO attendance (member_id, checkin_time, checkout_time) VALUES (?, ?, ?)",
+         _attendance(rng, attendance, member_ids, first_day, days, now))
+    load("transactions", """
+        INSERT INTO transactions (member_id, amount_paid, date, membership_type, payment_method)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+         _transactions(rng, transactions, member_ids, member_types, first_day, days))
+
+    start = time.perf_counter()
+    conn.execute("BEGIN")
+    if has_search_index(conn):
+        conn.execute("INSERT INTO members_fts (members_fts) VALUES ('rebuild')")
+    stats.rebuild(conn)
+    for _, _, sql in dropped:
+        conn.execute(sql)
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.close()
+    log(f"{'indexes':<13} rebuilt in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic gym database")
+    parser.add_argument("--out", required=True, help="database file to create")
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--attendance", type=int, default=10_000_000)
+    parser.add_argument("--transactions", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=1095, help="history length ending today")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    generate(args.out, args.members, args.attendance, args.transactions, args.days, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
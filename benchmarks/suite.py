@@ -0,0 +1,298 @@
+"""Time every SQL path the windows use and save the results as JSON.
+
+Each path is a function registered with ``@query``; it runs the same
+repository call the window makes, without building any Tk widgets. The
+suite reports the median, p95 and max latency per path, and the JSON file
+records the commit, SQLite version and table sizes so runs can be compared
+between commits.
+
+Usage::
+
+    python -m benchmarks.datagen --out bench.db --members 100000 --attendance 10000000 --transactions 2000000
+    python -m benchmarks.suite --db bench.db --out results.json
+    python -m benchmarks.suite --db bench.db --compare results.json   # after a change
+
+Without ``--db`` a small database is generated in a temporary directory.
+Write paths (check-in/out, payments) add rows, so point ``--db`` at a
+generated copy rather than a real gym database.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import analytics
+from benchmarks import datagen
+from benchmarks.common import MEMBERSHIP_TYPES, ROOT
+from db import close_databases, get_database
+from repository import ALREADY_CHECKED_IN, GymRepository
+import revenue
+
+ITERATIONS = 200
+WARMUP = 5
+REGRESSION_THRESHOLD = 0.25
+# Sub-millisecond paths jitter by more than the threshold; ignore slowdowns smaller than this
+MIN_DELTA_MS = 0.1
+SMALL_DATASET = {"members": 10_000, "attendance": 300_000, "transactions": 60_000}
+
+QUERIES = {}
+
+
+def query(name):
+    """Register func(ctx, i) as the benchmark for one query path"""
+    def register(func):
+        QUERIES[name] = func
+        return func
+    return register
+
+
+class Context:
+    """Repository plus the sample ids the query functions draw from"""
+
+    def __init__(self, repo, seed=1):
+        self.repo = repo
+        self.rng = random.Random(seed)
+        ids = [row[0] for row in repo.db.execute("SELECT id FROM members ORDER BY id")]
+        if not ids:
+            raise ValueError("the benchmark database has no members")
+        self.member_ids = ids
+        self.sample = self.rng.sample(ids, min(len(ids), 1000))
+        # Members whose name is searched, and an id deep in the directory for paging
+        self.names = [row[0] for row in repo.db.execute(
+            "SELECT name FROM members WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(self.sample[:50]),)
+        )]
+        self.middle_id = ids[len(ids) // 2]
+        self.analytics_ready = False
+
+    def member(self, i):
+        return self.sample[i % len(self.sample)]
+
+
+# Member directory (ViewMemberWindow)
+
+@query("members.first_page")
+def members_first_page(ctx, i):
+    ctx.repo.members.page(limit=200)
+
+
+@query("members.next_page")
+def members_next_page(ctx, i):
+    ctx.repo.members.page(before_id=ctx.middle_id, limit=200)
+
+
+@query("members.count")
+def members_count(ctx, i):
+    ctx.repo.members.count()
+
+
+@query("members.filter_type")
+def members_filter_type(ctx, i):
+    kind = MEMBERSHIP_TYPES[i % len(MEMBERSHIP_TYPES)]
+    ctx.repo.members.page(limit=200, membership_type=kind)
+    ctx.repo.members.count(kind)
+
+
+@query("members.search")
+def members_search(ctx, i):
+    ctx.repo.members.page(limit=200, search=ctx.names[i % len(ctx.names)].split()[-1])
+
+
+@query("members.search_short")
+def members_search_short(ctx, i):
+    ctx.repo.members.page(limit=200, search=ctx.names[i % len(ctx.names)][:2])
+
+
+# Front desk (AttendanceWindow, TransactionWindow)
+
+@query("attendance.check_in_out")
+def attendance_check_in_out(ctx, i):
+    member_id = ctx.member(i)
+    status, _ = ctx.repo.check_in_member(member_id)
+    ctx.repo.check_out_member(member_id)
+    if status == ALREADY_CHECKED_IN:
+        ctx.repo.check_in_member(member_id)
+
+
+@query("attendance.recent")
+def attendance_recent(ctx, i):
+    ctx.repo.attendance.recent(100)
+
+
+@query("transactions.record_payment")
+def transactions_record_payment(ctx, i):
+    ctx.repo.record_payment(ctx.member(i), 30.0)
+
+
+@query("transactions.recent")
+def transactions_recent(ctx, i):
+    ctx.repo.transactions.recent(100)
+
+
+@query("receipts.member_lookup")
+def receipts_member_lookup(ctx, i):
+    ctx.repo.members.get_profile(ctx.member(i))
+
+
+@query("receipts.batch_lookup")
+def receipts_batch_lookup(ctx, i):
+    ctx.repo.members.get_profiles(ctx.sample[:100])
+
+
+# Finance reports (revenue.py)
+
+@query("revenue.year_by_month")
+def revenue_year_by_month(ctx, i):
+    revenue.revenue_report(ctx.repo.db, (date.today() - timedelta(days=365)).isoformat(), by="month")
+
+
+@query("revenue.all_by_type_and_method")
+def revenue_all_by_type_and_method(ctx, i):
+    revenue.revenue_report(ctx.repo.db, by=("membership_type", "payment_method"))
+
+
+# Dashboard (main window)
+
+@query("dashboard.stats")
+def dashboard_stats(ctx, i):
+    ctx.repo.dashboard_stats()
+
+
+@query("dashboard.active_today")
+def dashboard_active_today(ctx, i):
+    ctx.repo.attendance.count_active_today()
+
+
+# Analytics (AnalyticsWindow); the rollups are brought up to date before timing
+
+@query("analytics.report_90_days")
+def analytics_report(ctx, i):
+    if not ctx.analytics_ready:
+        analytics.refresh(ctx.repo.db)
+        ctx.analytics_ready = True
+    start = (date.today() - timedelta(days=90)).isoformat()
+    analytics.build_report(ctx.repo.db, start, refresh_first=False)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def time_query(func, ctx, iterations=ITERATIONS, warmup=WARMUP):
+    """Return latency statistics in milliseconds for iterations calls of func"""
+    for i in range(warmup):
+        func(ctx, i)
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(ctx, i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "median_ms": round(percentile(latencies, 0.5), 4),
+        "p95_ms": round(percentile(latencies, 0.95), 4),
+        "max_ms": round(latencies[-1], 4),
+        "ops_per_sec": round(iterations / (sum(latencies) / 1000), 1) if sum(latencies) else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def table_sizes(db):
+    return {
+        table: db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("members", "attendance", "transactions")
+    }
+
+
+def run(path, names=None, iterations=ITERATIONS, log=print):
+    """Run the selected query paths against the database at path"""
+    repo = GymRepository(get_database(path))
+    ctx = Context(repo)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "database": os.path.abspath(path),
+            "rows": table_sizes(repo.db),
+            "iterations": iterations,
+        },
+        "queries": {},
+    }
+    for name in names or QUERIES:
+        stats = time_query(QUERIES[name], ctx, iterations)
+        results["queries"][name] = stats
+        log(f"{name:<30} median {stats['median_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms")
+    return results
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD, min_delta_ms=MIN_DELTA_MS):
+    """Return (name, old median, new median, ratio) for paths slower by more than threshold"""
+    regressions = []
+    for name, stats in new["queries"].items():
+        before = old.get("queries", {}).get(name)
+        if not before or not before["median_ms"]:
+            continue
+        ratio = stats["median_ms"] / before["median_ms"]
+        if ratio > 1 + threshold and stats["median_ms"] - before["median_ms"] > min_delta_ms:
+            regressions.append((name, before["median_ms"], stats["median_ms"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every query path used by the windows")
+    parser.add_argument("--db", help="database to benchmark (generated with benchmarks.datagen)")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="earlier results JSON; exit 1 if a path got slower")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="allowed median slowdown before a path counts as a regression")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--only", nargs="+", choices=sorted(QUERIES), metavar="QUERY")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    path = args.db
+    if path is None:
+        tmpdir = tempfile.mkdtemp(prefix="gym-bench-")
+        path = datagen.generate(os.path.join(tmpdir, "gym.db"), **SMALL_DATASET)
+    try:
+        results = run(path, args.only, args.iterations)
+    finally:
+        close_databases()
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import pytest
+
+from db import close_databases, get_database
+from repository import GymRepository
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "gym.db")
+    yield path
+    close_databases()
+
+
+@pytest.fixture
+def repo(db_path):
+    return GymRepository(get_database(db_path))
+
+
+@pytest.fixture
+def member_id(repo):
+    return repo.members.add(
+        ("Jane Doe", 30, "Female", "0123456789", "1 Main Road", "Monthly", "2025-01-01", "2025-12-31")
+    )
+
+
+@pytest.fixture
+def default_db(db_path, monkeypatch):
+    """Point get_repository()/get_database() without arguments at the test database"""
+    import db
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    return db_path
@@ -1,43 +1,861 @@
+import logging
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 
-def connect_db():
-    conn = sqlite3.connect("gym.db")
-    cur = conn.cursor()
+from sql_stats import InstrumentedConnection
 
-    # Members Table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS members (
+logger = logging.getLogger("db")
+
+# Database file used by every window; override with the GYM_DB environment variable
+DB_PATH = os.environ.get("GYM_DB", "gym.db")
+
+# Connection tuning
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+# Indexes for the hot lookups on the current schema. Check-in times are compared
+# as integer ranges on the epoch columns (checkin_at, checkout_at).
+INDEXES = [
+    # Member directory filtered by membership type, paged by id
+    "CREATE INDEX IF NOT EXISTS idx_members_type ON members (membership_type)",
+    # Open-session lookup on check-in/check-out: member_id = ? AND checkout_at IS NULL AND checkin_at range
+    "CREATE INDEX IF NOT EXISTS idx_attendance_open_session ON attendance (member_id, checkout_at, checkin_at)",
+    # Every open session (kiosk open-session map, counter reconciliation)
+    "CREATE INDEX IF NOT EXISTS idx_attendance_open ON attendance (member_id) WHERE checkout_time IS NULL",
+    # Latest-sessions list, and date ranges over the text timestamps (exports, archiving)
+    "CREATE INDEX IF NOT EXISTS idx_attendance_checkin ON attendance (checkin_time, checkout_time)",
+    # Transaction history order and monthly revenue range
+    "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)",
+    # One member's payments (exports filtered by member), in date order
+    "CREATE INDEX IF NOT EXISTS idx_transactions_member ON transactions (member_id, date)",
+    # Open sessions by check-in time: the "active today" count and the stale-session sweep (maintenance.py)
+    "CREATE INDEX IF NOT EXISTS idx_attendance_stale ON attendance (checkin_at) WHERE checkout_at IS NULL",
+    # Membership expiry sweep: an end_date range within each status touches only members whose status changes
+    "CREATE INDEX IF NOT EXISTS idx_members_status_end ON members (membership_status, end_date)",
+]
+
+# Dashboard counters, kept current by the triggers below so update_stats reads O(1) rows
+STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS revenue_daily (
+        day TEXT PRIMARY KEY,
+        amount REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS revenue_monthly (
+        month TEXT PRIMARY KEY,
+        amount REAL NOT NULL DEFAULT 0
+    )
+    """,
+    # Finance reports (revenue.py): one row per day, membership type and payment method
+    """
+    CREATE TABLE IF NOT EXISTS revenue_breakdown (
+        day TEXT NOT NULL,
+        membership_type TEXT NOT NULL,
+        payment_method TEXT NOT NULL,
+        payments INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, membership_type, payment_method)
+    ) WITHOUT ROWID
+    """,
+]
+
+# Columns added to tables created before schema versioning: (table, column, type)
+ADDED_COLUMNS = [
+    ("transactions", "membership_type", "TEXT"),
+    ("transactions", "payment_method", "TEXT"),
+    # Set when maintenance closed a session nobody checked out; its duration is not counted
+    ("attendance", "auto_closed", "INTEGER NOT NULL DEFAULT 0"),
+    # active, expiring or expired; kept current from end_date by maintenance.py
+    ("members", "membership_status", "TEXT NOT NULL DEFAULT 'active'"),
+]
+
+# Per-year archives of closed attendance sessions (archive.py); path is relative to the database file
+ARCHIVE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS attendance_archives (
+        year INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        archived_before TEXT NOT NULL
+    )
+    """,
+]
+
+# One row per maintenance job run (maintenance.py): when, how long and how many rows it changed
+MAINTENANCE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        id INTEGER PRIMARY KEY,
+        job TEXT NOT NULL,
+        started_at TEXT NOT NULL,
+        duration_ms REAL NOT NULL,
+        rows INTEGER NOT NULL,
+        detail TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_maintenance_runs_job ON maintenance_runs (job, started_at)",
+]
+
+# Attendance analytics rollups (analytics.py), filled in one pass per completed day
+ANALYTICS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS attendance_daily (
+        day TEXT PRIMARY KEY,
+        visits INTEGER NOT NULL DEFAULT 0,
+        closed INTEGER NOT NULL DEFAULT 0,
+        minutes REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attendance_hourly (
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        visits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, hour)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attendance_member_monthly (
+        member_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        visits INTEGER NOT NULL DEFAULT 0,
+        closed INTEGER NOT NULL DEFAULT 0,
+        minutes REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (member_id, month)
+    ) WITHOUT ROWID
+    """,
+    # Reports read a range of months across all members
+    """
+    CREATE INDEX IF NOT EXISTS idx_attendance_member_monthly_month
+        ON attendance_member_monthly (month, visits, closed, minutes)
+    """,
+]
+
+# Full-text member search (trigram tokenizer: substring matches on name, phone and address)
+SEARCH_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS members_fts USING fts5(
+        name, phone, address,
+        content='members', content_rowid='id', tokenize='trigram'
+    )
+"""
+
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_members_fts_insert AFTER INSERT ON members
+    BEGIN
+        INSERT INTO members_fts (rowid, name, phone, address) VALUES (new.id, new.name, new.phone, new.address);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_members_fts_delete AFTER DELETE ON members
+    BEGIN
+        INSERT INTO members_fts (members_fts, rowid, name, phone, address)
+            VALUES ('delete', old.id, old.name, old.phone, old.address);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_members_fts_update AFTER UPDATE OF name, phone, address ON members
+    BEGIN
+        INSERT INTO members_fts (members_fts, rowid, name, phone, address)
+            VALUES ('delete', old.id, old.name, old.phone, old.address);
+        INSERT INTO members_fts (rowid, name, phone, address) VALUES (new.id, new.name, new.phone, new.address);
+    END
+    """,
+]
+
+STATS_COUNTERS = ("members_total", "checked_in")
+
+STATS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_members_count_insert AFTER INSERT ON members
+    BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'members_total';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_members_count_delete AFTER DELETE ON members
+    BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'members_total';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_open_insert AFTER INSERT ON attendance
+    WHEN new.checkout_time IS NULL
+    BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'checked_in';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_open_update AFTER UPDATE OF checkout_time ON attendance
+    WHEN (old.checkout_time IS NULL) != (new.checkout_time IS NULL)
+    BEGIN
+        UPDATE stats_counters
+        SET value = value + CASE WHEN new.checkout_time IS NULL THEN 1 ELSE -1 END
+        WHERE name = 'checked_in';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_open_delete AFTER DELETE ON attendance
+    WHEN old.checkout_time IS NULL
+    BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'checked_in';
+    END
+    """,
+    # Payments without a date (legacy rows) roll up under the '' day and month, as in revenue_breakdown
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_revenue_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO revenue_daily (day, amount) VALUES (COALESCE(new.date, ''), new.amount_paid)
+            ON CONFLICT (day) DO UPDATE SET amount = amount + excluded.amount;
+        INSERT INTO revenue_monthly (month, amount) VALUES (substr(COALESCE(new.date, ''), 1, 7), new.amount_paid)
+            ON CONFLICT (month) DO UPDATE SET amount = amount + excluded.amount;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_revenue_delete AFTER DELETE ON transactions
+    BEGIN
+        UPDATE revenue_daily SET amount = amount - old.amount_paid WHERE day = COALESCE(old.date, '');
+        UPDATE revenue_monthly SET amount = amount - old.amount_paid WHERE month = substr(COALESCE(old.date, ''), 1, 7);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_revenue_update AFTER UPDATE OF amount_paid, date ON transactions
+    BEGIN
+        UPDATE revenue_daily SET amount = amount - old.amount_paid WHERE day = COALESCE(old.date, '');
+        UPDATE revenue_monthly SET amount = amount - old.amount_paid WHERE month = substr(COALESCE(old.date, ''), 1, 7);
+        INSERT INTO revenue_daily (day, amount) VALUES (COALESCE(new.date, ''), new.amount_paid)
+            ON CONFLICT (day) DO UPDATE SET amount = amount + excluded.amount;
+        INSERT INTO revenue_monthly (month, amount) VALUES (substr(COALESCE(new.date, ''), 1, 7), new.amount_paid)
+            ON CONFLICT (month) DO UPDATE SET amount = amount + excluded.amount;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_breakdown_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO revenue_breakdown (day, membership_type, payment_method, payments, amount)
+            VALUES (COALESCE(new.date, ''), COALESCE(new.membership_type, 'Unknown'),
+                    COALESCE(new.payment_method, 'Unknown'), 1, new.amount_paid)
+            ON CONFLICT (day, membership_type, payment_method) DO UPDATE
+            SET payments = payments + 1, amount = amount + excluded.amount;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_breakdown_delete AFTER DELETE ON transactions
+    BEGIN
+        UPDATE revenue_breakdown SET payments = payments - 1, amount = amount - old.amount_paid
+        WHERE day = COALESCE(old.date, '') AND membership_type = COALESCE(old.membership_type, 'Unknown')
+          AND payment_method = COALESCE(old.payment_method, 'Unknown');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_breakdown_update
+    AFTER UPDATE OF amount_paid, date, membership_type, payment_method ON transactions
+    BEGIN
+        UPDATE revenue_breakdown SET payments = payments - 1, amount = amount - old.amount_paid
+        WHERE day = COALESCE(old.date, '') AND membership_type = COALESCE(old.membership_type, 'Unknown')
+          AND payment_method = COALESCE(old.payment_method, 'Unknown');
+        INSERT INTO revenue_breakdown (day, membership_type, payment_method, payments, amount)
+            VALUES (COALESCE(new.date, ''), COALESCE(new.membership_type, 'Unknown'),
+                    COALESCE(new.payment_method, 'Unknown'), 1, new.amount_paid)
+            ON CONFLICT (day, membership_type, payment_method) DO UPDATE
+            SET payments = payments + 1, amount = amount + excluded.amount;
+    END
+    """,
+]
+
+
+# The tables, indexes and triggers as they stood before schema versioning (migration 1)
+BASELINE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS members (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        age INTEGER,
+        gender TEXT,
+        phone TEXT,
+        address TEXT,
+        membership_type TEXT,
+        start_date TEXT,
+        end_date TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        member_id INTEGER,
+        checkin_time TEXT,
+        checkout_time TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        member_id INTEGER,
+        amount_paid REAL,
+        date TEXT,
+        membership_type TEXT,
+        payment_method TEXT
+    )
+    """,
+]
+
+BASELINE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_members_type ON members (membership_type)",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_open_session ON attendance (member_id, checkout_time, checkin_time)",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_open ON attendance (member_id) WHERE checkout_time IS NULL",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_checkin ON attendance (checkin_time, checkout_time)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_member ON transactions (member_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_attendance_stale ON attendance (checkin_time) WHERE checkout_time IS NULL",
+    "CREATE INDEX IF NOT EXISTS idx_members_status_end ON members (membership_status, end_date)",
+]
+
+# Migration 2: the core tables with types, constraints and integer epoch timestamps.
+# The TEXT timestamps stay the columns the app writes (and exports, archives and
+# the service return); checkin_at/checkout_at are derived from them on write, so
+# range filters and durations compare integers instead of parsing text.
+# Ages a member may have; the members CHECK, the migration's cleanup and imports share them
+MIN_AGE, MAX_AGE = 0, 150
+
+TYPED_TABLES = {
+    "members": (f"""
+        CREATE TABLE members_new (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            age INTEGER,
+            name TEXT NOT NULL,
+            age INTEGER CHECK (age IS NULL OR (typeof(age) = 'integer' AND age BETWEEN {MIN_AGE} AND {MAX_AGE})),
             gender TEXT,
             phone TEXT,
             address TEXT,
             membership_type TEXT,
-            start_date TEXT,
-            end_date TEXT
+            start_date TEXT CHECK (start_date IS NULL OR date(start_date) IS start_date),
+            end_date TEXT CHECK (end_date IS NULL OR date(end_date) IS end_date),
+            membership_status TEXT NOT NULL DEFAULT 'active'
+                CHECK (membership_status IN ('active', 'expiring', 'expired'))
         )
-    """)
-
-    # Attendance Table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS attendance (
+    """, f"""
+        INSERT INTO members_new
+        SELECT id, COALESCE(name, ''),
+               CASE WHEN CAST(age AS INTEGER) BETWEEN {MIN_AGE} AND {MAX_AGE} AND CAST(age AS INTEGER) = age
+                    THEN CAST(age AS INTEGER) END,
+               gender, phone, address, membership_type, date(start_date), date(end_date),
+               CASE WHEN membership_status IN ('active', 'expiring', 'expired') THEN membership_status ELSE 'active' END
+        FROM members
+    """),
+    "attendance": ("""
+        CREATE TABLE attendance_new (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            member_id INTEGER,
-            checkin_time TEXT,
-            checkout_time TEXT
+            member_id INTEGER REFERENCES members (id) ON DELETE SET NULL,
+            checkin_time TEXT NOT NULL CHECK (datetime(checkin_time) IS NOT NULL),
+            checkout_time TEXT CHECK (checkout_time IS NULL OR checkout_time >= checkin_time),
+            auto_closed INTEGER NOT NULL DEFAULT 0 CHECK (auto_closed IN (0, 1)),
+            checkin_at INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', checkin_time) AS INTEGER)) STORED,
+            checkout_at INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', checkout_time) AS INTEGER)) STORED
         )
-    """)
-
-    # Transactions Table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
+    """, """
+        INSERT INTO attendance_new (id, member_id, checkin_time, checkout_time, auto_closed)
+        SELECT id, (SELECT m.id FROM members m WHERE m.id = a.member_id), checkin_time,
+               CASE WHEN checkout_time < checkin_time THEN checkin_time ELSE checkout_time END,
+               auto_closed != 0
+        FROM attendance a
+        WHERE datetime(checkin_time) IS NOT NULL
+    """),
+    "transactions": ("""
+        CREATE TABLE transactions_new (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            member_id INTEGER,
-            amount_paid REAL,
-            date TEXT
+            member_id INTEGER REFERENCES members (id) ON DELETE SET NULL,
+            amount_paid REAL NOT NULL CHECK (amount_paid >= 0),
+            date TEXT,
+            membership_type TEXT,
+            payment_method TEXT
         )
+    """, """
+        INSERT INTO transactions_new
+        SELECT id, (SELECT m.id FROM members m WHERE m.id = t.member_id), COALESCE(amount_paid, 0),
+               date, membership_type, payment_method
+        FROM transactions t
+    """),
+}
+
+# Attendance rows with a check-in time the new CHECK rejects are kept here rather than copied
+REJECTED_ATTENDANCE = [
+    """
+    CREATE TABLE IF NOT EXISTS attendance_rejected (
+        id INTEGER PRIMARY KEY,
+        member_id INTEGER,
+        checkin_time TEXT,
+        checkout_time TEXT,
+        auto_closed INTEGER,
+        rejected_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    INSERT OR IGNORE INTO attendance_rejected (id, member_id, checkin_time, checkout_time, auto_closed)
+    SELECT id, member_id, checkin_time, checkout_time, auto_closed FROM attendance
+    WHERE datetime(checkin_time) IS NULL
+    """,
+]
+
+
+def create_indexes_and_triggers(conn):
+    """Create the current indexes and triggers on the core tables if they are missing"""
+    for statement in INDEXES + STATS_TRIGGERS:
+        conn.execute(statement)
+    if has_search_index(conn):
+        for statement in SEARCH_TRIGGERS:
+            conn.execute(statement)
+
+
+def _baseline(conn):
+    """Migration 1: everything created before schema versioning, on new and pre-versioning databases"""
+    for statement in BASELINE_TABLES:
+        conn.execute(statement)
+
+    for table, column, kind in ADDED_COLUMNS:
+        if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    for statement in BASELINE_INDEXES:
+        conn.execute(statement)
+
+    # Dashboard counters and revenue rollups; seed them from the raw tables the first time they appear
+    seed_stats = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ('stats_counters', 'revenue_breakdown')"
+    ).fetchone()[0] < 2
+    for statement in STATS_TABLES + STATS_TRIGGERS:
+        conn.execute(statement)
+    if seed_stats:
+        import stats
+        stats.rebuild(conn)
+
+    for statement in ANALYTICS_TABLES + ARCHIVE_TABLES + MAINTENANCE_TABLES:
+        conn.execute(statement)
+
+    # Member search index; SQLite builds without FTS5/trigram fall back to LIKE scans
+    if not has_search_index(conn):
+        try:
+            conn.execute(SEARCH_TABLE)
+        except sqlite3.OperationalError:
+            pass
+        else:
+            conn.execute("INSERT INTO members_fts (members_fts) VALUES ('rebuild')")
+    if has_search_index(conn):
+        for statement in SEARCH_TRIGGERS:
+            conn.execute(statement)
+
+
+def _typed_tables(conn):
+    """Migration 2: rebuild members, attendance and transactions with TYPED_TABLES.
+
+    Values the constraints reject are cleaned on the way: unparseable ages and
+    dates become NULL, references to deleted members become NULL, and
+    check-outs before their check-in are clamped to it. Sessions whose
+    check-in time cannot be parsed are moved to attendance_rejected and
+    logged. Indexes and triggers go with the old tables and are created again
+    afterwards, and the dashboard counters are rebuilt from the new tables.
+    """
+    create_rejected, move_rejected = REJECTED_ATTENDANCE
+    conn.execute(create_rejected)
+    rejected = conn.execute(move_rejected).rowcount
+    if rejected:
+        logger.warning("%d attendance rows with an unparseable check-in time moved to attendance_rejected", rejected)
+    for table, (create, copy) in TYPED_TABLES.items():
+        conn.execute(create)
+        conn.execute(copy)
+        sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        if sequence is not None:
+            # Keep ids of deleted rows from being handed out again
+            conn.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?", (sequence[0], table))
+    create_indexes_and_triggers(conn)
+    problems = conn.execute("PRAGMA foreign_key_check").fetchall()
+    if problems:
+        raise sqlite3.IntegrityError(f"foreign key violations after migration: {problems[:5]}")
+    import stats
+    stats.rebuild(conn)
+
+
+# Bumped whenever a row cached by another table's readers changes, so caches
+# (repository.ProfileCache) can tell their rows are stale across processes
+CHANGE_COUNTER_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS change_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO change_counters (name, value) VALUES ('member_profiles', 0)",
+]
+
+CHANGE_COUNTER_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_member_profiles_update AFTER UPDATE OF name, phone, membership_type ON members
+    BEGIN
+        UPDATE change_counters SET value = value + 1 WHERE name = 'member_profiles';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_member_profiles_delete AFTER DELETE ON members
+    BEGIN
+        UPDATE change_counters SET value = value + 1 WHERE name = 'member_profiles';
+    END
+    """,
+]
+
+
+def _change_counters(conn):
+    """Migration 3: the member_profiles change counter behind the profile cache"""
+    for statement in CHANGE_COUNTER_TABLES + CHANGE_COUNTER_TRIGGERS:
+        conn.execute(statement)
+
+
+# Issued receipts (receipt_generator.py). The AUTOINCREMENT number is the receipt number, so
+# numbers only go up and are never handed out twice; the rendered PDF is stored once per content hash.
+RECEIPT_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS receipt_blobs (
+        sha256 TEXT PRIMARY KEY,
+        pdf BLOB NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS receipts (
+        number INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER REFERENCES transactions (id) ON DELETE SET NULL,
+        member_id INTEGER REFERENCES members (id) ON DELETE SET NULL,
+        issued_at TEXT NOT NULL,
+        amount REAL NOT NULL,
+        payment_method TEXT,
+        pdf_sha256 TEXT REFERENCES receipt_blobs (sha256)
+    )
+    """,
+    # A member's receipts newest first, and the date-range lookup
+    "CREATE INDEX IF NOT EXISTS idx_receipts_member ON receipts (member_id, issued_at)",
+    "CREATE INDEX IF NOT EXISTS idx_receipts_issued ON receipts (issued_at)",
+    "CREATE INDEX IF NOT EXISTS idx_receipts_transaction ON receipts (transaction_id)",
+]
+
+
+def _receipts(conn):
+    """Migration 4: the receipt register and its PDF blob store"""
+    for statement in RECEIPT_TABLES:
+        conn.execute(statement)
+
+
+# A member's visits newest first and their totals (member detail window), read from the index alone
+MEMBER_HISTORY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_attendance_member_history "
+    "ON attendance (member_id, checkin_time, checkout_time, auto_closed)",
+]
+
+
+def _member_history(conn):
+    """Migration 5: the per-member visit history index"""
+    for statement in MEMBER_HISTORY_INDEXES:
+        conn.execute(statement)
+
+
+# Multi-branch sync (sync.py). Columns shared between branches; membership_status is left out,
+# every branch derives it from end_date (maintenance.py).
+SYNC_COLUMNS = {
+    "members": ("name", "age", "gender", "phone", "address", "membership_type", "start_date", "end_date"),
+    "attendance": ("member_id", "checkin_time", "checkout_time", "auto_closed"),
+    "transactions": ("member_id", "amount_paid", "date", "membership_type", "payment_method"),
+}
+
+# change_log keeps one row per changed row, replaced on every change (delete and insert: an OR REPLACE
+# inside a trigger gives way to the policy of a cascading foreign-key action), so its AUTOINCREMENT seq is
+# this branch's sequence number and a delta since seq N reads only what changed after N.
+# sync_state.applying is set while a delta is imported, so applied changes are not logged again.
+SYNC_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        branch TEXT NOT NULL,
+        applying INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO sync_state (id, branch) VALUES (1, lower(hex(randomblob(4))))",
+    """
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('upsert', 'delete')),
+        changed_at TEXT NOT NULL,
+        UNIQUE (table_name, row_id)
+    )
+    """,
+    # Per other branch: the last of its seqs applied here, and the last of ours it has applied
+    """
+    CREATE TABLE IF NOT EXISTS sync_peers (
+        branch TEXT PRIMARY KEY,
+        applied_seq INTEGER NOT NULL DEFAULT 0,
+        acked_seq INTEGER NOT NULL DEFAULT 0,
+        synced_at TEXT
+    )
+    """,
+    # Rows known under another branch's id, and the version of the last change applied to each
+    """
+    CREATE TABLE IF NOT EXISTS sync_rows (
+        table_name TEXT NOT NULL,
+        origin TEXT NOT NULL,
+        origin_id INTEGER NOT NULL,
+        local_id INTEGER,
+        version_at TEXT NOT NULL,
+        version_branch TEXT NOT NULL,
+        PRIMARY KEY (table_name, origin, origin_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_rows_local ON sync_rows (table_name, local_id)",
+    # Synced rows whose member has not arrived yet (exported by a branch not imported from so far)
+    """
+    CREATE TABLE IF NOT EXISTS sync_pending (
+        table_name TEXT NOT NULL,
+        local_id INTEGER NOT NULL,
+        ref_origin TEXT NOT NULL,
+        ref_id INTEGER NOT NULL,
+        PRIMARY KEY (table_name, local_id)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def _change_log_trigger(table, event, row, op):
+    columns = f" OF {', '.join(SYNC_COLUMNS[table])}" if event == "UPDATE" else ""
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_change_log_{event.lower()} AFTER {event}{columns} ON {table}
+    WHEN (SELECT applying FROM sync_state) = 0
+    BEGIN
+        DELETE FROM change_log WHERE table_name = '{table}' AND row_id = {row}.id;
+        INSERT INTO change_log (table_name, row_id, op, changed_at)
+        VALUES ('{table}', {row}.id, '{op}', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """
+
+
+# Archiving deletes attendance rows from gym.db without the sessions having gone, so attendance
+# has no delete trigger
+SYNC_TRIGGERS = [
+    _change_log_trigger(table, event, "OLD" if event == "DELETE" else "NEW", "delete" if event == "DELETE" else "upsert")
+    for table, events in (
+        ("members", ("INSERT", "UPDATE", "DELETE")),
+        ("attendance", ("INSERT", "UPDATE")),
+        ("transactions", ("INSERT", "UPDATE", "DELETE")),
+    )
+    for event in events
+]
+
+
+def _change_log(conn):
+    """Migration 6: the change log and bookkeeping behind sync.py; existing members are logged once"""
+    for statement in SYNC_TABLES + SYNC_TRIGGERS:
+        conn.execute(statement)
+    conn.execute("""
+        INSERT OR IGNORE INTO change_log (table_name, row_id, op, changed_at)
+        SELECT 'members', id, 'upsert', strftime('%Y-%m-%d %H:%M:%f', 'now') FROM members ORDER BY id
     """)
 
-    conn.commit()
-    conn.close()
+
+def _undated_revenue(conn):
+    """Migration 7: recreate the revenue triggers so payments without a date roll up under '', and rebuild"""
+    for name in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_transactions_revenue_{name}")
+    create_indexes_and_triggers(conn)
+    import stats
+    stats.rebuild(conn)
+
+
+# Ordered schema migrations; a database at PRAGMA user_version N has had the first N applied
+MIGRATIONS = [
+    _baseline,
+    _typed_tables,
+    _change_counters,
+    _receipts,
+    _member_history,
+    _change_log,
+    _undated_revenue,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn, target=SCHEMA_VERSION) -> int:
+    """Apply the migrations a database is missing, each in its own transaction; returns the new version.
+
+    conn must be in autocommit mode (isolation_level=None). An up-to-date
+    database costs one PRAGMA read and runs no CREATE statements.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"database schema version {version} is newer than this app ({SCHEMA_VERSION})")
+    while version < target:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the write lock
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < target:
+                MIGRATIONS[version](conn)
+                version += 1
+                conn.execute(f"PRAGMA user_version = {version}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return version
+
+
+def connect_db(path=None, version=SCHEMA_VERSION):
+    """Bring the database at path up to schema version (the latest by default)"""
+    conn = sqlite3.connect(path or DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        migrate(conn, version)
+    finally:
+        conn.close()
+
+
+def has_search_index(conn) -> bool:
+    """True if the members_fts full-text index exists in this database"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='members_fts'"
+    ).fetchone() is not None
+
+
+@contextmanager
+def bulk_member_insert(conn):
+    """Index members inserted inside the block with one statement instead of per row.
+
+    Must run inside a write transaction: the per-row search trigger is
+    dropped and recreated within it, so other connections never see the
+    schema without it.
+    """
+    if not has_search_index(conn):
+        yield
+        return
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM members").fetchone()[0]
+    conn.execute("DROP TRIGGER IF EXISTS trg_members_fts_insert")
+    yield
+    conn.execute("""
+        INSERT INTO members_fts (rowid, name, phone, address)
+        SELECT id, name, phone, address FROM members WHERE id > ?
+    """, (last_id,))
+    conn.execute(SEARCH_TRIGGERS[0])
+
+
+class Database:
+    """Long-lived SQLite connections to one database file, one per thread"""
+
+    def __init__(self, path=None):
+        self.path = path or DB_PATH
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._watch = None
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.open_connection()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    def open_connection(self) -> sqlite3.Connection:
+        """Open a new tuned connection; it is closed with the others in close()
+
+        Its statements are timed in sql_stats (the diagnostics window).
+        """
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=InstrumentedConnection,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def data_version(self) -> int:
+        """PRAGMA data_version on a connection that never writes, so every commit changes it.
+
+        It reads the WAL index in shared memory, not the file, so polling it is cheap.
+        """
+        with self._lock:
+            if self._watch is None:
+                self._watch = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+                self._connections.append(self._watch)
+            return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def execute(self, sql, params=()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, params)
+
+    @contextmanager
+    def transaction(self):
+        """Run the block inside one write transaction; nested blocks join the outer one"""
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    def close(self):
+        """Close every connection opened through this instance"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._watch = None
+        self._local = threading.local()
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path=None) -> Database:
+    """Return the shared Database for path, creating the schema on first use"""
+    key = os.path.abspath(path or DB_PATH)
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            connect_db(key)
+            database = _databases[key] = Database(key)
+        return database
+
+
+def close_databases():
+    """Close all shared databases (used on shutdown and by tests)"""
+    with _databases_lock:
+        for database in _databases.values():
+            database.close()
+        _databases.clear()
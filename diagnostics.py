@@ -0,0 +1,179 @@
+import json
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from background import run_in_background
+from repository import get_repository
+from styles import ModernStyles
+
+class DiagnosticsWindow(tk.Toplevel):
+    """SQL timings per statement, lock waits and the slow-query log (see sql_stats.py)"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Diagnostics")
+        self.geometry("1000x700")
+        self.configure(bg=ModernStyles.COLORS['background'])
+
+        # Configure modern styles
+        ModernStyles.configure_styles()
+
+        self.snapshot = None
+        self.create_widgets()
+        self.load_diagnostics()
+
+    def create_widgets(self):
+        """Create diagnostics interface"""
+        # Header
+        header = tk.Frame(self, bg=ModernStyles.COLORS['primary'])
+        header.pack(fill="x")
+
+        title = tk.Label(
+            header,
+            text="Query Diagnostics",
+            font=('Segoe UI', 24, 'bold'),
+            bg=ModernStyles.COLORS['primary'],
+            fg=ModernStyles.COLORS['surface']
+        )
+        title.pack(pady=20)
+
+        # Buttons and lock-wait summary
+        action_frame = tk.Frame(self, bg=ModernStyles.COLORS['surface'])
+        action_frame.pack(fill="x", padx=20, pady=10)
+
+        for text, command, color in (
+            ("🔄 Refresh", self.load_diagnostics, 'accent'),
+            ("💾 Save JSON", self.save_json, 'primary'),
+            ("🧹 Reset", self.reset, 'warning'),
+        ):
+            tk.Button(
+                action_frame,
+                text=text,
+                command=command,
+                font=('Segoe UI', 12, 'bold'),
+                bg=ModernStyles.COLORS[color],
+                fg=ModernStyles.COLORS['surface'],
+                activebackground=ModernStyles.COLORS[color],
+                activeforeground=ModernStyles.COLORS['surface'],
+                bd=0,
+                padx=20,
+                pady=8,
+                cursor="hand2"
+            ).pack(side="left", padx=10)
+
+        self.summary_label = tk.Label(
+            action_frame,
+            text="",
+            font=('Segoe UI', 11),
+            bg=ModernStyles.COLORS['surface'],
+            fg=ModernStyles.COLORS['text_secondary'],
+            justify="left"
+        )
+        self.summary_label.pack(side="left", padx=20)
+
+        # Per-statement timings
+        statements_frame = tk.Frame(self, bg=ModernStyles.COLORS['surface'])
+        statements_frame.pack(fill="both", expand=True, padx=20, pady=10)
+
+        scrollbar = ttk.Scrollbar(statements_frame)
+        scrollbar.pack(side="right", fill="y")
+
+        cols = ("Statement", "Calls", "Total ms", "p50", "p95", "p99", "Max ms", "Rows", "Errors")
+        self.tree = ttk.Treeview(
+            statements_frame,
+            columns=cols,
+            show="headings",
+            height=10,
+            yscrollcommand=scrollbar.set,
+            style='Modern.Treeview'
+        )
+        for col in cols:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=380 if col == "Statement" else 70, anchor="w" if col == "Statement" else "e")
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar.config(command=self.tree.yview)
+
+        # Slow-query log: pick an entry to see its plan
+        slow_frame = tk.Frame(self, bg=ModernStyles.COLORS['surface'])
+        slow_frame.pack(fill="both", expand=True, padx=20, pady=10)
+
+        self.slow_list = tk.Listbox(slow_frame, font=('Consolas', 10), height=8)
+        self.slow_list.pack(side="left", fill="both", expand=True)
+        self.slow_list.bind("<<ListboxSelect>>", self.show_plan)
+
+        self.plan_text = tk.Text(slow_frame, font=('Consolas', 10), height=8, width=50, wrap="word")
+        self.plan_text.pack(side="left", fill="both", expand=True, padx=(10, 0))
+
+    def load_diagnostics(self):
+        """Fetch the current statistics off the UI thread"""
+        run_in_background(
+            self, get_repository().diagnostics,
+            on_success=self.show_diagnostics,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load diagnostics: {str(e)}")
+        )
+
+    def show_diagnostics(self, snapshot):
+        """Fill the statement table, lock-wait summary and slow-query log"""
+        self.snapshot = snapshot
+        self.tree.delete(*self.tree.get_children())
+        for row in snapshot["statements"]:
+            self.tree.insert("", "end", values=(
+                row["statement"], row["calls"], f"{row['total_ms']:.1f}", row["p50_ms"], row["p95_ms"],
+                row["p99_ms"], f"{row['max_ms']:.1f}", row["rows"], row["errors"],
+            ))
+
+        waits = snapshot["lock_waits"]
+        self.summary_label.config(text=(
+            f"Since {snapshot['since']} · lock waits {waits['count']} "
+            f"({waits['total_ms']:.1f} ms, max {waits['max_ms']:.1f} ms) · busy errors {waits['busy_errors']}\n"
+            f"Slow queries ≥ {snapshot['slow_query_ms']:g} ms: {len(snapshot['slow_queries'])}"
+            + self.cache_summary(snapshot.get("profile_cache"))
+        ))
+
+        self.slow_list.delete(0, "end")
+        for entry in reversed(snapshot["slow_queries"]):
+            self.slow_list.insert("end", f"{entry['at']}  {entry['ms']:>9.1f} ms  {entry['statement']}")
+        self.plan_text.delete("1.0", "end")
+
+    @staticmethod
+    def cache_summary(cache):
+        if not cache:
+            return ""
+        return (
+            f" · profile cache {cache['size']}/{cache['capacity']}, {cache['hits']} hits, "
+            f"{cache['misses']} misses ({cache['hit_rate']:.0%}), {cache['invalidations']} invalidations"
+        )
+
+    def show_plan(self, event=None):
+        """Show the statement and query plan of the selected slow query"""
+        selection = self.slow_list.curselection()
+        if not selection or self.snapshot is None:
+            return
+        entry = list(reversed(self.snapshot["slow_queries"]))[selection[0]]
+        self.plan_text.delete("1.0", "end")
+        self.plan_text.insert("end", entry["statement"] + "\n\n" + "\n".join(entry["plan"] or ["(no plan)"]))
+
+    def save_json(self):
+        """Write the statistics shown to a JSON file"""
+        if self.snapshot is None:
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title="Save Diagnostics",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot, f, indent=2)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save diagnostics: {str(e)}")
+
+    def reset(self):
+        """Clear the statistics and start counting again"""
+        run_in_background(
+            self, get_repository().reset_diagnostics,
+            on_success=lambda result: self.load_diagnostics(),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to reset diagnostics: {str(e)}")
+        )
@@ -0,0 +1,247 @@
+"""Streaming exports of members, attendance and transactions.
+
+Rows are pulled from one SQLite cursor with ``fetchmany`` and passed through
+generators straight into the CSV, JSON Lines or XLSX writer, so memory use
+stays flat however many rows the table holds. Date-range and member filters
+become WHERE clauses; nothing is filtered in Python. The cursor reads one
+snapshot of the database (WAL), so an export is consistent even while the
+desks keep writing.
+
+Headless usage::
+
+    python export.py transactions ledger.csv.gz [--from 2024-01-01] [--to 2025-01-01] [--member 12 15]
+    python export.py attendance attendance.xlsx
+    python export.py members members.jsonl
+
+The format follows the file extension (``.csv``, ``.jsonl``, ``.xlsx``);
+a trailing ``.gz`` compresses CSV and JSON Lines output. XLSX needs openpyxl.
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+from typing import NamedTuple
+
+import archive
+from db import get_database
+
+FETCH_SIZE = 5000
+PROGRESS_EVERY = 50_000
+FORMATS = ("csv", "jsonl", "xlsx")
+# Excel's limit, header included; longer exports continue on another sheet
+XLSX_MAX_ROWS = 1_048_576
+
+
+class Dataset(NamedTuple):
+    columns: tuple
+    sql: str
+    date_column: str
+    member_column: str
+    order_by: str
+    # Order for date-range exports: the indexed date column, so the index walk needs no sort
+    range_order: str
+    # attendance also lives in the per-year archives (archive.py)
+    archived: bool = False
+
+
+DATASETS = {
+    "members": Dataset(
+        columns=("id", "name", "age", "gender", "phone", "address", "membership_type", "start_date", "end_date"),
+        sql="SELECT id, name, age, gender, phone, address, membership_type, start_date, end_date FROM members",
+        date_column="start_date",
+        member_column="id",
+        order_by="id",
+        range_order="id",
+    ),
+    "attendance": Dataset(
+        # auto_closed=1: checkout_time is when the stale-session job closed it, not a real check-out
+        columns=("id", "member_id", "name", "checkin_time", "checkout_time", "auto_closed"),
+        sql="""SELECT a.id, a.member_id, m.name, a.checkin_time, a.checkout_time, a.auto_closed
+               FROM {attendance} a LEFT JOIN main.members m ON m.id = a.member_id""",
+        date_column="a.checkin_time",
+        member_column="a.member_id",
+        order_by="id",
+        range_order="checkin_time",
+        archived=True,
+    ),
+    "transactions": Dataset(
+        columns=("id", "member_id", "name", "amount_paid", "date", "membership_type", "payment_method"),
+        sql="""SELECT t.id, t.member_id, m.name, t.amount_paid, t.date, t.membership_type, t.payment_method
+               FROM transactions t LEFT JOIN members m ON m.id = t.member_id""",
+        date_column="t.date",
+        member_column="t.member_id",
+        order_by="id",
+        range_order="date",
+    ),
+}
+
+
+class ExportResult(NamedTuple):
+    rows: int
+    path: str
+
+
+def build_query(name, start=None, end=None, member_ids=None, conn=None):
+    """Return (sql, params) for dataset name over [start, end) (YYYY-MM-DD) and the given members.
+
+    Attendance is read from the archives too when conn is given and the range reaches them.
+    """
+    dataset = DATASETS[name]
+    where, params = [], []
+    if start:
+        where.append(f"{dataset.date_column} >= ?")
+        params.append(start)
+    if end:
+        where.append(f"{dataset.date_column} < ?")
+        params.append(end)
+    if member_ids is not None:
+        where.append(f"{dataset.member_column} IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps([int(member_id) for member_id in member_ids]))
+    sql = dataset.sql
+    if where:
+        sql += f" WHERE {' AND '.join(where)}"
+    if dataset.archived:
+        if conn is None:
+            sql, params = sql.format(attendance="main.attendance"), params
+        else:
+            sql, params = archive.union(conn, sql, params, start, end)
+    # SQLite streams rows as it walks the table or index instead of sorting them first,
+    # and merges the UNION ALL arms of archived tables in order
+    order = dataset.range_order if start or end else dataset.order_by
+    sql += f" ORDER BY {dataset.columns.index(order) + 1}"
+    return sql, params
+
+
+def iter_rows(db, name, start=None, end=None, member_ids=None, fetch_size=FETCH_SIZE):
+    """Yield the rows of dataset name, fetch_size at a time from one cursor"""
+    conn = db.connection()
+    sql, params = build_query(name, start, end, member_ids, conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def detect_format(path):
+    """(format, gzip) from a file name such as ``ledger.csv.gz``"""
+    base, ext = os.path.splitext(path.lower())
+    compress = ext == ".gz"
+    if compress:
+        ext = os.path.splitext(base)[1]
+    fmt = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".xlsx": "xlsx"}.get(ext)
+    if fmt is None:
+        raise ValueError(f"cannot tell the export format from {path}")
+    return fmt, compress
+
+
+def _open_text(path, compress):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def write_csv(f, columns, rows):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    writer.writerows(rows)
+
+
+def write_jsonl(f, columns, rows):
+    for row in rows:
+        f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        f.write("\n")
+
+
+def write_xlsx(path, title, columns, rows):
+    """Write rows to a write-only workbook, which streams each row to disk"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheets = written = 0
+    for row in rows:
+        if sheet is None or written == XLSX_MAX_ROWS:
+            sheets += 1
+            sheet = workbook.create_sheet(title if sheets == 1 else f"{title} ({sheets})")
+            sheet.append(columns)
+            written = 1
+        sheet.append(row)
+        written += 1
+    if sheet is None:
+        workbook.create_sheet(title).append(columns)
+    workbook.save(path)
+
+
+def export(name, path, fmt=None, compress=None, start=None, end=None, member_ids=None,
+           db=None, progress=None, progress_every=PROGRESS_EVERY, fetch_size=FETCH_SIZE):
+    """Export dataset name to path; returns ExportResult.
+
+    fmt and compress default to the file extension. progress(rows) is called
+    every progress_every rows and once more when the export is complete.
+    """
+    if name not in DATASETS:
+        raise ValueError(f"unknown dataset: {name}")
+    if fmt is None:
+        fmt, gz = detect_format(path)
+        compress = gz if compress is None else compress
+    elif compress is None:
+        compress = path.lower().endswith(".gz")
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    if fmt == "xlsx" and compress:
+        raise ValueError("XLSX files are already compressed; export without gzip")
+
+    db = db or get_database()
+    columns = DATASETS[name].columns
+    count = 0
+
+    def rows():
+        nonlocal count
+        for row in iter_rows(db, name, start, end, member_ids, fetch_size):
+            count += 1
+            if progress is not None and count % progress_every == 0:
+                progress(count)
+            yield row
+
+    if fmt == "xlsx":
+        write_xlsx(path, name, columns, rows())
+    else:
+        with _open_text(path, compress) as f:
+            (write_csv if fmt == "csv" else write_jsonl)(f, columns, rows())
+    if progress is not None:
+        progress(count)
+    return ExportResult(count, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export members, attendance or transactions")
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("path", help="output file; .csv, .jsonl or .xlsx, optionally .gz")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--gzip", action="store_true", default=None, help="compress even without .gz")
+    parser.add_argument("--from", dest="start", help="first day (YYYY-MM-DD) to include")
+    parser.add_argument("--to", dest="end", help="first day (YYYY-MM-DD) to leave out")
+    parser.add_argument("--member", type=int, nargs="+", dest="member_ids", help="only these member ids")
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    args = parser.parse_args(argv)
+
+    result = export(
+        args.dataset, args.path, fmt=args.format, compress=args.gzip, start=args.start, end=args.end,
+        member_ids=args.member_ids, db=get_database(args.db),
+        progress=lambda rows: print(f"\r{rows} rows", end="")
+    )
+    print()
+    print(f"Exported {result.rows} {args.dataset} rows to {result.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Kiosk mode: continuous badge scanning with check-in/check-out toggling.
+
+``OpenSessionIndex`` keeps a map of member_id -> open attendance id in
+memory, loaded once from the database. Like the check-in window it only
+counts sessions opened today, so a session left open on an earlier day does
+not turn a scan into a check-out. A scan then needs no duplicate-session
+query: a member with an open session is checked out, anyone else is checked
+in. The map is reloaded when the day changes, and writes made by other
+connections (other windows, desks or worker threads) are detected through ``PRAGMA data_version`` and trigger a reload, so the map
+stays consistent with the database. A thin client of the service (GYM_SERVICE
+set) keeps no index and sends each scan to the service's ``/scan``.
+"""
+import threading
+import tkinter as tk
+from datetime import date, datetime
+
+from background import run_in_background
+from db import get_database
+from repository import CHECKED_IN, CHECKED_OUT, NOT_FOUND, SERVICE_URL, TIMESTAMP_FORMAT, day_bounds, get_repository
+from styles import ModernStyles
+
+# How long a scan result stays on screen, and how many recent scans are listed
+TOAST_MS = 3000
+RECENT_SCANS = 15
+
+
+class OpenSessionIndex:
+    """In-memory open-session map with toggle semantics"""
+
+    def __init__(self, db=None):
+        self.db = db or get_database()
+        self.conn = self.db.open_connection()
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.names = {}
+        self.data_version = None
+        self.day = None
+        with self.lock:
+            self._load()
+
+    def _load(self):
+        self.day = date.today()
+        self.sessions = dict(self.conn.execute(
+            "SELECT member_id, id FROM attendance WHERE checkout_at IS NULL AND checkin_at >= ? AND checkin_at < ? "
+            "ORDER BY id",
+            day_bounds(self.day)
+        ))
+        self.names.clear()
+        self.data_version = self._current_version()
+
+    def _current_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def toggle(self, member_id):
+        """Check the member out if they have an open session, otherwise in.
+
+        Returns (status, name) with status CHECKED_IN, CHECKED_OUT or NOT_FOUND.
+        """
+        try:
+            member_id = int(member_id)
+        except (TypeError, ValueError):
+            return NOT_FOUND, None
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Holding the write lock, pick up anything other connections committed, or a new day
+                if self._current_version() != self.data_version or date.today() != self.day:
+                    self._load()
+                result = self._toggle(member_id, now)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                self._load()
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def _toggle(self, member_id, now):
+        name = self.names.get(member_id)
+        if name is None:
+            row = self.conn.execute("SELECT name FROM members WHERE id=?", (member_id,)).fetchone()
+            if not row:
+                return NOT_FOUND, None
+            name = self.names[member_id] = row[0]
+
+        attendance_id = self.sessions.pop(member_id, None)
+        if attendance_id is not None:
+            self.conn.execute("UPDATE attendance SET checkout_time=? WHERE id=?", (now, attendance_id))
+            return CHECKED_OUT, name
+
+        cur = self.conn.execute(
+            "INSERT INTO attendance (member_id, checkin_time) VALUES (?, ?)", (member_id, now)
+        )
+        self.sessions[member_id] = cur.lastrowid
+        return CHECKED_IN, name
+
+    def is_checked_in(self, member_id):
+        return int(member_id) in self.sessions
+
+
+class KioskWindow(tk.Toplevel):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Kiosk Mode")
+        self.geometry("600x500")
+        self.configure(bg=ModernStyles.COLORS['background'])
+        
+        # Configure modern styles
+        ModernStyles.configure_styles()
+        
+        self.toggle = None
+        self._toast_job = None
+        self.create_widgets()
+        if SERVICE_URL:
+            # The service owns the database; it toggles the session
+            self.toggle = get_repository().toggle_member
+            self.show_toast("Ready", 'accent')
+        else:
+            run_in_background(self, OpenSessionIndex, on_success=self.on_index_ready,
+                              on_error=lambda e: self.show_toast(f"Kiosk unavailable: {e}", 'danger'))
+    
+    def create_widgets(self):
+        """Create scan input, result toast and recent scans list"""
+        # Header
+        header = tk.Frame(self, bg=ModernStyles.COLORS['primary'])
+        header.pack(fill="x")
+        
+        title = tk.Label(
+            header,
+            text="Scan Member Card",
+            font=('Segoe UI', 24, 'bold'),
+            bg=ModernStyles.COLORS['primary'],
+            fg=ModernStyles.COLORS['surface']
+        )
+        title.pack(pady=20)
+        
+        self.scan_entry = tk.Entry(
+            self,
+            font=('Segoe UI', 20),
+            justify="center",
+            bg=ModernStyles.COLORS['surface'],
+            fg=ModernStyles.COLORS['text_primary'],
+            relief="solid",
+            bd=1
+        )
+        self.scan_entry.pack(fill="x", padx=40, pady=20)
+        self.scan_entry.bind("<Return>", self.on_scan)
+        self.scan_entry.focus_set()
+        
+        self.toast = tk.Label(
+            self,
+            text="Loading open sessions...",
+            font=('Segoe UI', 16, 'bold'),
+            bg=ModernStyles.COLORS['background'],
+            fg=ModernStyles.COLORS['text_secondary']
+        )
+        self.toast.pack(fill="x", padx=40, pady=10)
+        
+        self.recent = tk.Listbox(
+            self,
+            font=('Segoe UI', 11),
+            bg=ModernStyles.COLORS['surface'],
+            fg=ModernStyles.COLORS['text_primary'],
+            relief="flat",
+            height=RECENT_SCANS
+        )
+        self.recent.pack(fill="both", expand=True, padx=40, pady=(10, 20))
+    
+    def on_index_ready(self, index):
+        self.toggle = index.toggle
+        self.show_toast(f"Ready - {len(index.sessions)} members checked in", 'accent')
+    
+    def on_scan(self, event=None):
+        """Toggle the scanned member and clear the input for the next scan"""
+        member_id = self.scan_entry.get().strip()
+        self.scan_entry.delete(0, tk.END)
+        if not member_id or self.toggle is None:
+            return
+        run_in_background(
+            self, self.toggle, member_id,
+            on_success=lambda result: self.on_toggled(member_id, *result),
+            on_error=lambda e: self.show_toast(f"Scan failed: {e}", 'danger')
+        )
+    
+    def on_toggled(self, member_id, status, name):
+        if status == NOT_FOUND:
+            self.show_toast(f"Unknown member {member_id}", 'danger')
+            return
+        if status == CHECKED_IN:
+            self.show_toast(f"Welcome, {name}!", 'success')
+            line = f"{datetime.now():%H:%M:%S}  IN   {member_id}  {name}"
+        else:
+            self.show_toast(f"Goodbye, {name}!", 'warning')
+            line = f"{datetime.now():%H:%M:%S}  OUT  {member_id}  {name}"
+        self.recent.insert(0, line)
+        self.recent.delete(RECENT_SCANS, tk.END)
+    
+    def show_toast(self, text, color):
+        """Show a non-blocking message that clears itself"""
+        self.toast.config(text=text, fg=ModernStyles.COLORS[color])
+        if self._toast_job is not None:
+            self.after_cancel(self._toast_job)
+        self._toast_job = self.after(TOAST_MS, lambda: self.toast.config(text=""))
@@ -0,0 +1,141 @@
+"""Treeviews that follow a table incrementally instead of reloading it.
+
+A ``LiveTable`` shows the newest ``limit`` rows of a table, newest first,
+with each row's id as its Treeview iid. After the first load it remembers
+the highest id on screen (the high-water mark) and the ids of rows that can
+still change (e.g. open sessions), and a refresh only fetches rows above the
+mark plus those pending rows. New rows are inserted at the top, changed rows
+are updated in place and the list is trimmed from the bottom, so nothing
+else on screen is rebuilt.
+
+Other desks' writes are picked up by polling the repository's
+``data_version`` every ``POLL_MS``; it only changes when something commits,
+so an idle desk costs one PRAGMA a second.
+"""
+from background import run_in_background
+
+POLL_MS = 1000
+ROW_LIMIT = 100
+
+
+class LiveTable:
+    """Keeps the newest rows of one table in a Treeview, keyed by row id"""
+
+    def __init__(self, owner, tree, load, changes, version=None, limit=ROW_LIMIT, is_pending=None,
+                 poll_ms=POLL_MS, on_error=None):
+        self.owner = owner
+        self.tree = tree
+        self.load = load              # load() -> newest rows, first column the id
+        self.changes = changes        # changes(high_water, pending_ids) -> new and changed rows
+        self.version = version        # version() -> value that changes whenever the table may have
+        self.limit = limit
+        self.is_pending = is_pending  # is_pending(row) -> True while the row can still change
+        self.poll_ms = poll_ms
+        self.on_error = on_error
+        self.high_water = 0
+        self.pending_ids = set()
+        self.seen_version = None
+        self.refreshing = False
+        self.stale = False
+        self.poll_job = None
+
+    def reload(self):
+        """Replace the rows on screen with a fresh load"""
+        run_in_background(
+            self.owner, self._load,
+            on_success=self._loaded,
+            on_error=self.on_error
+        )
+
+    def refresh(self):
+        """Fetch and apply only what changed since the last load or refresh"""
+        if self.refreshing:
+            self.stale = True
+            return
+        self.refreshing = True
+        run_in_background(
+            self.owner, self.changes, self.high_water, sorted(self.pending_ids),
+            on_success=self._refreshed,
+            on_error=self._refresh_failed,
+            quiet=True
+        )
+
+    def start_polling(self):
+        if self.version is not None and self.poll_job is None:
+            self.poll_job = self.owner.after(self.poll_ms, self._poll)
+
+    def stop_polling(self):
+        if self.poll_job is not None:
+            self.owner.after_cancel(self.poll_job)
+            self.poll_job = None
+
+    def apply(self, rows, replace=False):
+        """Insert unseen rows at the top, update known ones by iid, trim the bottom; returns (inserted, updated)"""
+        if replace:
+            self.tree.delete(*self.tree.get_children())
+            self.high_water = 0
+            self.pending_ids.clear()
+        inserted = updated = 0
+        new_rows = []
+        for row in rows:
+            iid = str(row[0])
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=row)
+                updated += 1
+            else:
+                new_rows.append(row)
+            if self.is_pending is not None:
+                if self.is_pending(row):
+                    self.pending_ids.add(row[0])
+                else:
+                    self.pending_ids.discard(row[0])
+        # Oldest first, each at the top, leaves the newest row first
+        for row in sorted(new_rows, key=lambda row: row[0]):
+            self.tree.insert("", 0, iid=str(row[0]), values=row)
+            self.high_water = max(self.high_water, row[0])
+            inserted += 1
+
+        children = self.tree.get_children()
+        if len(children) > self.limit:
+            trimmed = children[self.limit:]
+            self.tree.delete(*trimmed)
+            self.pending_ids.difference_update(int(iid) for iid in trimmed)
+        return inserted, updated
+
+    def _load(self):
+        # Read the version first: a commit that lands during the load still triggers a refresh
+        version = self.version() if self.version is not None else None
+        return version, self.load()
+
+    def _loaded(self, result):
+        self.seen_version, rows = result
+        self.apply(rows, replace=True)
+
+    def _refreshed(self, rows):
+        self.refreshing = False
+        self.apply(rows)
+        if self.stale:
+            self.stale = False
+            self.refresh()
+
+    def _refresh_failed(self, error):
+        self.refreshing = self.stale = False
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _poll(self):
+        self.poll_job = None
+        if not self.owner.winfo_exists():
+            return
+        run_in_background(
+            self.owner, self.version,
+            on_success=self._polled,
+            on_error=lambda e: self.start_polling(),
+            quiet=True
+        )
+
+    def _polled(self, version):
+        if self.seen_version is not None and version != self.seen_version:
+            self.refresh()
+        self.seen_version = version
+        self.start_polling()
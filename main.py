@@ -1,15 +1,15 @@
+import json
+import sys
+import time
 import tkinter as tk
-from tkinter import ttk
-from add_member import AddMemberWindow
-from view_member import ViewMemberWindow
-from attendance import AttendanceWindow
-from transaction import TransactionWindow
-from about import AboutWindow
-import sqlite3
-from db import connect_db
+from tkinter import messagebox, ttk
+from background import get_executor, run_in_background
+from db import close_databases, connect_db, get_database
+from maintenance import Scheduler
+from repository import SERVICE_URL, get_repository
 from styles import ModernStyles
+from windows import WindowRegistry
 import tkinter.font as tkfont
-from receipt_generator import generate_receipt_pdf
 
 class GymManagementSystem(tk.Tk):
     def __init__(self):
@@ -21,8 +21,18 @@ class GymManagementSystem(tk.Tk):
         # Configure modern styles
         ModernStyles.configure_styles()
         
-        # Initialize database
-        connect_db()
+        # Initialize database; a service client uses the service's
+        if not SERVICE_URL:
+            connect_db()
+        
+        # Deliver background job results on this event loop
+        get_executor(self)
+        
+        # Stale sessions and membership expiry; a service client leaves them to the service
+        self.scheduler = None if SERVICE_URL else Scheduler(get_database()).start()
+        
+        # Sidebar windows are imported on first use and reused while open
+        self.windows = WindowRegistry(self)
         
         # Configure grid
         self.grid_rowconfigure(0, weight=1)
@@ -69,7 +79,10 @@ class GymManagementSystem(tk.Tk):
             ("Add Member", self.open_add_member, "➕"),
             ("View Members", self.open_view_member, "👥"),
             ("Attendance", self.open_attendance, "📊"),
+            ("Kiosk Mode", self.open_kiosk, "📟"),
             ("Transactions", self.open_transaction, "💳"),
+            ("Analytics", self.open_analytics, "📈"),
+            ("Diagnostics", self.open_diagnostics, "🩺"),
             ("About", self.open_about, "ℹ️")
         ]
         
@@ -78,6 +91,8 @@ class GymManagementSystem(tk.Tk):
                 nav_frame,
                 text=f" {icon} {text}",
                 command=command,
+                # Analytics reads the database file, which a service client does not have
+                state="disabled" if SERVICE_URL and text == "Analytics" else "normal",
                 font=('Segoe UI', 12, 'bold'),
                 bg=ModernStyles.COLORS['secondary'],
                 fg=ModernStyles.COLORS['surface'],
@@ -129,28 +144,19 @@ class GymManagementSystem(tk.Tk):
     
     def update_stats(self, parent):
         """Fetch and update stats from the database"""
+        # Read the precomputed counters (total members, checked in, revenue) off the UI thread
+        run_in_background(
+            self, get_repository().dashboard_stats,
+            on_success=lambda stats: self.show_stats(parent, stats),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load stats: {str(e)}")
+        )
+    
+    def show_stats(self, parent, stats):
+        """Rebuild the stat cards from fetched stats"""
         # Clear previous stat cards in stats_frame
         for widget in parent.winfo_children():
             widget.destroy()
         
-        conn = sqlite3.connect("gym.db")
-        cur = conn.cursor()
-        
-        # Fetch total members
-        cur.execute("SELECT COUNT(*) FROM members")
-        total_members = cur.fetchone()[0]
-        
-        # Fetch active members
-        cur.execute("""
-            SELECT COUNT(*) FROM attendance 
-            WHERE date(checkin_time) = date('now') AND checkout_time IS NULL
-        """)
-        active_today = cur.fetchone()[0] or 0
-        cur.execute("SELECT SUM(amount_paid) FROM transactions WHERE date >= date('now', 'start of month')")
-        revenue = cur.fetchone()[0] or 0
-        
-        conn.close()
-        
         # Place Refresh Button inside stats_frame for visibility
         refresh_btn = tk.Button(
             parent,
@@ -169,9 +175,12 @@ class GymManagementSystem(tk.Tk):
         refresh_btn.pack(side="right", padx=10, pady=10)
         
         # Update stat cards
-        self.create_stat_card(parent, "Total Members", str(total_members), 0)
-        self.create_stat_card(parent, "Active Today", str(active_today), 1)
-        self.create_stat_card(parent, "Revenue This Month", f"${revenue}", 2)
+        self.create_stat_card(parent, "Total Members", str(stats.total_members), 0)
+        self.create_stat_card(parent, "Checked In Now", str(stats.checked_in), 1)
+        self.create_stat_card(
+            parent, "Revenue This Month",
+            f"${stats.revenue_month:.2f} (today ${stats.revenue_today:.2f})", 2
+        )
         
         # Move quick actions label creation to create_main_content so it doesn't duplicate
     
@@ -199,20 +208,55 @@ class GymManagementSystem(tk.Tk):
         value_label.pack(pady=(5, 20))
     
     def open_add_member(self):
-        AddMemberWindow(self)
+        self.windows.open("add_member")
     
     def open_view_member(self):
-        ViewMemberWindow(self)
+        self.windows.open("view_member")
     
     def open_attendance(self):
-        AttendanceWindow(self)
+        self.windows.open("attendance")
+    
+    def open_kiosk(self):
+        self.windows.open("kiosk")
     
     def open_transaction(self):
-        TransactionWindow(self)
+        self.windows.open("transaction")
+    
+    def open_analytics(self):
+        self.windows.open("analytics")
+    
+    def open_diagnostics(self):
+        self.windows.open("diagnostics")
     
     def open_about(self):
-        AboutWindow(self)
+        self.windows.open("about")
+
+
+def report_startup(app, started):
+    """Print startup timings as JSON once the main window has drawn, then close it"""
+    def on_map(event):
+        if event.widget is not app:
+            return
+        app.update_idletasks()
+        print(json.dumps({
+            "construct_ms": round((constructed - started) * 1000, 1),
+            "first_frame_ms": round((time.perf_counter() - started) * 1000, 1),
+            "first_frame_at": time.time(),
+            "modules": len(sys.modules),
+        }), flush=True)
+        app.after_idle(app.destroy)
+    
+    constructed = time.perf_counter()
+    app.bind("<Map>", on_map, add="+")
 
 if __name__ == "__main__":
+    started = time.perf_counter()
     app = GymManagementSystem()
+    # benchmarks/bench_startup.py runs the app this way to time cold starts
+    if "--startup-report" in sys.argv:
+        report_startup(app, started)
     app.mainloop()
+    if app.scheduler is not None:
+        app.scheduler.stop()
+    get_executor().shutdown()
+    close_databases()
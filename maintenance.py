@@ -0,0 +1,223 @@
+"""Periodic maintenance jobs, run by an in-process scheduler off the UI thread.
+
+Two jobs keep the tables honest:
+
+  * ``close_stale_sessions`` checks out sessions still open ``STALE_HOURS``
+    after check-in and flags them ``auto_closed``. Their checkout time is
+    when the job closed them, so analytics and the attendance list do not
+    count a duration for them.
+  * ``sweep_memberships`` keeps ``members.membership_status`` (active,
+    expiring, expired) current from ``end_date``. Each pass is an
+    ``end_date`` range scan within one status on ``idx_members_status_end``,
+    so it only reads members whose status is about to change.
+
+Both write in batches of ``BATCH_SIZE`` rows, one short transaction each, so
+check-ins at the desks wait at most one batch. Every run is logged (the
+``maintenance`` logger) and recorded in ``maintenance_runs`` with its start
+time, duration and the number of rows it changed; the scheduler reads that
+table on start so a restart does not rerun jobs that just ran.
+
+The app starts a ``Scheduler`` when it owns the database (not when it is a
+client of ``service.py``, which runs its own). Headless usage::
+
+    python maintenance.py run [--job close_stale_sessions] [--db gym.db]
+    python maintenance.py status [--db gym.db]
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+
+from db import get_database
+from repository import epoch
+
+STALE_HOURS = 12
+EXPIRING_DAYS = 7
+BATCH_SIZE = 500
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+logger = logging.getLogger("maintenance")
+
+CLOSE_STALE_SQL = """
+    UPDATE attendance SET checkout_time = ?, auto_closed = 1
+    WHERE id IN (
+        SELECT id FROM attendance WHERE checkout_at IS NULL AND checkin_at < ? LIMIT ?
+    )
+"""
+
+STATUS_SQL = """
+    UPDATE members SET membership_status = ?
+    WHERE id IN (
+        SELECT id FROM members
+        WHERE membership_status = ? AND end_date >= ? AND end_date < ?
+        LIMIT ?
+    )
+"""
+
+
+class Job(NamedTuple):
+    name: str
+    func: object            # func(db) -> (rows changed, detail dict)
+    interval_s: float
+
+
+def _batched(db, sql, params, batch_size) -> int:
+    """Run a LIMIT-ed UPDATE in its own short transaction until a batch comes back short"""
+    total = 0
+    while True:
+        with db.transaction() as conn:
+            changed = conn.execute(sql, (*params, batch_size)).rowcount
+        total += changed
+        if changed < batch_size:
+            return total
+
+
+def close_stale_sessions(db=None, max_hours=STALE_HOURS, now: Optional[datetime] = None,
+                         batch_size=BATCH_SIZE) -> int:
+    """Check out and flag sessions open for more than max_hours; returns how many were closed"""
+    db = db or get_database()
+    now = now or datetime.now()
+    cutoff = epoch(now - timedelta(hours=max_hours))
+    return _batched(db, CLOSE_STALE_SQL, (now.strftime(DATETIME_FORMAT), cutoff), batch_size)
+
+
+def sweep_memberships(db=None, today: Optional[date] = None, expiring_days=EXPIRING_DAYS,
+                      batch_size=BATCH_SIZE) -> Dict[str, int]:
+    """Move members between active, expiring and expired by end_date; returns {new status: members moved}"""
+    db = db or get_database()
+    today = today or date.today()
+    # end_date is a YYYY-MM-DD string (or NULL, which never expires); '' sorts before any date
+    now, soon = today.isoformat(), (today + timedelta(days=expiring_days)).isoformat()
+    # (new status, current status, end_date >= ?, end_date < ?)
+    passes = [
+        ("expired", "active", "", now),
+        ("expired", "expiring", "", now),
+        ("expiring", "active", now, soon),
+        # Renewals
+        ("expiring", "expired", now, soon),
+        ("active", "expired", soon, "9999"),
+        ("active", "expiring", soon, "9999"),
+    ]
+    moved = {"expired": 0, "expiring": 0, "active": 0}
+    for new, current, start, end in passes:
+        moved[new] += _batched(db, STATUS_SQL, (new, current, start, end), batch_size)
+    return moved
+
+
+def _close_stale_job(db):
+    closed = close_stale_sessions(db)
+    return closed, {"closed": closed}
+
+
+def _sweep_memberships_job(db):
+    moved = sweep_memberships(db)
+    return sum(moved.values()), moved
+
+
+JOBS = [
+    Job("close_stale_sessions", _close_stale_job, 15 * 60),
+    Job("sweep_memberships", _sweep_memberships_job, 60 * 60),
+]
+
+
+def run_job(db, job: Job) -> int:
+    """Run one job now, log it and record it in maintenance_runs; returns the rows it changed"""
+    started_at = datetime.now().strftime(DATETIME_FORMAT)
+    start = time.perf_counter()
+    rows, detail = job.func(db)
+    duration_ms = (time.perf_counter() - start) * 1000
+    with db.transaction() as conn:
+        conn.execute(
+            "INSERT INTO maintenance_runs (job, started_at, duration_ms, rows, detail) VALUES (?, ?, ?, ?, ?)",
+            (job.name, started_at, duration_ms, rows, json.dumps(detail))
+        )
+    logger.info("%s changed %d rows in %.1f ms %s", job.name, rows, duration_ms, detail)
+    return rows
+
+
+def last_runs(db) -> Dict[str, str]:
+    """{job: start time of its latest run}"""
+    return dict(db.execute("SELECT job, MAX(started_at) FROM maintenance_runs GROUP BY job"))
+
+
+class Scheduler:
+    """Runs each job every interval_s on one daemon thread until stopped"""
+
+    def __init__(self, db=None, jobs=None):
+        self.db = db or get_database()
+        self.jobs = JOBS if jobs is None else jobs
+        self.next_run = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        last = last_runs(self.db)
+        now = time.time()
+        for job in self.jobs:
+            ran = last.get(job.name)
+            ran_at = time.mktime(time.strptime(ran, DATETIME_FORMAT)) if ran else 0
+            self.next_run[job.name] = max(now, ran_at + job.interval_s)
+        self._thread = threading.Thread(target=self._run, name="gym-maintenance", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop after the job (batch) in progress finishes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_pending(self, now=None):
+        """Run every job that is due; returns the names of those that ran"""
+        now = time.time() if now is None else now
+        ran = []
+        for job in self.jobs:
+            if self._stop.is_set():
+                break
+            if self.next_run.get(job.name, 0) <= now:
+                try:
+                    run_job(self.db, job)
+                except Exception:
+                    # A busy or failed run is retried at the next interval
+                    logger.exception("%s failed", job.name)
+                self.next_run[job.name] = now + job.interval_s
+                ran.append(job.name)
+        return ran
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            wait = min(self.next_run.values(), default=time.time() + 60) - time.time()
+            self._stop.wait(max(wait, 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the periodic maintenance jobs once")
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument("--job", choices=[job.name for job in JOBS], help="run only this job")
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    db = get_database(args.db)
+    if args.command == "run":
+        for job in JOBS:
+            if args.job in (None, job.name):
+                print(f"{job.name}: {run_job(db, job)} rows changed")
+
+    for job, started_at, duration_ms, rows, detail in db.execute("""
+        SELECT job, started_at, duration_ms, rows, detail FROM maintenance_runs
+        WHERE id IN (SELECT MAX(id) FROM maintenance_runs GROUP BY job)
+        ORDER BY job
+    """):
+        print(f"{job:<22} last run {started_at} ({duration_ms:.1f} ms): {rows} rows {detail}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from background import run_in_background
+from repository import HISTORY_PAGE, get_repository
+from styles import ModernStyles
+
+
+class HistoryPager:
+    """Keyset cursor over one history list (visits or payments), newest first.
+
+    Both lists are rows of (id, sort value, ...) fetched with
+    ``fetch(member_id, before, limit)``, before being the (sort value, id)
+    of the last row already shown.
+    """
+
+    def __init__(self, fetch, member_id, page_size=HISTORY_PAGE):
+        self.fetch = fetch
+        self.member_id = member_id
+        self.page_size = page_size
+        self.before = None
+        self.has_more = True
+
+    def fetch_next(self):
+        if not self.has_more:
+            return []
+        return self.fetch(self.member_id, self.before, self.page_size)
+
+    def apply_next(self, rows):
+        self.has_more = len(rows) == self.page_size
+        if rows:
+            self.before = (rows[-1][1], rows[-1][0])
+        return rows
+
+
+class MemberDetailWindow(tk.Toplevel):
+    """One member at a glance: profile, visit and payment totals, and their history"""
+
+    def __init__(self, parent, member_id):
+        super().__init__(parent)
+        self.member_id = member_id
+        self.title(f"Member #{member_id}")
+        self.geometry("900x700")
+        self.configure(bg=ModernStyles.COLORS['background'])
+
+        # Configure modern styles
+        ModernStyles.configure_styles()
+
+        repo = get_repository()
+        self.pagers = {
+            "visits": HistoryPager(repo.member_visits, member_id),
+            "payments": HistoryPager(repo.member_payments, member_id),
+        }
+        self.trees = {}
+        self.more_buttons = {}
+        self.create_widgets()
+        self.load_summary()
+        for name in self.pagers:
+            self.load_more(name)
+
+    def create_widgets(self):
+        """Create member detail interface"""
+        # Header
+        header = tk.Frame(self, bg=ModernStyles.COLORS['primary'])
+        header.pack(fill="x")
+
+        self.title_label = tk.Label(
+            header,
+            text=f"Member #{self.member_id}",
+            font=('Segoe UI', 24, 'bold'),
+            bg=ModernStyles.COLORS['primary'],
+            fg=ModernStyles.COLORS['surface']
+        )
+        self.title_label.pack(pady=(20, 0))
+
+        self.profile_label = tk.Label(
+            header,
+            text="Loading...",
+            font=('Segoe UI', 11),
+            bg=ModernStyles.COLORS['primary'],
+            fg=ModernStyles.COLORS['light']
+        )
+        self.profile_label.pack(pady=(5, 20))
+
+        # Summary cards
+        cards = tk.Frame(self, bg=ModernStyles.COLORS['background'])
+        cards.pack(fill="x", padx=20, pady=10)
+
+        self.card_values = {}
+        for column, title in enumerate((
+            "Status", "Visits", "Last Visit", "Avg. Session", "Total Paid", "Last Payment",
+        )):
+            card = tk.Frame(cards, bg=ModernStyles.COLORS['surface'], padx=10, pady=10)
+            card.grid(row=0, column=column, padx=5, sticky="nsew")
+            cards.columnconfigure(column, weight=1)
+            tk.Label(
+                card,
+                text=title,
+                font=('Segoe UI', 10),
+                bg=ModernStyles.COLORS['surface'],
+                fg=ModernStyles.COLORS['text_secondary']
+            ).pack()
+            value = tk.Label(
+                card,
+                text="—",
+                font=('Segoe UI', 13, 'bold'),
+                bg=ModernStyles.COLORS['surface'],
+                fg=ModernStyles.COLORS['text_primary']
+            )
+            value.pack()
+            self.card_values[title] = value
+
+        # History: one tab per list, each paged with "Load more"
+        notebook = ttk.Notebook(self)
+        notebook.pack(fill="both", expand=True, padx=20, pady=10)
+
+        for name, cols in (
+            ("visits", ("Check-in", "Check-out", "Duration")),
+            ("payments", ("Date", "Amount", "Membership Type", "Payment Method")),
+        ):
+            tab = tk.Frame(notebook, bg=ModernStyles.COLORS['surface'])
+            notebook.add(tab, text=name.capitalize())
+
+            tree_frame = tk.Frame(tab)
+            tree_frame.pack(fill="both", expand=True)
+
+            scrollbar = ttk.Scrollbar(tree_frame)
+            scrollbar.pack(side="right", fill="y")
+
+            tree = ttk.Treeview(
+                tree_frame,
+                columns=cols,
+                show="headings",
+                height=12,
+                yscrollcommand=scrollbar.set,
+                style='Modern.Treeview'
+            )
+            for col in cols:
+                tree.heading(col, text=col)
+                tree.column(col, width=180, anchor="center")
+            tree.pack(side="left", fill="both", expand=True)
+            scrollbar.config(command=tree.yview)
+            self.trees[name] = tree
+
+            more_btn = tk.Button(
+                tab,
+                text="⬇ Load more",
+                command=lambda name=name: self.load_more(name),
+                font=('Segoe UI', 12, 'bold'),
+                bg=ModernStyles.COLORS['accent'],
+                fg=ModernStyles.COLORS['surface'],
+                activebackground=ModernStyles.COLORS['primary'],
+                activeforeground=ModernStyles.COLORS['surface'],
+                bd=0,
+                padx=20,
+                pady=8,
+                cursor="hand2"
+            )
+            more_btn.pack(pady=10)
+            self.more_buttons[name] = more_btn
+
+    def load_summary(self):
+        """Fetch the member's summary off the UI thread"""
+        run_in_background(
+            self, get_repository().member_summary, self.member_id,
+            on_success=self.show_summary,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load member: {str(e)}", parent=self)
+        )
+
+    def show_summary(self, summary):
+        if summary is None:
+            messagebox.showwarning("Warning", f"Member #{self.member_id} no longer exists", parent=self)
+            self.destroy()
+            return
+        self.title_label.config(text=summary.name)
+        self.profile_label.config(text=(
+            f"#{summary.member_id} · {summary.gender or '—'}, {summary.age or '—'} · {summary.phone or '—'} · "
+            f"{summary.membership_type or '—'} {summary.start_date or ''} → {summary.end_date or ''}"
+        ))
+        avg = summary.avg_session_minutes
+        values = {
+            "Status": summary.membership_status.capitalize(),
+            "Visits": f"{summary.visits:,}",
+            "Last Visit": summary.last_visit or "Never",
+            "Avg. Session": "—" if avg is None else f"{avg:.0f} min",
+            "Total Paid": f"${summary.total_paid:,.2f}",
+            "Last Payment": (
+                "None" if summary.last_payment_date is None
+                else f"${summary.last_payment_amount:,.2f} on {summary.last_payment_date}"
+            ),
+        }
+        for title, text in values.items():
+            self.card_values[title].config(text=text)
+
+    def load_more(self, name):
+        """Fetch the next page of one history list"""
+        pager = self.pagers[name]
+        self.more_buttons[name].config(state="disabled")
+        run_in_background(
+            self, pager.fetch_next,
+            on_success=lambda rows: self.show_page(name, rows),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load {name}: {str(e)}", parent=self)
+        )
+
+    def show_page(self, name, rows):
+        pager = self.pagers[name]
+        tree = self.trees[name]
+        for row in pager.apply_next(rows):
+            if name == "visits":
+                _, checkin, checkout, duration = row
+                tree.insert("", "end", values=(checkin, checkout or "—", duration))
+            else:
+                _, day, amount, membership_type, payment_method = row
+                tree.insert("", "end", values=(day, f"${amount:,.2f}", membership_type or "", payment_method or ""))
+        self.more_buttons[name].config(state="normal" if pager.has_more else "disabled")
@@ -0,0 +1,247 @@
+"""Streaming bulk import of members from CSV or JSON.
+
+Rows are read one at a time, validated in chunks and inserted with
+``executemany``, one transaction per chunk, so memory use stays constant
+however large the file is. Rejected rows are written to an error CSV with
+the reason and their line (CSV) or item number (JSON).
+
+Headless usage::
+
+    python member_import.py members.csv [--errors rejected.csv] [--db gym.db]
+
+CSV headers may use either the column names (``membership_type``) or the
+form labels (``Membership Type``). JSON input may be an array of objects or
+JSON Lines.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from datetime import date
+from itertools import islice
+from typing import NamedTuple, Optional
+
+from db import MAX_AGE, MIN_AGE, bulk_member_insert, get_database
+
+FIELDS = ("name", "age", "gender", "phone", "address", "membership_type", "start_date", "end_date")
+MEMBERSHIP_TYPES = ("Monthly", "Quarterly", "Yearly", "Lifetime")
+CHUNK_SIZE = 5000
+JSON_READ_SIZE = 64 * 1024
+
+# What a JSON array item is scanned for to find where it ends: strings (an unterminated one
+# matches only its quote) and the brackets and commas outside them
+JSON_WHITESPACE = re.compile(r"\s*")
+JSON_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*"|[][{},"]')
+
+INSERT_SQL = """
+    INSERT INTO members (name, age, gender, phone, address, membership_type, start_date, end_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    rejected: int
+    error_path: Optional[str]
+
+
+def _normalize_key(key):
+    return str(key).strip().lower().replace(" ", "_")
+
+
+def _iter_csv(f):
+    reader = csv.DictReader(f)
+    for record in reader:
+        yield reader.line_num, {_normalize_key(k): v for k, v in record.items() if k is not None}
+
+
+def _item_end(buf, pos):
+    """Index of the , or ] after the array item starting at pos, or None while the item is incomplete"""
+    depth = 0
+    for match in JSON_TOKENS.finditer(buf, pos):
+        token = match.group()
+        if token == '"':
+            return None
+        if token[0] == '"':
+            continue
+        if token in "[{":
+            depth += 1
+        elif depth:
+            depth -= token != ","
+        else:
+            return match.start()
+    return None
+
+
+def _iter_json_array(f):
+    """Yield the items of a top-level JSON array without loading the whole file.
+
+    An item is decoded once the text after it shows where it ends. A
+    malformed item is yielded as the reason it is invalid, like a bad JSON
+    Lines line, and reading goes on after it. A truncated array raises
+    ValueError.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos = "", 0
+    started = False
+    while True:
+        pos = JSON_WHITESPACE.match(buf, pos).end()
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                pos, started = pos + 1, True
+                continue
+            if buf[pos] == ",":
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            end = _item_end(buf, pos)
+            if end is not None:
+                try:
+                    item, stop = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError as e:
+                    item, stop = f"invalid JSON: {e.msg}", end
+                if JSON_WHITESPACE.match(buf, stop).end() != end:
+                    item, stop = "invalid JSON: extra data", end
+                yield item
+                pos = stop
+                continue
+        more = f.read(JSON_READ_SIZE)
+        if not more:
+            raise ValueError("Truncated JSON array")
+        buf, pos = buf[pos:] + more, 0
+
+
+def _iter_json(f):
+    first = f.read(1)
+    while first and first.isspace():
+        first = f.read(1)
+    if first == "[":
+        f.seek(0)
+        number = 0
+        try:
+            for number, item in enumerate(_iter_json_array(f), 1):
+                yield number, item
+        except ValueError as e:
+            # Nothing after this point can be read; the rows before it are already imported
+            yield number + 1, f"invalid JSON: {e}"
+        return
+    # JSON Lines
+    f.seek(0)
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, f"invalid JSON: {e.msg}"
+
+
+def read_records(path, fmt=None):
+    """Yield (line or item number, record dict) from a CSV or JSON file"""
+    fmt = fmt or ("json" if path.lower().endswith((".json", ".jsonl")) else "csv")
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if fmt == "csv":
+            yield from _iter_csv(f)
+        else:
+            for number, item in _iter_json(f):
+                if isinstance(item, dict):
+                    item = {_normalize_key(k): v for k, v in item.items()}
+                yield number, item
+
+
+def validate(record):
+    """Return (row tuple, None) for a valid record or (None, reason)"""
+    if not isinstance(record, dict):
+        return None, record if isinstance(record, str) else "not an object"
+    values = {field: str(record.get(field) or "").strip() for field in FIELDS}
+    missing = [field for field in FIELDS if not values[field]]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    try:
+        age = int(values["age"])
+    except ValueError:
+        return None, f"age is not a number: {values['age']}"
+    if not MIN_AGE <= age <= MAX_AGE:
+        return None, f"age out of range: {age}"
+    if values["membership_type"] not in MEMBERSHIP_TYPES:
+        return None, f"unknown membership type: {values['membership_type']}"
+    try:
+        if len(values["start_date"]) != 10 or len(values["end_date"]) != 10:
+            raise ValueError
+        start = date.fromisoformat(values["start_date"])
+        end = date.fromisoformat(values["end_date"])
+    except ValueError:
+        return None, "dates must be YYYY-MM-DD"
+    if end < start:
+        return None, "end date before start date"
+    values["age"] = age
+    return tuple(values[field] for field in FIELDS), None
+
+
+def import_members(path, fmt=None, chunk_size=CHUNK_SIZE, error_path=None, db=None, progress=None):
+    """Import members from path; returns ImportResult.
+
+    error_path defaults to ``<path>.errors.csv`` and is only created when a
+    row is rejected. progress(imported, rejected) is called after each chunk.
+    """
+    db = db or get_database()
+    error_path = error_path or f"{os.path.splitext(path)[0]}.errors.csv"
+    records = read_records(path, fmt)
+    imported = rejected = 0
+    error_file = writer = None
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            rows = []
+            for number, record in chunk:
+                row, reason = validate(record)
+                if row is not None:
+                    rows.append(row)
+                    continue
+                if writer is None:
+                    error_file = open(error_path, "w", newline="", encoding="utf-8")
+                    writer = csv.writer(error_file)
+                    writer.writerow(("line", "reason") + FIELDS)
+                source = record if isinstance(record, dict) else {}
+                writer.writerow((number, reason) + tuple(source.get(field, "") for field in FIELDS))
+                rejected += 1
+            if rows:
+                with db.transaction() as conn, bulk_member_insert(conn):
+                    conn.executemany(INSERT_SQL, rows)
+                imported += len(rows)
+            if progress is not None:
+                progress(imported, rejected)
+    finally:
+        if error_file is not None:
+            error_file.close()
+    return ImportResult(imported, rejected, error_path if rejected else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import members from CSV or JSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "json"], help="defaults to the file extension")
+    parser.add_argument("--errors", help="where to write rejected rows")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    args = parser.parse_args(argv)
+
+    result = import_members(
+        args.path, fmt=args.format, chunk_size=args.chunk_size, error_path=args.errors,
+        db=get_database(args.db),
+        progress=lambda imported, rejected: print(f"\r{imported} imported, {rejected} rejected", end="")
+    )
+    print()
+    if result.error_path:
+        print(f"Rejected rows written to {result.error_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
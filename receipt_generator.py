@@ -3,10 +3,12 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta  # <-- FIXED
-import sqlite3
-import random
+from functools import lru_cache
+import io
 import os
+from repository import TIMESTAMP_FORMAT, get_repository
 
 # Constants for styling
 GYM_NAME = "ARIF X MAINUL GYM"
@@ -14,51 +16,141 @@ GYM_ADDRESS = "SOUTHERN UNVERSITY BANGLADESH"
 GYM_PHONE = "01879524393"
 LOGO_PATH = "gym_logo.png"  # Replace with actual logo path
 
+# Batch rendering: worker processes (None = one per CPU) and receipts handed to a worker at a time
+RECEIPT_WORKERS = None
+BATCH_CHUNK_SIZE = 16
+
+UNKNOWN_MEMBER = ("Unknown", "N/A", "N/A")
+
+
+@lru_cache(maxsize=1)
+def _styles():
+    """Paragraph styles, built once per process"""
+    sample = getSampleStyleSheet()
+    normal = sample['BodyText']
+    return {
+        'title': sample['Heading1'],
+        'subtitle': sample['Heading2'],
+        'normal': normal,
+        'bold': ParagraphStyle('BoldText', parent=normal, fontName='Helvetica-Bold'),
+        'footer': ParagraphStyle('Footer', parent=normal, fontSize=10, textColor=colors.grey),
+        'total': ParagraphStyle('Total', fontName='Helvetica-Bold', fontSize=14, textColor=colors.HexColor('#667eea')),
+    }
+
+
+@lru_cache(maxsize=1)
+def _logo_bytes():
+    """Logo file contents, read once per process (None when there is no logo)"""
+    if not os.path.exists(LOGO_PATH):  # <-- FIXED
+        return None
+    with open(LOGO_PATH, "rb") as f:
+        return f.read()
+
+
 def generate_receipt_pdf(member_id, amount, payment_method="Credit Card"):  # <-- FIXED
-    # Connect to database and fetch member details
-    conn = sqlite3.connect("gym.db")
-    cur = conn.cursor()
-    cur.execute("SELECT name, phone, membership_type FROM members WHERE id=?", (member_id,))
-    member = cur.fetchone()
-    conn.close()
-
-    if member:
-        name, phone, membership_type = member
+    """Issue and store a numbered receipt, and save a copy as receipt_<number>.pdf in the working directory"""
+    receipt = issue_receipt(member_id, amount, payment_method)
+    return save_receipt(receipt.number, f"receipt_{receipt.label}.pdf")
+
+
+def issue_receipt(member_id, amount, payment_method="Credit Card", repo=None):
+    """Issue a receipt that is not tied to a recorded payment, render it and store its PDF"""
+    repo = repo or get_repository()
+    return store_receipt(repo.receipts.issue(member_id, amount, payment_method), repo)
+
+
+def store_receipt(receipt, repo=None):
+    """Render an issued receipt and store its PDF; returns the receipt with the PDF's hash"""
+    repo = repo or get_repository()
+    member = repo.members.get_profile(receipt.member_id) if receipt.member_id is not None else None
+    pdf = render_receipt(receipt, member or UNKNOWN_MEMBER)
+    return receipt._replace(pdf_sha256=repo.receipts.store_pdf(receipt.number, pdf))
+
+
+def save_receipt(number, path, repo=None):
+    """Write a stored receipt's PDF to path; a reprint reads the stored bytes instead of rendering"""
+    pdf = (repo or get_repository()).receipts.pdf(number)
+    if pdf is None:
+        raise LookupError(f"Receipt {number} has no stored PDF")
+    with open(path, "wb") as f:
+        f.write(pdf)
+    return path
+
+
+def generate_receipts_batch(payments, output_dir=".", workers=RECEIPT_WORKERS):
+    """Issue and render receipts for many (member_id, amount, payment_method) tuples.
+
+    Member details for the whole batch are fetched in one query and the
+    receipt numbers reserved in one transaction, then the PDFs are rendered
+    across a process pool (workers=1 renders in this process), stored in one
+    transaction and saved to output_dir. Returns the filenames in the same
+    order as payments.
+    """
+    payments = list(payments)
+    repo = get_repository()
+    profiles = repo.members.get_profiles({member_id for member_id, _, _ in payments})
+    receipts = repo.receipts.issue_many(payments)
+    jobs = [
+        (receipt, profiles.get(int(member_id), UNKNOWN_MEMBER))
+        for receipt, (member_id, _, _) in zip(receipts, payments)
+    ]
+
+    if workers == 1 or len(jobs) <= 1:
+        pdfs = [_render_job(job) for job in jobs]
     else:
-        name, phone, membership_type = "Unknown", "N/A", "N/A"
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pdfs = list(pool.map(_render_job, jobs, chunksize=BATCH_CHUNK_SIZE))
+    repo.receipts.store_pdfs(zip((receipt.number for receipt in receipts), pdfs))
+
+    filenames = []
+    for receipt, pdf in zip(receipts, pdfs):
+        filename = os.path.join(output_dir, f"receipt_{receipt.label}.pdf")
+        with open(filename, "wb") as f:
+            f.write(pdf)
+        filenames.append(filename)
+    return filenames
+
+
+def _render_job(job):
+    return render_receipt(*job)
+
+
+def render_receipt(receipt, member):
+    """Render a receipt PDF from its Receipt row and already-fetched (name, phone, membership_type).
+
+    The output is deterministic (reportlab's invariant mode), so the same
+    receipt always renders to the same bytes and is stored once.
+    """
+    name, phone, membership_type = member
 
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"receipt_{member_id}_{timestamp}.pdf"
+    issued_at = datetime.strptime(receipt.issued_at, TIMESTAMP_FORMAT)
+    amount = receipt.amount
+    payment_method = receipt.payment_method or "Cash"
 
     # Create PDF document
-    doc = SimpleDocTemplate(filename, pagesize=letter)
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, invariant=True)
     elements = []
 
     # Styles
-    styles = getSampleStyleSheet()
-    title_style = styles['Heading1']
-    subtitle_style = styles['Heading2']
-    normal_style = styles['BodyText']
-    bold_style = ParagraphStyle('BoldText', parent=normal_style, fontName='Helvetica-Bold')
-    footer_style = ParagraphStyle('Footer', parent=normal_style, fontSize=10, textColor=colors.grey)
+    styles = _styles()
 
     # Header section
-    if os.path.exists(LOGO_PATH):  # <-- FIXED
-        elements.append(Image(LOGO_PATH, width=1.2*inch, height=1.2*inch))
+    logo = _logo_bytes()
+    if logo:
+        elements.append(Image(io.BytesIO(logo), width=1.2*inch, height=1.2*inch))
         elements.append(Spacer(1, 12))
-    elements.append(Paragraph(GYM_NAME, title_style))
-    elements.append(Paragraph(GYM_ADDRESS, normal_style))
-    elements.append(Paragraph(f"Phone: {GYM_PHONE}", normal_style))
+    elements.append(Paragraph(GYM_NAME, styles['title']))
+    elements.append(Paragraph(GYM_ADDRESS, styles['normal']))
+    elements.append(Paragraph(f"Phone: {GYM_PHONE}", styles['normal']))
     elements.append(Spacer(1, 24))
 
     # Receipt info section
-    receipt_number = f"GF-{datetime.now().year}-{random.randint(1, 9999):04d}"
-    receipt_date = datetime.now().strftime("%b %d, %Y")
+    receipt_date = issued_at.strftime("%b %d, %Y")
     
     receipt_info = [
-        [Paragraph("Receipt No.", normal_style), Paragraph("Date", normal_style)],
-        [Paragraph(receipt_number, bold_style), Paragraph(receipt_date, bold_style)]
+        [Paragraph("Receipt No.", styles['normal']), Paragraph("Date", styles['normal'])],
+        [Paragraph(receipt.label, styles['bold']), Paragraph(receipt_date, styles['bold'])]
     ]
     
     receipt_table = Table(receipt_info, colWidths=[3*inch, 3*inch])
@@ -66,16 +158,16 @@ def generate_receipt_pdf(member_id, amount, payment_method="Credit Card"):  # <-
     elements.append(Spacer(1, 24))
 
     # Divider line
-    elements.append(Paragraph("<hr width='100%' color='#667eea'/>", normal_style))
+    elements.append(Paragraph("<hr width='100%' color='#667eea'/>", styles['normal']))
     elements.append(Spacer(1, 12))
 
     # Title
-    elements.append(Paragraph("PAYMENT RECEIPT", subtitle_style))
+    elements.append(Paragraph("PAYMENT RECEIPT", styles['subtitle']))
     elements.append(Spacer(1, 12))
 
     # Member info
     info_data = [
-        ["Member ID:", f"GF-{member_id:04}"],
+        ["Member ID:", f"GF-{receipt.member_id:04}" if receipt.member_id is not None else "N/A"],
         ["Name:", name],
         ["Phone:", phone],
         ["Membership:", membership_type]
@@ -92,10 +184,10 @@ def generate_receipt_pdf(member_id, amount, payment_method="Credit Card"):  # <-
     elements.append(Spacer(1, 24))
 
     # Payment section
-    elements.append(Paragraph("<hr width='100%' color='#667eea'/>", normal_style))
+    elements.append(Paragraph("<hr width='100%' color='#667eea'/>", styles['normal']))
     payment_data = [
-        [Paragraph("Payment Amount:", normal_style), Paragraph(f"${float(amount):.2f}", bold_style)],
-        [Paragraph("Payment Method:", normal_style), Paragraph(payment_method, bold_style)]  # <-- FIXED
+        [Paragraph("Payment Amount:", styles['normal']), Paragraph(f"${float(amount):.2f}", styles['bold'])],
+        [Paragraph("Payment Method:", styles['normal']), Paragraph(payment_method, styles['bold'])]  # <-- FIXED
     ]
     payment_table = Table(payment_data, colWidths=[4*inch, 2*inch])
     payment_table.setStyle(TableStyle([
@@ -105,7 +197,7 @@ def generate_receipt_pdf(member_id, amount, payment_method="Credit Card"):  # <-
     elements.append(payment_table)
 
     # Total row
-    total_data = [[Paragraph("Total:", normal_style), Paragraph(f"${float(amount):.2f}", ParagraphStyle('Total', fontName='Helvetica-Bold', fontSize=14, textColor=colors.HexColor('#667eea')))]]
+    total_data = [[Paragraph("Total:", styles['normal']), Paragraph(f"${float(amount):.2f}", styles['total'])]]
     total_table = Table(total_data, colWidths=[4*inch, 2*inch])
     total_table.setStyle(TableStyle([
         ('ALIGN', (1,0), (1,0), 'RIGHT'),
@@ -115,20 +207,20 @@ def generate_receipt_pdf(member_id, amount, payment_method="Credit Card"):  # <-
     elements.append(Spacer(1, 24))
     
     # Footer section
-    elements.append(Paragraph("<hr width='100%' color='#667eea'/>", normal_style))
+    elements.append(Paragraph("<hr width='100%' color='#667eea'/>", styles['normal']))
     
-    valid_until = (datetime.now() + timedelta(days=365)).strftime("%b %d, %Y")  # <-- FIXED
-    elements.append(Paragraph(f"Thank you for your payment.", normal_style))
+    valid_until = (issued_at + timedelta(days=365)).strftime("%b %d, %Y")  # <-- FIXED
+    elements.append(Paragraph(f"Thank you for your payment.", styles['normal']))
     elements.append(Spacer(1, 8))
-    elements.append(Paragraph(f"Please keep this receipt for your records. Your membership is valid until {valid_until}.", normal_style))
+    elements.append(Paragraph(f"Please keep this receipt for your records. Your membership is valid until {valid_until}.", styles['normal']))
     elements.append(Spacer(1, 48))
     
-    elements.append(Paragraph(f"{GYM_NAME} © {datetime.now().year} | Terms & Conditions Apply", footer_style))
-    elements.append(Paragraph("Receipt generated automatically", footer_style))
+    elements.append(Paragraph(f"{GYM_NAME} © {issued_at.year} | Terms & Conditions Apply", styles['footer']))
+    elements.append(Paragraph("Receipt generated automatically", styles['footer']))
 
     # Build PDF
     doc.build(elements)
-    return filename
+    return buffer.getvalue()
 
 # Example usage
 # generate_receipt_pdf("1001", "120.00")
\ No newline at end of file
@@ -0,0 +1,789 @@
+"""Data-access layer shared by every window.
+
+All SQL used by the GUI lives here so it runs on the long-lived connections
+from ``db.Database`` instead of opening ``gym.db`` for every action.
+"""
+import calendar
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import archive
+import sql_stats
+from db import Database, get_database, has_search_index
+
+# Outcomes of the front-desk actions on GymRepository
+OK = "ok"
+NOT_FOUND = "not_found"
+ALREADY_CHECKED_IN = "already_checked_in"
+NO_OPEN_SESSION = "no_open_session"
+CHECKED_IN = "checked_in"
+CHECKED_OUT = "checked_out"
+
+# Base URL of a gym service (service.py); when set, get_repository() returns a client for it
+SERVICE_URL = os.environ.get("GYM_SERVICE")
+
+PAYMENT_METHODS = ("Cash", "Credit Card", "Debit Card", "Bank Transfer", "Mobile Banking")
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_FORMAT = "%Y-%m-%d"
+
+DIRECTORY_COLUMNS = (
+    "members.id, members.name, age, gender, members.phone, membership_type, start_date, end_date"
+)
+
+# Shorter search terms cannot use the trigram index
+MIN_INDEXED_SEARCH = 3
+
+# Member profiles kept in memory by ProfileCache
+PROFILE_CACHE_SIZE = 2048
+
+# Rows per page of the member detail window's visit and payment history
+HISTORY_PAGE = 50
+
+# Hot statements kept as constants so tests can EXPLAIN exactly what runs
+OPEN_SESSION_SQL = """
+    SELECT id FROM attendance
+    WHERE member_id=? AND checkout_at IS NULL
+      AND checkin_at >= ? AND checkin_at < ?
+"""
+
+ACTIVE_TODAY_SQL = """
+    SELECT COUNT(*) FROM attendance
+    WHERE checkin_at >= ? AND checkin_at < ? AND checkout_at IS NULL
+"""
+
+ATTENDANCE_ROW = """
+    SELECT a.id, a.member_id, m.name, a.checkin_time, a.checkout_time,
+           CASE
+               WHEN a.checkout_time IS NULL THEN 'Active'
+               WHEN a.auto_closed THEN 'Auto-closed'
+               ELSE ((a.checkout_at - a.checkin_at) / 60) || ' min'
+           END as duration
+    FROM attendance a
+    JOIN members m ON a.member_id = m.id
+"""
+
+RECENT_ATTENDANCE_SQL = ATTENDANCE_ROW + """
+    ORDER BY a.checkin_time DESC
+    LIMIT ?
+"""
+
+# Incremental refresh: sessions after the newest one on screen, and on-screen open sessions since closed
+NEW_ATTENDANCE_SQL = ATTENDANCE_ROW + """
+    WHERE a.id > ?
+    ORDER BY a.id DESC
+    LIMIT ?
+"""
+
+CLOSED_ATTENDANCE_SQL = ATTENDANCE_ROW + """
+    WHERE a.id IN (SELECT value FROM json_each(?)) AND a.checkout_time IS NOT NULL
+"""
+
+TRANSACTION_ROW = """
+    SELECT t.id, t.member_id, m.name, t.amount_paid, t.date, t.membership_type, t.payment_method
+    FROM transactions t
+    JOIN members m ON t.member_id = m.id
+"""
+
+RECENT_TRANSACTIONS_SQL = TRANSACTION_ROW + """
+    ORDER BY t.date DESC, t.id DESC
+    LIMIT ?
+"""
+
+NEW_TRANSACTIONS_SQL = TRANSACTION_ROW + """
+    WHERE t.id > ?
+    ORDER BY t.id DESC
+    LIMIT ?
+"""
+
+REVENUE_RANGE_SQL = """
+    SELECT SUM(amount_paid) FROM transactions
+    WHERE date >= ? AND date < ?
+"""
+
+DASHBOARD_SQL = """
+    SELECT
+        (SELECT value FROM stats_counters WHERE name = 'members_total'),
+        (SELECT value FROM stats_counters WHERE name = 'checked_in'),
+        (SELECT amount FROM revenue_daily WHERE day = ?),
+        (SELECT amount FROM revenue_monthly WHERE month = ?)
+"""
+
+
+# Length of a closed, not auto-closed session. Computed from the TEXT timestamps, which archives
+# also have and idx_attendance_member_history covers (an index on the generated epoch columns is
+# not treated as covering).
+SESSION_SECONDS = """
+    CASE WHEN auto_closed THEN NULL
+         ELSE CAST(ROUND((julianday(checkout_time) - julianday(checkin_time)) * 86400) AS INTEGER)
+    END
+"""
+
+# Member detail: one statement over the member row, the member's visits in every attendance table
+# (archives included, see archive.union) and their payments. The visit totals are plain aggregates
+# over the covering idx_attendance_member_history; on the payment side COUNT/SUM OVER () see every
+# payment while ORDER BY ... LIMIT 1 keeps the latest, so totals and latest row come out of one pass.
+MEMBER_VISITS_ARM = f"""
+    SELECT checkin_time, {SESSION_SECONDS} AS seconds FROM {{attendance}} WHERE member_id = ?
+"""
+
+MEMBER_SUMMARY_SQL = """
+    SELECT m.id, m.name, m.age, m.gender, m.phone, m.membership_type, m.start_date, m.end_date,
+           m.membership_status,
+           v.visits, v.checkin_time, v.avg_seconds / 60.0,
+           COALESCE(p.payments, 0), COALESCE(p.total_paid, 0), p.amount_paid, p.date
+    FROM members m
+    LEFT JOIN (
+        SELECT COUNT(*) AS visits, MAX(checkin_time) AS checkin_time, AVG(seconds) AS avg_seconds
+        FROM ({visits})
+    ) v
+    LEFT JOIN (
+        SELECT COUNT(*) OVER () AS payments, SUM(amount_paid) OVER () AS total_paid, amount_paid, date
+        FROM transactions
+        WHERE member_id = ?
+        ORDER BY date DESC, id DESC
+        LIMIT 1
+    ) p
+    WHERE m.id = ?
+"""
+
+# Keyset pages of a member's history, newest first; each arm stops after one page
+MEMBER_VISITS_PAGE_ARM = f"""
+    SELECT * FROM (
+        SELECT id, checkin_time, checkout_time, auto_closed, {SESSION_SECONDS} AS seconds
+        FROM {{attendance}}
+        WHERE member_id = ? {{before}}
+        ORDER BY checkin_time DESC, id DESC
+        LIMIT ?
+    )
+"""
+
+MEMBER_PAYMENTS_PAGE_SQL = """
+    SELECT id, date, amount_paid, membership_type, payment_method
+    FROM transactions
+    WHERE member_id = ? {before}
+    ORDER BY date DESC, id DESC
+    LIMIT ?
+"""
+
+# Keyset condition on (sort column, id): the range on the sort column uses the index
+HISTORY_BEFORE = "AND {column} <= ? AND ({column} < ? OR id < ?)"
+
+
+# Moves whenever any connection renames, re-types or deletes a member (db.CHANGE_COUNTER_TRIGGERS)
+PROFILES_VERSION_SQL = "SELECT value FROM change_counters WHERE name = 'member_profiles'"
+
+
+RECEIPT_COLUMNS = "number, transaction_id, member_id, issued_at, amount, payment_method, pdf_sha256"
+
+# Receipt numbers are printed as GF-<year issued>-<number>
+RECEIPT_LABEL = re.compile(r"(?:GF-\d{4}-)?0*(\d+)$", re.IGNORECASE)
+
+
+class DashboardStats(NamedTuple):
+    total_members: int
+    checked_in: int
+    revenue_today: float
+    revenue_month: float
+
+
+class MemberSummary(NamedTuple):
+    member_id: int
+    name: str
+    age: Optional[int]
+    gender: Optional[str]
+    phone: Optional[str]
+    membership_type: Optional[str]
+    start_date: Optional[str]
+    end_date: Optional[str]
+    membership_status: str
+    visits: int
+    last_visit: Optional[str]
+    avg_session_minutes: Optional[float]   # closed sessions only; auto-closed ones are left out
+    payments: int
+    total_paid: float
+    last_payment_amount: Optional[float]
+    last_payment_date: Optional[str]
+
+
+def epoch(moment) -> int:
+    """Seconds since 1970 of a naive local date or datetime, the way the checkin_at/checkout_at columns count them"""
+    return calendar.timegm(moment.timetuple())
+
+
+def day_bounds(day: Optional[date] = None) -> Tuple[int, int]:
+    """Return the half-open [start, end) epoch range covering one day"""
+    day = day or date.today()
+    return epoch(day), epoch(day + timedelta(days=1))
+
+
+def month_bounds(day: Optional[date] = None) -> Tuple[str, str]:
+    """Return the half-open [start, end) date range covering day's month"""
+    first = (day or date.today()).replace(day=1)
+    following = (first + timedelta(days=32)).replace(day=1)
+    return first.strftime(DATE_FORMAT), following.strftime(DATE_FORMAT)
+
+
+class ProfileCache:
+    """Bounded LRU of member id -> (name, phone, membership_type).
+
+    Check-in, payments and their receipts look up the same few members in
+    quick succession. An entry is dropped when this repository saves or
+    deletes the member, and every entry when the ``member_profiles`` change
+    counter moves (a member renamed, re-typed or deleted by any connection or
+    process). The counter is only read after ``PRAGMA data_version`` shows
+    that something was committed since the last check.
+
+    Every clear and invalidation bumps a generation. A profile loaded on a
+    miss is only stored if the generation has not moved since the miss, so a
+    row read before another connection's commit is not cached after it.
+    """
+
+    def __init__(self, db: Database, size=PROFILE_CACHE_SIZE):
+        self.db = db
+        self.size = size
+        self.hits = self.misses = self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._profiles_version = None
+        self._generation = 0
+
+    def _validate(self):
+        data_version = self.db.data_version()
+        if data_version == self._data_version:
+            return
+        profiles_version = self.db.execute(PROFILES_VERSION_SQL).fetchone()[0]
+        with self._lock:
+            if profiles_version != self._profiles_version:
+                # Loads in flight may have read the rows before the change, even with nothing cached yet
+                self._generation += 1
+                if self._entries:
+                    self._entries.clear()
+                    self.invalidations += 1
+            self._profiles_version = profiles_version
+            self._data_version = data_version
+
+    def _put(self, member_id, profile, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[member_id] = profile
+            self._entries.move_to_end(member_id)
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def get(self, member_id, load):
+        """The profile for member_id, calling load(member_id) on a miss"""
+        try:
+            member_id = int(member_id)
+        except (TypeError, ValueError):
+            return load(member_id)
+        self._validate()
+        with self._lock:
+            profile = self._entries.get(member_id)
+            if profile is not None:
+                self._entries.move_to_end(member_id)
+                self.hits += 1
+                return profile
+            self.misses += 1
+            generation = self._generation
+        profile = load(member_id)
+        if profile is not None:
+            self._put(member_id, tuple(profile), generation)
+        return profile
+
+    def get_many(self, member_ids: Iterable[int], load_many) -> Dict[int, Tuple[str, str, str]]:
+        """{id: profile} for member_ids, calling load_many(missing ids) once for the misses"""
+        self._validate()
+        found, missing = {}, []
+        with self._lock:
+            for member_id in member_ids:
+                profile = self._entries.get(member_id)
+                if profile is None:
+                    missing.append(member_id)
+                else:
+                    self._entries.move_to_end(member_id)
+                    found[member_id] = profile
+            self.hits += len(found)
+            self.misses += len(missing)
+            generation = self._generation
+        if missing:
+            for member_id, profile in load_many(missing).items():
+                self._put(member_id, profile, generation)
+                found[member_id] = profile
+        return found
+
+    def invalidate(self, member_id) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(int(member_id), None)
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit and miss counts for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+class MemberRepository:
+    def __init__(self, db: Database):
+        self.db = db
+        self._search_index = None
+        self.profiles = ProfileCache(db)
+
+    def get_name(self, member_id) -> Optional[str]:
+        profile = self.get_profile(member_id)
+        return profile[0] if profile else None
+
+    def get_profile(self, member_id) -> Optional[Tuple[str, str, str]]:
+        """Return (name, phone, membership_type) for a member, through the profile cache"""
+        return self.profiles.get(member_id, self._load_profile)
+
+    def _load_profile(self, member_id):
+        return self.db.execute(
+            "SELECT name, phone, membership_type FROM members WHERE id=?", (member_id,)
+        ).fetchone()
+
+    def get_profiles(self, member_ids: Iterable) -> Dict[int, Tuple[str, str, str]]:
+        """Return {id: (name, phone, membership_type)} for many members; cache misses are read in one query"""
+        return self.profiles.get_many({int(member_id) for member_id in member_ids}, self._load_profiles)
+
+    def _load_profiles(self, member_ids):
+        ids = json.dumps(sorted(member_ids))
+        return {
+            row[0]: row[1:]
+            for row in self.db.execute("""
+                SELECT id, name, phone, membership_type FROM members
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (ids,))
+        }
+
+    def add(self, data: Sequence) -> int:
+        """Insert a member from (name, age, gender, phone, address, type, start, end)"""
+        with self.db.transaction() as conn:
+            cur = conn.execute("""
+                INSERT INTO members (name, age, gender, phone, address, membership_type, start_date, end_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, tuple(data))
+        self.profiles.invalidate(cur.lastrowid)
+        return cur.lastrowid
+
+    def delete(self, member_id) -> None:
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM members WHERE id=?", (member_id,))
+        self.profiles.invalidate(member_id)
+
+    def page(self, before_id=None, after_id=None, limit=200, membership_type=None, search=None) -> List[tuple]:
+        """Keyset page of directory rows, newest id first.
+
+        With before_id, returns the next rows below it (older members);
+        with after_id, the rows directly above it (newer members). search
+        matches substrings of name, phone or address through the trigram
+        index when the term is long enough, otherwise with a LIKE scan.
+        """
+        source, id_column = "members", "members.id"
+        where, params = [], []
+        if search and len(search) >= MIN_INDEXED_SEARCH and self.has_search_index():
+            source = "members_fts JOIN members ON members.id = members_fts.rowid"
+            id_column = "members_fts.rowid"
+            where.append("members_fts MATCH ?")
+            params.append('"' + search.replace('"', '""') + '"')
+        elif search:
+            where.append("(name LIKE ? OR phone LIKE ? OR address LIKE ?)")
+            params.extend([f"%{search}%"] * 3)
+        if before_id is not None:
+            where.append(f"{id_column} < ?")
+            params.append(before_id)
+        if after_id is not None:
+            where.append(f"{id_column} > ?")
+            params.append(after_id)
+        if membership_type:
+            where.append("membership_type = ?")
+            params.append(membership_type)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        order = "ASC" if after_id is not None else "DESC"
+        rows = self.db.execute(f"""
+            SELECT {DIRECTORY_COLUMNS}
+            FROM {source}
+            {clause}
+            ORDER BY {id_column} {order}
+            LIMIT ?
+        """, (*params, limit)).fetchall()
+        if after_id is not None:
+            rows.reverse()
+        return rows
+
+    def has_search_index(self) -> bool:
+        if self._search_index is None:
+            self._search_index = has_search_index(self.db.connection())
+        return self._search_index
+
+    def list_all(self) -> List[tuple]:
+        return self.db.execute(f"""
+            SELECT {DIRECTORY_COLUMNS}
+            FROM members
+            ORDER BY id DESC
+        """).fetchall()
+
+    def count(self, membership_type=None) -> int:
+        """Member count; the unfiltered total comes from the dashboard counter"""
+        if membership_type:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM members WHERE membership_type = ?", (membership_type,)
+            ).fetchone()[0]
+        row = self.db.execute("SELECT value FROM stats_counters WHERE name = 'members_total'").fetchone()
+        return row[0] if row else 0
+
+
+class AttendanceRepository:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def find_open_session_today(self, member_id) -> Optional[int]:
+        """Return the id of the member's open check-in from today, if any"""
+        row = self.db.execute(OPEN_SESSION_SQL, (member_id, *day_bounds())).fetchone()
+        return row[0] if row else None
+
+    def check_in(self, member_id) -> int:
+        with self.db.transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO attendance (member_id, checkin_time) VALUES (?, ?)",
+                (member_id, datetime.now().strftime(TIMESTAMP_FORMAT))
+            )
+            return cur.lastrowid
+
+    def check_out(self, attendance_id) -> None:
+        with self.db.transaction() as conn:
+            conn.execute(
+                "UPDATE attendance SET checkout_time=? WHERE id=?",
+                (datetime.now().strftime(TIMESTAMP_FORMAT), attendance_id)
+            )
+
+    def recent(self, limit=100) -> List[tuple]:
+        """Latest sessions as (id, member_id, name, checkin, checkout, duration)"""
+        return self.db.execute(RECENT_ATTENDANCE_SQL, (limit,)).fetchall()
+
+    def changes(self, after_id, open_ids: Sequence[int] = (), limit=100) -> List[tuple]:
+        """Sessions with id > after_id (newest first, at most limit) plus those of open_ids now closed"""
+        rows = self.db.execute(NEW_ATTENDANCE_SQL, (after_id, limit)).fetchall()
+        if open_ids:
+            rows += self.db.execute(
+                CLOSED_ATTENDANCE_SQL, (json.dumps([int(i) for i in open_ids]),)
+            ).fetchall()
+        return rows
+
+    def count_active_today(self) -> int:
+        return self.db.execute(ACTIVE_TODAY_SQL, day_bounds()).fetchone()[0] or 0
+
+
+class TransactionRepository:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def add(self, member_id, amount: float, membership_type=None, payment_method=None) -> int:
+        """Insert a payment; the revenue rollups are updated by triggers in the same transaction"""
+        with self.db.transaction() as conn:
+            cur = conn.execute("""
+                INSERT INTO transactions (member_id, amount_paid, date, membership_type, payment_method)
+                VALUES (?, ?, ?, ?, ?)
+            """, (member_id, amount, datetime.now().strftime(DATE_FORMAT), membership_type, payment_method))
+            return cur.lastrowid
+
+    def recent(self, limit=100) -> List[tuple]:
+        """Latest payments as (id, member_id, name, amount, date, membership_type, payment_method)"""
+        return self.db.execute(RECENT_TRANSACTIONS_SQL, (limit,)).fetchall()
+
+    def since(self, after_id, limit=100) -> List[tuple]:
+        """Payments with id > after_id, newest first, at most limit"""
+        return self.db.execute(NEW_TRANSACTIONS_SQL, (after_id, limit)).fetchall()
+
+    def revenue_this_month(self) -> float:
+        return self.db.execute(REVENUE_RANGE_SQL, month_bounds()).fetchone()[0] or 0
+
+
+class Receipt(NamedTuple):
+    number: int
+    transaction_id: Optional[int]
+    member_id: Optional[int]
+    issued_at: str
+    amount: float
+    payment_method: Optional[str]
+    pdf_sha256: Optional[str]          # None until the PDF is stored
+
+    @property
+    def label(self) -> str:
+        return f"GF-{self.issued_at[:4]}-{self.number:06d}"
+
+
+def receipt_number(value) -> Optional[int]:
+    """The number of a receipt given as 42, "42" or its printed label "GF-2025-000042"; None if unparseable"""
+    match = RECEIPT_LABEL.match(str(value).strip())
+    return int(match.group(1)) if match else None
+
+
+class ReceiptRepository:
+    """Issued receipts and their stored PDFs.
+
+    Issuing a receipt reserves the next number (the table's AUTOINCREMENT key)
+    before the PDF is rendered; the rendered bytes are then stored under their
+    SHA-256, so a reprint reads the blob instead of rendering again.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def issue(self, member_id, amount: float, payment_method=None, transaction_id=None) -> Receipt:
+        """Reserve the next receipt number; unknown members are recorded as NULL"""
+        return self.issue_many([(member_id, amount, payment_method, transaction_id)])[0]
+
+    def issue_many(self, payments: Iterable[Sequence]) -> List[Receipt]:
+        """Reserve numbers for (member_id, amount, payment_method[, transaction_id]) tuples in one transaction"""
+        issued_at = datetime.now().strftime(TIMESTAMP_FORMAT)
+        receipts = []
+        with self.db.transaction() as conn:
+            for member_id, amount, payment_method, *transaction_id in payments:
+                cur = conn.execute("""
+                    INSERT INTO receipts (transaction_id, member_id, issued_at, amount, payment_method)
+                    VALUES (?, (SELECT id FROM members WHERE id = ?), ?, ?, ?)
+                """, (transaction_id[0] if transaction_id else None, member_id, issued_at, amount, payment_method))
+                receipts.append(cur.lastrowid)
+        return self._fetch(receipts)
+
+    def store_pdf(self, number, pdf: bytes) -> str:
+        """Store a receipt's rendered PDF; returns its SHA-256"""
+        return self.store_pdfs([(number, pdf)])[0]
+
+    def store_pdfs(self, items: Iterable[Tuple[int, bytes]]) -> List[str]:
+        """Store (number, pdf) pairs in one transaction; identical PDFs are kept once"""
+        hashes = []
+        with self.db.transaction() as conn:
+            for number, pdf in items:
+                sha256 = hashlib.sha256(pdf).hexdigest()
+                conn.execute("INSERT OR IGNORE INTO receipt_blobs (sha256, pdf) VALUES (?, ?)", (sha256, pdf))
+                conn.execute("UPDATE receipts SET pdf_sha256 = ? WHERE number = ?", (sha256, number))
+                hashes.append(sha256)
+        return hashes
+
+    def pdf(self, number) -> Optional[bytes]:
+        """The stored PDF of a receipt, or None"""
+        row = self.db.execute("""
+            SELECT b.pdf FROM receipts r JOIN receipt_blobs b ON b.sha256 = r.pdf_sha256
+            WHERE r.number = ?
+        """, (receipt_number(number),)).fetchone()
+        return row[0] if row else None
+
+    def find(self, member_id=None, number=None, start=None, end=None, transaction_id=None,
+             limit=100) -> List[Receipt]:
+        """Receipts newest first, filtered by member, number (or label), transaction or issue dates.
+
+        start and end are YYYY-MM-DD dates; end is exclusive.
+        """
+        where, params = [], []
+        if number is not None:
+            where.append("number = ?")
+            params.append(receipt_number(number))
+        if member_id is not None:
+            where.append("member_id = ?")
+            params.append(member_id)
+        if transaction_id is not None:
+            where.append("transaction_id = ?")
+            params.append(transaction_id)
+        if start:
+            where.append("issued_at >= ?")
+            params.append(start)
+        if end:
+            where.append("issued_at < ?")
+            params.append(end)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        rows = self.db.execute(f"""
+            SELECT {RECEIPT_COLUMNS} FROM receipts
+            {clause}
+            ORDER BY number DESC
+            LIMIT ?
+        """, (*params, limit))
+        return [Receipt(*row) for row in rows]
+
+    def _fetch(self, numbers) -> List[Receipt]:
+        rows = {
+            row[0]: Receipt(*row)
+            for row in self.db.execute(f"""
+                SELECT {RECEIPT_COLUMNS} FROM receipts
+                WHERE number IN (SELECT value FROM json_each(?))
+            """, (json.dumps(numbers),))
+        }
+        return [rows[number] for number in numbers]
+
+
+class GymRepository:
+    """Entry point bundling the per-table repositories for one database"""
+
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or get_database()
+        self.members = MemberRepository(self.db)
+        self.attendance = AttendanceRepository(self.db)
+        self.transactions = TransactionRepository(self.db)
+        self.receipts = ReceiptRepository(self.db)
+
+    def dashboard_stats(self) -> DashboardStats:
+        """Read the trigger-maintained dashboard counters (see stats.py)"""
+        today = date.today()
+        row = self.db.execute(
+            DASHBOARD_SQL, (today.strftime(DATE_FORMAT), today.strftime("%Y-%m"))
+        ).fetchone()
+        return DashboardStats(*(value or 0 for value in row))
+
+    def member_summary(self, member_id) -> Optional[MemberSummary]:
+        """Profile, visit and payment totals, latest visit and payment of one member in one statement"""
+        conn = self.db.connection()
+        visits, params = archive.union(conn, MEMBER_VISITS_ARM, (member_id,))
+        row = conn.execute(MEMBER_SUMMARY_SQL.format(visits=visits), (*params, member_id, member_id)).fetchone()
+        return MemberSummary(*row) if row else None
+
+    def member_visits(self, member_id, before: Optional[Sequence] = None, limit=HISTORY_PAGE) -> List[tuple]:
+        """Page of (id, checkin_time, checkout_time, duration) newest first, archived visits included.
+
+        before is the (checkin_time, id) of the last row of the previous page.
+        """
+        params = [member_id]
+        if before is not None:
+            params.extend([before[0], before[0], before[1]])
+        arm = MEMBER_VISITS_PAGE_ARM.format(
+            attendance="{attendance}",
+            before=HISTORY_BEFORE.format(column="checkin_time") if before is not None else "",
+        )
+        conn = self.db.connection()
+        sql, params = archive.union(conn, arm, (*params, limit))
+        rows = conn.execute(f"{sql}\nORDER BY checkin_time DESC, id DESC LIMIT ?", (*params, limit))
+        return [
+            (attendance_id, checkin, checkout,
+             "Active" if checkout is None else "Auto-closed" if auto_closed else f"{seconds // 60} min")
+            for attendance_id, checkin, checkout, auto_closed, seconds in rows
+        ]
+
+    def member_payments(self, member_id, before: Optional[Sequence] = None, limit=HISTORY_PAGE) -> List[tuple]:
+        """Page of (id, date, amount, membership_type, payment_method) newest first.
+
+        before is the (date, id) of the last row of the previous page.
+        """
+        params = [member_id]
+        if before is not None:
+            params.extend([before[0], before[0], before[1]])
+        sql = MEMBER_PAYMENTS_PAGE_SQL.format(
+            before=HISTORY_BEFORE.format(column="date") if before is not None else ""
+        )
+        return self.db.execute(sql, (*params, limit)).fetchall()
+
+    def data_version(self) -> int:
+        """Changes whenever any connection commits; cheap enough to poll (see Database.data_version)"""
+        return self.db.data_version()
+
+    def diagnostics(self) -> dict:
+        """Per-statement SQL timings, lock waits, the slow-query log and profile cache counters (see sql_stats.py)"""
+        return dict(sql_stats.snapshot(), profile_cache=self.members.profiles.stats())
+
+    def reset_diagnostics(self) -> None:
+        sql_stats.reset()
+        self.members.profiles.reset_counters()
+
+    # Front-desk actions: lookup and write run in one transaction so two desks
+    # scanning the same member cannot both pass the checks.
+
+    def check_in_member(self, member_id) -> Tuple[str, Optional[str]]:
+        """Check a member in; returns (status, name), status being OK, NOT_FOUND or ALREADY_CHECKED_IN"""
+        with self.db.transaction():
+            name = self.members.get_name(member_id)
+            if not name:
+                return NOT_FOUND, None
+            if self.attendance.find_open_session_today(member_id):
+                return ALREADY_CHECKED_IN, name
+            self.attendance.check_in(member_id)
+            return OK, name
+
+    def check_out_member(self, member_id) -> str:
+        """Close today's open session; returns OK or NO_OPEN_SESSION"""
+        with self.db.transaction():
+            attendance_id = self.attendance.find_open_session_today(member_id)
+            if not attendance_id:
+                return NO_OPEN_SESSION
+            self.attendance.check_out(attendance_id)
+            return OK
+
+    def record_payment(self, member_id, amount: float, membership_type=None,
+                       payment_method=None) -> Tuple[str, Optional[str]]:
+        """Record a payment; returns (status, name), status being OK or NOT_FOUND.
+
+        membership_type defaults to the member's current type.
+        """
+        status, name, _ = self._record_payment(member_id, amount, membership_type, payment_method)
+        return status, name
+
+    def record_payment_with_receipt(self, member_id, amount: float, membership_type=None,
+                                    payment_method=None) -> Tuple[str, Optional[str], Optional[Receipt]]:
+        """record_payment plus its receipt number, in the same transaction; returns (status, name, receipt).
+
+        The caller renders the PDF and stores it with receipts.store_pdf.
+        """
+        with self.db.transaction():
+            status, name, transaction_id = self._record_payment(member_id, amount, membership_type, payment_method)
+            if status != OK:
+                return status, name, None
+            return status, name, self.receipts.issue(member_id, amount, payment_method, transaction_id)
+
+    def _record_payment(self, member_id, amount, membership_type, payment_method):
+        with self.db.transaction():
+            profile = self.members.get_profile(member_id)
+            if not profile:
+                return NOT_FOUND, None, None
+            name, _, current_type = profile
+            transaction_id = self.transactions.add(member_id, amount, membership_type or current_type, payment_method)
+            return OK, name, transaction_id
+
+    def toggle_member(self, member_id) -> Tuple[str, Optional[str]]:
+        """Check out a member with an open session today, otherwise check in; returns (status, name)"""
+        with self.db.transaction():
+            name = self.members.get_name(member_id)
+            if not name:
+                return NOT_FOUND, None
+            attendance_id = self.attendance.find_open_session_today(member_id)
+            if attendance_id:
+                self.attendance.check_out(attendance_id)
+                return CHECKED_OUT, name
+            self.attendance.check_in(member_id)
+            return CHECKED_IN, name
+
+
+_repositories = {}
+
+
+def get_repository(path=None) -> GymRepository:
+    """Return the shared repository for path (defaults to db.DB_PATH).
+
+    Without a path and with GYM_SERVICE set, returns a ``service.ServiceClient``
+    with the same interface, so the windows act as thin clients.
+    """
+    if path is None and SERVICE_URL:
+        from service import get_client
+        return get_client(SERVICE_URL)
+    db = get_database(path)
+    repo = _repositories.get(db.path)
+    if repo is None or repo.db is not db:
+        repo = _repositories[db.path] = GymRepository(db)
+    return repo
@@ -0,0 +1,142 @@
+"""Revenue reports answered from rollups instead of the transaction ledger.
+
+Every payment updates ``revenue_breakdown`` (one row per day, membership
+type and payment method) through triggers created in ``db.connect_db``, in
+the same transaction as its INSERT, so the rollup can never disagree with
+the ledger. A report over N days reads at most N x types x methods rollup
+rows, however many payments they hold.
+
+Headless usage::
+
+    python revenue.py report [--from 2024-01-01] [--to 2025-01-01] [--by month payment_method]
+    python revenue.py rebuild           # rebuild the rollups from the ledger
+    python revenue.py backfill-types    # guess missing membership types from members' current plans
+
+Payments recorded before membership types were stored are reported under
+"Unknown". ``backfill-types`` fills them in with the member's *current* type,
+which is wrong for anyone who has changed plans since, and every filled-in
+payment is a change sync.py sends to the other branches; it only runs when
+asked for.
+"""
+import argparse
+import sys
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from db import get_database
+import stats
+
+# Report dimensions and their SQL over revenue_breakdown
+GROUPINGS = {
+    "day": "day",
+    "month": "substr(day, 1, 7)",
+    "year": "substr(day, 1, 4)",
+    "membership_type": "membership_type",
+    "payment_method": "payment_method",
+}
+
+
+class RevenueRow(NamedTuple):
+    key: Tuple[str, ...]
+    payments: int
+    amount: float
+
+
+def _range(start, end):
+    where, params = [], []
+    if start:
+        where.append("day >= ?")
+        params.append(start)
+    if end:
+        where.append("day < ?")
+        params.append(end)
+    return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+def revenue_report(db=None, start: Optional[str] = None, end: Optional[str] = None,
+                   by: Union[str, Sequence[str]] = "month") -> List[RevenueRow]:
+    """Payments and revenue over [start, end) (YYYY-MM-DD), grouped by one or more GROUPINGS"""
+    db = db or get_database()
+    dimensions = [by] if isinstance(by, str) else list(by)
+    columns = ", ".join(GROUPINGS[dimension] for dimension in dimensions)
+    where, params = _range(start, end)
+    rows = db.execute(f"""
+        SELECT {columns}, SUM(payments), SUM(amount)
+        FROM revenue_breakdown
+        {where}
+        GROUP BY {columns}
+        HAVING SUM(payments) != 0
+        ORDER BY {columns}
+    """, params)
+    width = len(dimensions)
+    return [RevenueRow(tuple(row[:width]), row[width], round(row[width + 1], 2)) for row in rows]
+
+
+def revenue_total(db=None, start: Optional[str] = None, end: Optional[str] = None) -> Tuple[int, float]:
+    """(payments, amount) over [start, end)"""
+    db = db or get_database()
+    where, params = _range(start, end)
+    payments, amount = db.execute(
+        f"SELECT COALESCE(SUM(payments), 0), COALESCE(SUM(amount), 0) FROM revenue_breakdown {where}", params
+    ).fetchone()
+    return payments, round(amount, 2)
+
+
+def backfill(conn) -> int:
+    """Give payments recorded before membership types were stored their member's current type.
+
+    A guess: members who have changed plans get their new type on old
+    payments. Nothing calls this implicitly; see ``backfill-types``.
+    """
+    return conn.execute("""
+        UPDATE transactions
+        SET membership_type = (SELECT membership_type FROM members WHERE members.id = transactions.member_id)
+        WHERE membership_type IS NULL
+          AND member_id IN (SELECT id FROM members WHERE membership_type IS NOT NULL)
+    """).rowcount
+
+
+def rebuild(db=None) -> None:
+    """Recompute every revenue rollup from the ledger"""
+    db = db or get_database()
+    with db.transaction() as conn:
+        stats.rebuild(conn)
+
+
+def backfill_types(db=None) -> int:
+    """Run ``backfill`` in its own transaction; returns the payments given a type.
+
+    The rollup triggers move those payments out of "Unknown".
+    """
+    db = db or get_database()
+    with db.transaction() as conn:
+        return backfill(conn)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Revenue reports from the rollup tables")
+    parser.add_argument("command", choices=["report", "rebuild", "backfill-types"])
+    parser.add_argument("--from", dest="start", help="first day (YYYY-MM-DD) to include")
+    parser.add_argument("--to", dest="end", help="first day (YYYY-MM-DD) to leave out")
+    parser.add_argument("--by", nargs="+", choices=list(GROUPINGS), default=["month"])
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    args = parser.parse_args(argv)
+
+    db = get_database(args.db)
+    if args.command == "rebuild":
+        rebuild(db)
+        print("Rebuilt revenue rollups")
+        return 0
+    if args.command == "backfill-types":
+        backfilled = backfill_types(db)
+        print(f"{backfilled} payments given their member's current membership type")
+        return 0
+
+    for key, payments, amount in revenue_report(db, args.start, args.end, args.by):
+        print(f"{' / '.join(key):<40} {payments:>8} {amount:>14.2f}")
+    payments, amount = revenue_total(db, args.start, args.end)
+    print(f"{'Total':<40} {payments:>8} {amount:>14.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,681 @@
+"""Local HTTP service so several front desks share one gym database.
+
+Run it on the machine that holds ``gym.db``::
+
+    python service.py [--host 127.0.0.1] [--port 8765] [--db gym.db] [--group-commit-ms 5]
+
+and set ``GYM_SERVICE=http://<host>:8765`` on each desk. ``get_repository()``
+then returns a ``ServiceClient``, so the windows send their actions here
+instead of opening the database file themselves.
+
+Every write runs on one writer thread, in arrival order, so desks never
+compete for the SQLite write lock. Reads run on a small pool of reader
+threads with their own WAL connections. With ``--group-commit-ms`` the writer
+commits bursts of writes together (see ``WriteQueue``): one fsync per batch
+instead of one per scan, each desk answered once its batch is on disk. The business rules are the ones in
+``repository.GymRepository``. The periodic maintenance jobs
+(``maintenance.py``) run in the service process.
+
+Endpoints (JSON in, ``{"result": ...}`` or ``{"error": ...}`` out):
+
+    GET    /stats
+    GET    /members?search=&type=&before_id=&after_id=&limit=
+    GET    /members/count?type=
+    GET    /members/profiles?ids=1,2,3
+    GET    /members/<id>
+    GET    /members/<id>/summary    (member detail: profile, visit and payment totals)
+    GET    /members/<id>/visits?before_time=&before_id=&limit=
+    GET    /members/<id>/payments?before_date=&before_id=&limit=
+    POST   /members                 {"member": [name, age, gender, phone, address, type, start, end]}
+    DELETE /members/<id>
+    POST   /checkin                 {"member_id": 1}
+    POST   /checkout                {"member_id": 1}
+    POST   /scan                    {"member_id": 1}   (turnstile: check in or out)
+    POST   /payments                {"member_id": 1, "amount": 30.0, "membership_type": ..., "payment_method": ...}
+    POST   /payments/receipt        (same body; also reserves the payment's receipt number)
+    GET    /receipts?member_id=&number=&start=&end=&transaction_id=&limit=
+    POST   /receipts                {"payments": [[member_id, amount, payment_method], ...]}
+    POST   /receipts/pdfs           {"pdfs": [[number, base64 PDF], ...]}
+    GET    /receipts/<number>/pdf   (base64)
+    GET    /attendance/recent?limit=
+    GET    /attendance/changes?after=&open=1,2,3&limit=
+    GET    /transactions/recent?limit=
+    GET    /transactions/since?after=&limit=
+    GET    /version                 (changes whenever the database commits)
+    GET    /diagnostics             (SQL timings and slow-query log, see sql_stats.py)
+    DELETE /diagnostics
+"""
+import argparse
+import base64
+import http.client
+import json
+import logging
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from db import get_database
+from maintenance import Scheduler
+from repository import HISTORY_PAGE, DashboardStats, GymRepository, MemberSummary, Receipt, receipt_number
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+READER_COUNT = 4
+CLIENT_TIMEOUT = 10
+# Largest group-commit batch
+GROUP_COMMIT_OPS = 64
+
+ROUTES = []
+
+
+def route(method, pattern):
+    """Register func(service, params, body, *groups) for method and path pattern"""
+    def register(func):
+        ROUTES.append((method, re.compile(pattern + "$"), func))
+        return func
+    return register
+
+
+class WriteQueue:
+    """Runs submitted write jobs one at a time on a single thread.
+
+    With a database and batch_ms set (group commit), jobs run inside one
+    transaction, each in its own savepoint so a failing job only undoes
+    itself, until batch_ops jobs have run or batch_ms has passed since the
+    first (batch_ms=0: until the queue is empty). Their futures resolve after
+    the COMMIT, so a caller is only answered once its write is durable; if the
+    COMMIT fails every job in the batch gets the error.
+    """
+
+    def __init__(self, db=None, batch_ms=None, batch_ops=GROUP_COMMIT_OPS):
+        self.db = db
+        self.batch_ms = batch_ms
+        self.batch_ops = batch_ops
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="gym-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args) -> Future:
+        future = Future()
+        self.jobs.put((func, args, future))
+        return future
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            if self.db is not None and self.batch_ms is not None:
+                if self._run_batch(job):
+                    return
+                continue
+            func, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def _run_batch(self, job):
+        """Run job and those queued behind it in one transaction; returns True if close() was called"""
+        done = []                   # (future, result, error) of each job run
+        closing = False
+        deadline = time.monotonic() + self.batch_ms / 1000
+        try:
+            with self.db.transaction() as conn:
+                while True:
+                    func, args, future = job
+                    if future.set_running_or_notify_cancel():
+                        done.append((future, *self._run_savepoint(conn, func, args)))
+                    if len(done) >= self.batch_ops:
+                        break
+                    try:
+                        job = self.jobs.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        closing = True
+                        break
+        except BaseException as e:
+            # BEGIN or COMMIT failed: nothing in the batch was written
+            done = [(future, None, error or e) for future, result, error in done]
+            if not done:
+                # BEGIN failed before the first job ran; it is still waiting for an answer
+                func, args, future = job
+                if future.set_running_or_notify_cancel():
+                    done.append((future, None, e))
+        for future, result, error in done:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        return closing
+
+    @staticmethod
+    def _run_savepoint(conn, func, args):
+        """(result, None) or (None, error); a failed job's changes are rolled back"""
+        conn.execute("SAVEPOINT job")
+        try:
+            result = func(*args)
+        except BaseException as e:
+            try:
+                conn.execute("ROLLBACK TO job")
+                conn.execute("RELEASE job")
+            except sqlite3.Error:
+                # The error already ended the transaction; the COMMIT reports it for the batch
+                pass
+            return None, e
+        conn.execute("RELEASE job")
+        return result, None
+
+    def close(self):
+        self.jobs.put(None)
+        self.thread.join()
+
+
+class GymService:
+    """Repository calls routed through the writer thread or the reader pool"""
+
+    def __init__(self, db=None, readers=READER_COUNT, group_commit_ms=None, group_commit_ops=GROUP_COMMIT_OPS):
+        self.repo = GymRepository(db or get_database())
+        self.writer = WriteQueue(self.repo.db, group_commit_ms, group_commit_ops)
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="gym-reader")
+
+    def write(self, func, *args):
+        return self.writer.submit(func, *args).result()
+
+    def read(self, func, *args):
+        return self.readers.submit(func, *args).result()
+
+    def close(self):
+        self.writer.close()
+        self.readers.shutdown()
+
+
+def _int(params, name, default=None):
+    value = params.get(name)
+    return default if value in (None, "") else int(value)
+
+
+@route("GET", r"/stats")
+def get_stats(service, params, body):
+    return service.read(service.repo.dashboard_stats)._asdict()
+
+
+@route("GET", r"/members")
+def get_members(service, params, body):
+    return service.read(
+        lambda: service.repo.members.page(
+            before_id=_int(params, "before_id"), after_id=_int(params, "after_id"),
+            limit=_int(params, "limit", 200), membership_type=params.get("type") or None,
+            search=params.get("search") or None,
+        )
+    )
+
+
+@route("GET", r"/members/count")
+def get_member_count(service, params, body):
+    return service.read(service.repo.members.count, params.get("type") or None)
+
+
+@route("GET", r"/members/profiles")
+def get_member_profiles(service, params, body):
+    ids = [int(member_id) for member_id in params.get("ids", "").split(",") if member_id]
+    return service.read(service.repo.members.get_profiles, ids)
+
+
+@route("GET", r"/members/(\d+)")
+def get_member(service, params, body, member_id):
+    return service.read(service.repo.members.get_profile, int(member_id))
+
+
+@route("GET", r"/members/(\d+)/summary")
+def get_member_summary(service, params, body, member_id):
+    return service.read(service.repo.member_summary, int(member_id))
+
+
+def _before(params, column):
+    """(sort value, id) of the last row of the previous history page, or None for the first"""
+    before_id = _int(params, "before_id")
+    return None if before_id is None else (params[column], before_id)
+
+
+@route("GET", r"/members/(\d+)/visits")
+def get_member_visits(service, params, body, member_id):
+    return service.read(
+        service.repo.member_visits, int(member_id), _before(params, "before_time"), _int(params, "limit", HISTORY_PAGE)
+    )
+
+
+@route("GET", r"/members/(\d+)/payments")
+def get_member_payments(service, params, body, member_id):
+    return service.read(
+        service.repo.member_payments, int(member_id), _before(params, "before_date"), _int(params, "limit", HISTORY_PAGE)
+    )
+
+
+@route("POST", r"/members")
+def add_member(service, params, body):
+    return service.write(service.repo.members.add, list(body["member"]))
+
+
+@route("DELETE", r"/members/(\d+)")
+def delete_member(service, params, body, member_id):
+    return service.write(service.repo.members.delete, int(member_id))
+
+
+@route("POST", r"/checkin")
+def check_in(service, params, body):
+    return service.write(service.repo.check_in_member, body["member_id"])
+
+
+@route("POST", r"/checkout")
+def check_out(service, params, body):
+    return service.write(service.repo.check_out_member, body["member_id"])
+
+
+@route("POST", r"/scan")
+def scan(service, params, body):
+    return service.write(service.repo.toggle_member, body["member_id"])
+
+
+@route("POST", r"/payments")
+def record_payment(service, params, body):
+    return service.write(
+        service.repo.record_payment, body["member_id"], float(body["amount"]),
+        body.get("membership_type"), body.get("payment_method"),
+    )
+
+
+@route("POST", r"/payments/receipt")
+def record_payment_with_receipt(service, params, body):
+    return service.write(
+        service.repo.record_payment_with_receipt, body["member_id"], float(body["amount"]),
+        body.get("membership_type"), body.get("payment_method"),
+    )
+
+
+@route("GET", r"/receipts")
+def find_receipts(service, params, body):
+    return service.read(lambda: service.repo.receipts.find(
+        member_id=_int(params, "member_id"), number=params.get("number") or None,
+        start=params.get("start") or None, end=params.get("end") or None,
+        transaction_id=_int(params, "transaction_id"), limit=_int(params, "limit", 100),
+    ))
+
+
+@route("POST", r"/receipts")
+def issue_receipts(service, params, body):
+    return service.write(service.repo.receipts.issue_many, body["payments"])
+
+
+@route("POST", r"/receipts/pdfs")
+def store_receipt_pdfs(service, params, body):
+    pdfs = [(int(number), base64.b64decode(pdf)) for number, pdf in body["pdfs"]]
+    return service.write(service.repo.receipts.store_pdfs, pdfs)
+
+
+@route("GET", r"/receipts/(\d+)/pdf")
+def get_receipt_pdf(service, params, body, number):
+    pdf = service.read(service.repo.receipts.pdf, int(number))
+    return base64.b64encode(pdf).decode("ascii") if pdf is not None else None
+
+
+@route("GET", r"/attendance/recent")
+def recent_attendance(service, params, body):
+    return service.read(service.repo.attendance.recent, _int(params, "limit", 100))
+
+
+@route("GET", r"/attendance/changes")
+def attendance_changes(service, params, body):
+    open_ids = [int(session_id) for session_id in params.get("open", "").split(",") if session_id]
+    return service.read(
+        service.repo.attendance.changes, _int(params, "after", 0), open_ids, _int(params, "limit", 100)
+    )
+
+
+@route("GET", r"/transactions/recent")
+def recent_transactions(service, params, body):
+    return service.read(service.repo.transactions.recent, _int(params, "limit", 100))
+
+
+@route("GET", r"/transactions/since")
+def transactions_since(service, params, body):
+    return service.read(service.repo.transactions.since, _int(params, "after", 0), _int(params, "limit", 100))
+
+
+@route("GET", r"/version")
+def get_version(service, params, body):
+    return service.read(service.repo.data_version)
+
+
+@route("GET", r"/diagnostics")
+def get_diagnostics(service, params, body):
+    return service.repo.diagnostics()
+
+
+@route("DELETE", r"/diagnostics")
+def reset_diagnostics(service, params, body):
+    service.repo.reset_diagnostics()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this each reply waits on delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        for route_method, pattern, func in ROUTES:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                break
+        else:
+            self._reply(404, {"error": f"no route for {method} {url.path}"})
+            return
+        try:
+            body = json.loads(raw) if raw else {}
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            result = func(self.server.service, params, body, *match.groups())
+        except (KeyError, TypeError, ValueError) as e:
+            self._reply(400, {"error": f"bad request: {e}"})
+        except sqlite3.OperationalError as e:
+            self._reply(503, {"error": str(e)})
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+        else:
+            self._reply(200, {"result": result})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, verbose=False):
+        super().__init__(address, ServiceHandler)
+        self.service = service
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class ServiceError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceClient:
+    """Drop-in for GymRepository that calls a running service.
+
+    Keeps one keep-alive HTTP connection per thread.
+    """
+
+    def __init__(self, url, timeout=CLIENT_TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or DEFAULT_PORT
+        self.timeout = timeout
+        self._local = threading.local()
+        self.members = _RemoteMembers(self)
+        self.attendance = _RemoteAttendance(self)
+        self.transactions = _RemoteTransactions(self)
+        self.receipts = _RemoteReceipts(self)
+
+    def request(self, method, path, body=None, **params):
+        query = urlencode({name: value for name, value in params.items() if value is not None})
+        target = f"{path}?{query}" if query else path
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        conn = getattr(self._local, "conn", None)
+        reused = conn is not None
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, target, body=data, headers=headers)
+            response = conn.getresponse()
+            payload = json.loads(response.read() or b"{}")
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            self._local.conn = None
+            # A kept-alive connection the server has since dropped (e.g. restarted); retry once on a new one
+            if not reused:
+                raise
+            return self.request(method, path, body, **params)
+        if response.status != 200:
+            raise ServiceError(payload.get("error", response.reason), response.status)
+        return payload["result"]
+
+    def dashboard_stats(self) -> DashboardStats:
+        return DashboardStats(**self.request("GET", "/stats"))
+
+    def check_in_member(self, member_id):
+        return tuple(self.request("POST", "/checkin", {"member_id": member_id}))
+
+    def check_out_member(self, member_id):
+        return self.request("POST", "/checkout", {"member_id": member_id})
+
+    def toggle_member(self, member_id):
+        return tuple(self.request("POST", "/scan", {"member_id": member_id}))
+
+    def record_payment(self, member_id, amount, membership_type=None, payment_method=None):
+        return tuple(self.request("POST", "/payments", {
+            "member_id": member_id, "amount": amount,
+            "membership_type": membership_type, "payment_method": payment_method,
+        }))
+
+    def record_payment_with_receipt(self, member_id, amount, membership_type=None, payment_method=None):
+        status, name, receipt = self.request("POST", "/payments/receipt", {
+            "member_id": member_id, "amount": amount,
+            "membership_type": membership_type, "payment_method": payment_method,
+        })
+        return status, name, Receipt(*receipt) if receipt else None
+
+    def member_summary(self, member_id):
+        summary = self.request("GET", f"/members/{int(member_id)}/summary")
+        return MemberSummary(*summary) if summary else None
+
+    def member_visits(self, member_id, before=None, limit=HISTORY_PAGE):
+        before_time, before_id = before or (None, None)
+        rows = self.request(
+            "GET", f"/members/{int(member_id)}/visits", before_time=before_time, before_id=before_id, limit=limit
+        )
+        return [tuple(row) for row in rows]
+
+    def member_payments(self, member_id, before=None, limit=HISTORY_PAGE):
+        before_date, before_id = before or (None, None)
+        rows = self.request(
+            "GET", f"/members/{int(member_id)}/payments", before_date=before_date, before_id=before_id, limit=limit
+        )
+        return [tuple(row) for row in rows]
+
+    def data_version(self):
+        return self.request("GET", "/version")
+
+    def diagnostics(self):
+        return self.request("GET", "/diagnostics")
+
+    def reset_diagnostics(self):
+        self.request("DELETE", "/diagnostics")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _RemoteMembers:
+    def __init__(self, client):
+        self.client = client
+
+    def get_profile(self, member_id):
+        profile = self.client.request("GET", f"/members/{int(member_id)}")
+        return tuple(profile) if profile else None
+
+    def get_profiles(self, member_ids):
+        ids = ",".join(str(int(member_id)) for member_id in member_ids)
+        profiles = self.client.request("GET", "/members/profiles", ids=ids)
+        return {int(member_id): tuple(profile) for member_id, profile in profiles.items()}
+
+    def add(self, data):
+        return self.client.request("POST", "/members", {"member": list(data)})
+
+    def delete(self, member_id):
+        self.client.request("DELETE", f"/members/{int(member_id)}")
+
+    def page(self, before_id=None, after_id=None, limit=200, membership_type=None, search=None):
+        rows = self.client.request(
+            "GET", "/members", before_id=before_id, after_id=after_id, limit=limit,
+            type=membership_type, search=search,
+        )
+        return [tuple(row) for row in rows]
+
+    def count(self, membership_type=None):
+        return self.client.request("GET", "/members/count", type=membership_type)
+
+
+class _RemoteAttendance:
+    def __init__(self, client):
+        self.client = client
+
+    def recent(self, limit=100):
+        return [tuple(row) for row in self.client.request("GET", "/attendance/recent", limit=limit)]
+
+    def changes(self, after_id, open_ids=(), limit=100):
+        open_ids = ",".join(str(int(session_id)) for session_id in open_ids) or None
+        rows = self.client.request("GET", "/attendance/changes", after=after_id, open=open_ids, limit=limit)
+        return [tuple(row) for row in rows]
+
+
+class _RemoteTransactions:
+    def __init__(self, client):
+        self.client = client
+
+    def recent(self, limit=100):
+        return [tuple(row) for row in self.client.request("GET", "/transactions/recent", limit=limit)]
+
+    def since(self, after_id, limit=100):
+        return [tuple(row) for row in self.client.request("GET", "/transactions/since", after=after_id, limit=limit)]
+
+
+class _RemoteReceipts:
+    def __init__(self, client):
+        self.client = client
+
+    def issue(self, member_id, amount, payment_method=None, transaction_id=None):
+        return self.issue_many([(member_id, amount, payment_method, transaction_id)])[0]
+
+    def issue_many(self, payments):
+        rows = self.client.request("POST", "/receipts", {"payments": [list(payment) for payment in payments]})
+        return [Receipt(*row) for row in rows]
+
+    def store_pdf(self, number, pdf):
+        return self.store_pdfs([(number, pdf)])[0]
+
+    def store_pdfs(self, items):
+        pdfs = [[int(number), base64.b64encode(pdf).decode("ascii")] for number, pdf in items]
+        return self.client.request("POST", "/receipts/pdfs", {"pdfs": pdfs})
+
+    def pdf(self, number):
+        pdf = self.client.request("GET", f"/receipts/{receipt_number(number)}/pdf")
+        return base64.b64decode(pdf) if pdf is not None else None
+
+    def find(self, member_id=None, number=None, start=None, end=None, transaction_id=None, limit=100):
+        rows = self.client.request(
+            "GET", "/receipts", member_id=member_id, number=number, start=start, end=end,
+            transaction_id=transaction_id, limit=limit,
+        )
+        return [Receipt(*row) for row in rows]
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url) -> ServiceClient:
+    """Return the shared client for the service at url"""
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = ServiceClient(url)
+        return client
+
+
+def start_server(db=None, host=DEFAULT_HOST, port=DEFAULT_PORT, readers=READER_COUNT, verbose=False,
+                 group_commit_ms=None, group_commit_ops=GROUP_COMMIT_OPS):
+    """Start a service on a background thread and return the server (port 0 picks a free port)"""
+    service = GymService(db, readers, group_commit_ms, group_commit_ops)
+    server = ServiceServer((host, port), service, verbose)
+    threading.Thread(target=server.serve_forever, name="gym-service", daemon=True).start()
+    return server
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+    server.service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the gym database to front-desk clients")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    parser.add_argument("--readers", type=int, default=READER_COUNT)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--group-commit-ms", type=float,
+                        help="commit writes in batches, waiting up to this long for more (0: whatever is queued)")
+    parser.add_argument("--group-commit-ops", type=int, default=GROUP_COMMIT_OPS, help="largest batch")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    service = GymService(get_database(args.db), args.readers, args.group_commit_ms, args.group_commit_ops)
+    server = ServiceServer((args.host, args.port), service, args.verbose)
+    scheduler = Scheduler(server.service.repo.db).start()
+    print(f"Serving {server.service.repo.db.path} on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        server.server_close()
+        server.service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Per-statement SQL latency, row counts, lock waits and a slow-query log.
+
+Every connection opened through ``db.Database`` is an
+``InstrumentedConnection``, so all SQL the windows, the kiosk, the service
+and the maintenance jobs run is timed here without touching the call sites.
+Statements are grouped by fingerprint (whitespace collapsed, literals and
+``IN`` lists replaced by ``?``). Each fingerprint keeps a call count, a
+latency histogram over ``BUCKETS_MS``, the rows it returned or changed and
+its errors. Time spent in ``BEGIN IMMEDIATE`` is time waiting for another
+connection's write lock and is also summed under ``lock_waits``.
+
+A statement slower than ``SLOW_QUERY_MS`` (``GYM_SLOW_QUERY_MS`` in the
+environment) is logged on the ``sql`` logger with its ``EXPLAIN QUERY PLAN``
+and kept in the last ``SLOW_LOG_SIZE`` entries of the slow-query log.
+
+``snapshot()`` returns everything as a JSON-ready dict (the diagnostics
+window and ``GET /diagnostics`` on the service show it) and ``dump(path)``
+writes it to a file.
+"""
+import bisect
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+SLOW_QUERY_MS = float(os.environ.get("GYM_SLOW_QUERY_MS", 100))
+SLOW_LOG_SIZE = 200
+# Upper bounds of the latency histogram buckets; the last bucket takes everything slower
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# BEGIN IMMEDIATE returning faster than this did not wait for anyone
+LOCK_WAIT_MS = 1
+
+logger = logging.getLogger("sql")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """The statement with literals and IN lists replaced by ?, on one line"""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class StatementStats:
+    __slots__ = ("calls", "total_ms", "max_ms", "rows", "errors", "histogram")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.errors = 0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (the max for the overflow bucket)"""
+        target, seen = q * self.calls, 0
+        for i, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 4) if self.calls else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "errors": self.errors,
+            "histogram": list(self.histogram),
+        }
+
+
+class QueryStats:
+    """Process-wide statistics, shared by every instrumented connection"""
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+            self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+            self.lock_waits = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "busy_errors": 0}
+            self.since = datetime.now().isoformat(timespec="seconds")
+
+    def get(self, key) -> StatementStats:
+        stats = self.statements.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self.statements.setdefault(key, StatementStats())
+        return stats
+
+    def record(self, key, elapsed_ms, rows=0, error=None):
+        stats = self.get(key)
+        with self._lock:
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.rows += rows
+            stats.histogram[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+            if error is not None:
+                stats.errors += 1
+                if "locked" in str(error) or "busy" in str(error):
+                    self.lock_waits["busy_errors"] += 1
+            if elapsed_ms >= LOCK_WAIT_MS and key.upper().startswith(("BEGIN IMMEDIATE", "BEGIN EXCLUSIVE")):
+                waits = self.lock_waits
+                waits["count"] += 1
+                waits["total_ms"] += elapsed_ms
+                waits["max_ms"] = max(waits["max_ms"], elapsed_ms)
+
+    def record_slow(self, key, elapsed_ms, plan):
+        entry = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "ms": round(elapsed_ms, 3),
+            "statement": key,
+            "plan": plan,
+        }
+        with self._lock:
+            self.slow_log.append(entry)
+        logger.warning("slow query (%.1f ms): %s\n  %s", elapsed_ms, key, "\n  ".join(plan))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            statements = [
+                {"statement": key, **stats.as_dict()} for key, stats in self.statements.items()
+            ]
+            slow = list(self.slow_log)
+            waits = dict(self.lock_waits, total_ms=round(self.lock_waits["total_ms"], 3))
+        statements.sort(key=lambda row: row["total_ms"], reverse=True)
+        return {
+            "since": self.since,
+            "slow_query_ms": self.slow_ms,
+            "buckets_ms": list(BUCKETS_MS),
+            "statements": statements,
+            "lock_waits": waits,
+            "slow_queries": slow,
+        }
+
+
+STATS = QueryStats()
+
+
+def _explain(conn, sql, parameters):
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    return [row[3] for row in rows]
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times execute/executemany and counts the rows fetched under the statement's fingerprint"""
+
+    _stats = None
+
+    def _run(self, run, sql, parameters, many=False):
+        key = fingerprint(sql)
+        start = time.perf_counter()
+        try:
+            run(sql, parameters)
+        except sqlite3.Error as e:
+            STATS.record(key, (time.perf_counter() - start) * 1000, error=e)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        STATS.record(key, elapsed_ms, max(self.rowcount, 0))
+        self._stats = STATS.get(key)
+        if elapsed_ms >= STATS.slow_ms:
+            # executemany's parameters may be a spent iterator; its plan is the same for every row
+            plan = _explain(self.connection, sql, ()) if many else _explain(self.connection, sql, parameters)
+            STATS.record_slow(key, elapsed_ms, plan)
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters, many=True)
+
+    # Row counts are bumped without the lock: a lost increment under a race only blurs a diagnostic
+    def _count(self, n):
+        if self._stats is not None:
+            self._stats.rows += n
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        # Inlined _count: this runs once per row of every iterated cursor
+        stats = self._stats
+        if stats is not None:
+            stats.rows += 1
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements are recorded in STATS (pass as factory= to sqlite3.connect)"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def snapshot() -> dict:
+    return STATS.snapshot()
+
+
+def reset():
+    STATS.reset()
+
+
+def dump(path) -> str:
+    """Write snapshot() to path as JSON; returns the path"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+    return path
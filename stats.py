@@ -0,0 +1,134 @@
+"""Dashboard counters: O(1) reads plus a rebuild/reconcile command.
+
+The counters in ``stats_counters``, ``revenue_daily``, ``revenue_monthly`` and
+``revenue_breakdown`` are maintained by triggers created in ``db.connect_db``. If they ever drift
+(e.g. rows edited with triggers dropped), rebuild them from the raw tables::
+
+    python stats.py reconcile            # report and fix drift
+    python stats.py reconcile --dry-run  # report only
+"""
+import argparse
+import sys
+
+from db import STATS_COUNTERS, get_database
+
+EPSILON = 1e-6
+
+
+def _actual_counters(conn):
+    return {
+        "members_total": conn.execute("SELECT COUNT(*) FROM members").fetchone()[0],
+        "checked_in": conn.execute(
+            "SELECT COUNT(*) FROM attendance WHERE checkout_time IS NULL"
+        ).fetchone()[0],
+    }
+
+
+def _actual_revenue(conn):
+    daily = dict(conn.execute(
+        "SELECT COALESCE(date, ''), SUM(amount_paid) FROM transactions GROUP BY 1"
+    ))
+    monthly = {}
+    for day, amount in daily.items():
+        month = day[:7]
+        monthly[month] = monthly.get(month, 0) + amount
+    return daily, monthly
+
+
+def _actual_breakdown(conn):
+    return {
+        (day, membership_type, payment_method): (payments, amount)
+        for day, membership_type, payment_method, payments, amount in conn.execute("""
+            SELECT COALESCE(date, ''), COALESCE(membership_type, 'Unknown'), COALESCE(payment_method, 'Unknown'),
+                   COUNT(*), SUM(amount_paid)
+            FROM transactions
+            GROUP BY 1, 2, 3
+        """)
+    }
+
+
+def rebuild(conn):
+    """Recompute every counter from members, attendance and transactions"""
+    counters = _actual_counters(conn)
+    daily, monthly = _actual_revenue(conn)
+    conn.execute("DELETE FROM stats_counters")
+    conn.executemany(
+        "INSERT INTO stats_counters (name, value) VALUES (?, ?)",
+        [(name, counters[name]) for name in STATS_COUNTERS]
+    )
+    conn.execute("DELETE FROM revenue_daily")
+    conn.executemany("INSERT INTO revenue_daily (day, amount) VALUES (?, ?)", daily.items())
+    conn.execute("DELETE FROM revenue_monthly")
+    conn.executemany("INSERT INTO revenue_monthly (month, amount) VALUES (?, ?)", monthly.items())
+    conn.execute("DELETE FROM revenue_breakdown")
+    conn.executemany(
+        "INSERT INTO revenue_breakdown (day, membership_type, payment_method, payments, amount) VALUES (?, ?, ?, ?, ?)",
+        [key + value for key, value in _actual_breakdown(conn).items()]
+    )
+
+
+def _stored_breakdown(conn):
+    # Rows left at zero by deletes are not drift
+    return {
+        (day, membership_type, payment_method): (payments, amount)
+        for day, membership_type, payment_method, payments, amount in conn.execute(
+            "SELECT day, membership_type, payment_method, payments, amount FROM revenue_breakdown WHERE payments != 0"
+        )
+    }
+
+
+def _differs(have, want):
+    if isinstance(have, tuple) or isinstance(want, tuple):
+        have, want = have or (0, 0), want or (0, 0)
+        return any(abs((a or 0) - (b or 0)) > EPSILON for a, b in zip(have, want))
+    return abs((have or 0) - (want or 0)) > EPSILON
+
+
+def _diff(kind, stored, actual):
+    drift = []
+    for key in sorted(set(stored) | set(actual), key=str):
+        have, want = stored.get(key, 0), actual.get(key, 0)
+        if _differs(have, want):
+            drift.append((kind, key, have, want))
+    return drift
+
+
+def reconcile(conn, fix=True):
+    """Compare stored counters with the raw tables.
+
+    Returns a list of (kind, key, stored, actual) tuples, one per drifted
+    value, and rebuilds the counters when fix is true and drift was found.
+    """
+    daily, monthly = _actual_revenue(conn)
+    drift = (
+        _diff("counter", dict(conn.execute("SELECT name, value FROM stats_counters")), _actual_counters(conn))
+        + _diff("revenue_daily", dict(conn.execute("SELECT day, amount FROM revenue_daily")), daily)
+        + _diff("revenue_monthly", dict(conn.execute("SELECT month, amount FROM revenue_monthly")), monthly)
+        + _diff("revenue_breakdown", _stored_breakdown(conn), _actual_breakdown(conn))
+    )
+    if drift and fix:
+        rebuild(conn)
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dashboard counter maintenance")
+    parser.add_argument("command", choices=["reconcile"])
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    parser.add_argument("--dry-run", action="store_true", help="report drift without fixing it")
+    args = parser.parse_args(argv)
+
+    with get_database(args.db).transaction() as conn:
+        drift = reconcile(conn, fix=not args.dry_run)
+
+    for kind, key, stored, actual in drift:
+        print(f"{kind:<17} {str(key):<14} stored={stored} actual={actual}")
+    if not drift:
+        print("Counters are consistent")
+    elif not args.dry_run:
+        print(f"Rebuilt counters ({len(drift)} drifted values)")
+    return 1 if drift and args.dry_run else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
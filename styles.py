@@ -32,8 +32,11 @@ class ModernStyles:
     
     @staticmethod
     def configure_styles():
-        """Configure ttk styles for modern look"""
+        """Configure ttk styles for modern look (once per Tk root; later calls return at once)"""
         style = ttk.Style()
+        if getattr(style.master, "_modern_styles", False):
+            return
+        style.master._modern_styles = True
         
         # Configure button style
         style.configure(
@@ -0,0 +1,373 @@
+"""Share members, attendance and payments between the branches' databases.
+
+Every branch keeps its own ``gym.db``. Triggers (``db.SYNC_TRIGGERS``)
+record each insert, update or delete on members, attendance and
+transactions in ``change_log`` under this branch's sequence number, one
+entry per changed row. ``export_delta`` writes the rows changed after a
+given sequence number to a compact delta file (gzip JSON Lines: a header,
+then one line per row with its current values), so a sync reads only what
+changed since the last one. ``import_delta`` applies another branch's delta
+in one transaction.
+
+Rows are identified across branches by (origin branch, id at the origin);
+``sync_rows`` maps the ones created elsewhere to their local ids, so member
+references in attendance and payments are translated on import. Applying is
+idempotent: changes at or below the sequence number already applied from
+that branch are skipped, and a delta that starts after it is refused. When
+two branches changed the same row, the version with the later change time
+wins, ties broken by branch name; for a session a real check-out beats an
+open or auto-closed one. Every branch picks the same winner whatever order
+the deltas arrive in.
+
+Each branch exports its own changes, so every branch imports every other
+branch's deltas. A delta also carries how far its branch has applied the
+others, which ``export_delta(to=...)`` uses to start the next delta for that
+branch where it left off.
+
+Headless usage::
+
+    python sync.py branch [--set north] [--db gym.db]
+    python sync.py export north.delta [--to south | --since 0] [--db gym.db]
+    python sync.py import south.delta [east.delta ...] [--db gym.db]
+    python sync.py status [--db gym.db]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+from db import SYNC_COLUMNS, get_database
+
+DELTA_FORMAT = 1
+# Members first, so the sessions and payments of a new member can refer to it
+TABLES = ("members", "attendance", "transactions")
+# Columns holding a member id, sent as [origin branch, origin id]
+MEMBER_REFERENCES = {"attendance": "member_id", "transactions": "member_id"}
+
+APPLIED = "applied"
+SKIPPED = "skipped"          # already applied from an earlier delta
+SUPERSEDED = "superseded"    # lost to a later version of the row
+
+
+class SyncError(Exception):
+    pass
+
+
+def _export_sql(table):
+    columns = ", ".join(
+        f"CASE WHEN r.{column} IS NULL THEN NULL ELSE COALESCE(sm.origin, :branch) END, "
+        f"COALESCE(sm.origin_id, r.{column})" if column == MEMBER_REFERENCES.get(table) else f"r.{column}"
+        for column in SYNC_COLUMNS[table]
+    )
+    member_join = (
+        f"LEFT JOIN sync_rows sm ON sm.table_name = 'members' AND sm.local_id = r.{MEMBER_REFERENCES[table]}"
+        if table in MEMBER_REFERENCES else ""
+    )
+    return f"""
+        SELECT c.seq, COALESCE(s.origin, :branch), COALESCE(s.origin_id, c.row_id), c.op, c.changed_at,
+               r.id, {columns}
+        FROM change_log c
+        LEFT JOIN sync_rows s ON s.table_name = c.table_name AND s.local_id = c.row_id
+        LEFT JOIN {table} r ON r.id = c.row_id
+        {member_join}
+        WHERE c.seq > :since AND c.seq <= :seq AND c.table_name = '{table}'
+        ORDER BY c.seq
+    """
+
+
+EXPORT_SQL = {table: _export_sql(table) for table in TABLES}
+
+
+def branch(db=None) -> str:
+    """This database's branch name"""
+    db = db or get_database()
+    return db.execute("SELECT branch FROM sync_state").fetchone()[0]
+
+
+def set_branch(name, db=None) -> None:
+    """Rename this branch; only before it has synced with another, whose rows would refer to the old name"""
+    db = db or get_database()
+    name = name.strip()
+    if not name:
+        raise SyncError("branch name is empty")
+    with db.transaction() as conn:
+        if conn.execute("SELECT 1 FROM sync_peers LIMIT 1").fetchone():
+            raise SyncError("this branch has already synced; its name can no longer change")
+        conn.execute("UPDATE sync_state SET branch = ?", (name,))
+
+
+def export_delta(path, db=None, to=None, since=None) -> dict:
+    """Write this branch's changes after since to path; returns the delta's header plus its change count.
+
+    With to, since defaults to the last change that branch has acknowledged
+    applying, otherwise to 0 (everything in the change log).
+    """
+    db = db or get_database()
+    conn = db.connection()
+    local = branch(db)
+    if since is None:
+        row = conn.execute("SELECT acked_seq FROM sync_peers WHERE branch = ?", (to,)).fetchone() if to else None
+        since = row[0] if row else 0
+
+    changes = 0
+    partial = path + ".part"
+    # One read snapshot for the header and every row
+    conn.execute("BEGIN")
+    try:
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        header = {
+            "format": DELTA_FORMAT,
+            "branch": local,
+            "since": since,
+            "seq": seq,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "applied": dict(conn.execute("SELECT branch, applied_seq FROM sync_peers")),
+            "columns": {table: list(columns) for table, columns in SYNC_COLUMNS.items()},
+        }
+        with gzip.open(partial, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            for table in TABLES:
+                for row in conn.execute(EXPORT_SQL[table], {"branch": local, "since": since, "seq": seq}):
+                    seq_, origin, origin_id, op, changed_at, row_id = row[:6]
+                    if op == "upsert" and row_id is None:
+                        # Archived since it was logged; the sessions moved out of gym.db are not resent
+                        continue
+                    values = _pack(table, row[6:]) if op == "upsert" else None
+                    f.write(json.dumps([table, seq_, origin, origin_id, op, changed_at, values]) + "\n")
+                    changes += 1
+    finally:
+        conn.execute("COMMIT")
+    os.replace(partial, path)
+    return dict(header, changes=changes)
+
+
+def _pack(table, row):
+    """Row values in SYNC_COLUMNS order, the member reference as [origin, id]"""
+    values, row = [], iter(row)
+    for column in SYNC_COLUMNS[table]:
+        if column == MEMBER_REFERENCES.get(table):
+            origin, origin_id = next(row), next(row)
+            values.append(None if origin is None else [origin, origin_id])
+        else:
+            values.append(next(row))
+    return values
+
+
+def import_delta(path, db=None) -> Dict[str, int]:
+    """Apply another branch's delta file; returns {applied, skipped, superseded} change counts"""
+    db = db or get_database()
+    local = branch(db)
+    counts = {APPLIED: 0, SKIPPED: 0, SUPERSEDED: 0}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != DELTA_FORMAT:
+            raise SyncError(f"{path}: unsupported delta format {header.get('format')}")
+        if header["columns"] != {table: list(columns) for table, columns in SYNC_COLUMNS.items()}:
+            raise SyncError(f"{path}: exported by a branch on a different schema version")
+        author = header["branch"]
+        if author == local:
+            raise SyncError(f"{path} was exported by this branch ({local})")
+
+        with db.transaction() as conn:
+            row = conn.execute("SELECT applied_seq, acked_seq FROM sync_peers WHERE branch = ?", (author,)).fetchone()
+            applied_seq, acked_seq = row or (0, 0)
+            if header["since"] > applied_seq:
+                raise SyncError(
+                    f"{path} holds {author}'s changes after {header['since']}, but only those up to "
+                    f"{applied_seq} have been applied here; export again with --since {applied_seq}"
+                )
+            conn.execute("UPDATE sync_state SET applying = 1")
+            for line in f:
+                table, seq, origin, origin_id, op, changed_at, values = json.loads(line)
+                if seq <= applied_seq:
+                    counts[SKIPPED] += 1
+                    continue
+                counts[_apply(conn, local, author, table, origin, origin_id, op, changed_at, values)] += 1
+            _resolve_pending(conn, local)
+            conn.execute("UPDATE sync_state SET applying = 0")
+            conn.execute("""
+                INSERT INTO sync_peers (branch, applied_seq, acked_seq, synced_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (branch) DO UPDATE SET
+                    applied_seq = excluded.applied_seq, acked_seq = excluded.acked_seq, synced_at = excluded.synced_at
+            """, (
+                author, max(applied_seq, header["seq"]), max(acked_seq, header["applied"].get(local, 0)),
+                datetime.now().isoformat(timespec="seconds"),
+            ))
+    return counts
+
+
+def _local_id(conn, local, table, origin, origin_id) -> Optional[int]:
+    """Local id of a row known under (origin, origin_id), if it is (still) in the table"""
+    if origin == local:
+        row = conn.execute(f"SELECT id FROM {table} WHERE id = ?", (origin_id,)).fetchone()
+    else:
+        row = conn.execute(f"""
+            SELECT r.id FROM sync_rows s JOIN {table} r ON r.id = s.local_id
+            WHERE s.table_name = ? AND s.origin = ? AND s.origin_id = ?
+        """, (table, origin, origin_id)).fetchone()
+    return row[0] if row else None
+
+
+def _rank(table, values):
+    """Tie-breaker ahead of the change time: a checked-out session beats an open or auto-closed one"""
+    if table != "attendance" or values is None:
+        return ()
+    columns = dict(zip(SYNC_COLUMNS[table], values))
+    return (columns["checkout_time"] is not None, not columns["auto_closed"])
+
+
+def _current_version(conn, local, table, origin, origin_id):
+    """(local id if the row is here, (rank, change time, branch) of the version held here or None)
+
+    The version is the later of the last change made here (still in
+    change_log after a delete) and the last one applied from elsewhere.
+    """
+    mapping = conn.execute("""
+        SELECT local_id, version_at, version_branch FROM sync_rows
+        WHERE table_name = ? AND origin = ? AND origin_id = ?
+    """, (table, origin, origin_id)).fetchone()
+    versions = [tuple(mapping[1:])] if mapping else []
+    row_id = origin_id if origin == local else mapping[0] if mapping else None
+    values = None
+    if row_id is not None:
+        logged = conn.execute(
+            "SELECT changed_at FROM change_log WHERE table_name = ? AND row_id = ?", (table, row_id)
+        ).fetchone()
+        if logged:
+            versions.append((logged[0], local))
+        values = conn.execute(
+            f"SELECT {', '.join(SYNC_COLUMNS[table])} FROM {table} WHERE id = ?", (row_id,)
+        ).fetchone()
+    local_id = row_id if values is not None else None
+    return local_id, (_rank(table, values), *max(versions)) if versions else None
+
+
+def _apply(conn, local, author, table, origin, origin_id, op, changed_at, values) -> str:
+    local_id, current = _current_version(conn, local, table, origin, origin_id)
+    if current is not None and (_rank(table, values), changed_at, author) <= current:
+        return SUPERSEDED
+
+    if op == "delete":
+        if local_id is not None:
+            conn.execute(f"DELETE FROM {table} WHERE id = ?", (local_id,))
+            conn.execute("DELETE FROM sync_pending WHERE table_name = ? AND local_id = ?", (table, local_id))
+            local_id = None
+    else:
+        columns = SYNC_COLUMNS[table]
+        values = list(values)
+        reference = None
+        if table in MEMBER_REFERENCES:
+            i = columns.index(MEMBER_REFERENCES[table])
+            reference = values[i]
+            values[i] = None if reference is None else _local_id(conn, local, "members", *reference)
+        if local_id is not None:
+            conn.execute(
+                f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                (*values, local_id),
+            )
+        else:
+            # A row deleted here comes back under its own id
+            id_column, ids = ("id, ", [origin_id]) if origin == local else ("", [])
+            local_id = conn.execute(
+                f"INSERT INTO {table} ({id_column}{', '.join(columns)}) VALUES ({', '.join('?' * (len(ids) + len(columns)))})",
+                (*ids, *values),
+            ).lastrowid
+        if reference is not None and values[columns.index(MEMBER_REFERENCES[table])] is None \
+                and reference[0] != local and not _known(conn, "members", *reference):
+            conn.execute("""
+                INSERT OR REPLACE INTO sync_pending (table_name, local_id, ref_origin, ref_id) VALUES (?, ?, ?, ?)
+            """, (table, local_id, *reference))
+        else:
+            conn.execute("DELETE FROM sync_pending WHERE table_name = ? AND local_id = ?", (table, local_id))
+
+    conn.execute("""
+        INSERT INTO sync_rows (table_name, origin, origin_id, local_id, version_at, version_branch)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (table_name, origin, origin_id) DO UPDATE SET
+            local_id = excluded.local_id, version_at = excluded.version_at, version_branch = excluded.version_branch
+    """, (table, origin, origin_id, local_id, changed_at, author))
+    return APPLIED
+
+
+def _known(conn, table, origin, origin_id) -> bool:
+    """Whether any change to the row has arrived here, even one deleting it"""
+    return conn.execute(
+        "SELECT 1 FROM sync_rows WHERE table_name = ? AND origin = ? AND origin_id = ?", (table, origin, origin_id)
+    ).fetchone() is not None
+
+
+def _resolve_pending(conn, local) -> None:
+    """Point sessions and payments at members that have arrived since"""
+    for table, local_id, origin, origin_id in conn.execute("SELECT * FROM sync_pending").fetchall():
+        member_id = _local_id(conn, local, "members", origin, origin_id)
+        if member_id is not None:
+            conn.execute(f"UPDATE {table} SET {MEMBER_REFERENCES[table]} = ? WHERE id = ?", (member_id, local_id))
+            conn.execute("DELETE FROM sync_pending WHERE table_name = ? AND local_id = ?", (table, local_id))
+
+
+def status(db=None) -> dict:
+    """This branch, its latest change and, per other branch, what has been applied each way"""
+    db = db or get_database()
+    conn = db.connection()
+    seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+    peers = {}
+    for name, applied_seq, acked_seq, synced_at in conn.execute(
+        "SELECT branch, applied_seq, acked_seq, synced_at FROM sync_peers ORDER BY branch"
+    ).fetchall():
+        unsent = conn.execute("SELECT COUNT(*) FROM change_log WHERE seq > ?", (acked_seq,)).fetchone()[0]
+        peers[name] = {"applied_seq": applied_seq, "acked_seq": acked_seq, "unacked": unsent, "synced_at": synced_at}
+    return {
+        "branch": branch(db),
+        "seq": seq,
+        "peers": peers,
+        "pending_members": conn.execute("SELECT COUNT(*) FROM sync_pending").fetchone()[0],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync members, attendance and payments between branches")
+    parser.add_argument("command", choices=["branch", "export", "import", "status"])
+    parser.add_argument("files", nargs="*", help="delta file to write (export) or read (import)")
+    parser.add_argument("--set", dest="name", help="rename this branch (branch, before the first sync)")
+    parser.add_argument("--to", help="export what this branch has not acknowledged yet (export)")
+    parser.add_argument("--since", type=int, help="export changes after this sequence number (export)")
+    parser.add_argument("--db", help="database file (defaults to GYM_DB or gym.db)")
+    args = parser.parse_args(argv)
+
+    db = get_database(args.db)
+    try:
+        if args.command == "branch":
+            if args.name:
+                set_branch(args.name, db)
+            print(branch(db))
+            return 0
+        if args.command == "export":
+            if len(args.files) != 1:
+                parser.error("export takes one delta file")
+            result = export_delta(args.files[0], db, args.to, args.since)
+            print(f"Exported {result['changes']} changes of {result['branch']} "
+                  f"({result['since']} < seq <= {result['seq']}) to {args.files[0]}")
+            return 0
+        if args.command == "import":
+            for path in args.files:
+                counts = import_delta(path, db)
+                print(f"{path}: {counts[APPLIED]} applied, {counts[SKIPPED]} already applied, "
+                      f"{counts[SUPERSEDED]} superseded")
+            return 0
+    except SyncError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    info = status(db)
+    print(f"Branch {info['branch']} at seq {info['seq']}, {info['pending_members']} rows waiting for their member")
+    for name, peer in info["peers"].items():
+        print(f"{name}: applied up to {peer['applied_seq']}, acknowledged ours up to {peer['acked_seq']} "
+              f"({peer['unacked']} changes since), last import {peer['synced_at']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import analytics  # noqa: E402
+
+
+def add_sessions(repo, rows):
+    with repo.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO attendance (member_id, checkin_time, checkout_time) VALUES (?, ?, ?)", rows
+        )
+
+
+@pytest.fixture
+def sessions(repo, member_id):
+    other = repo.members.add(("John Roe", 41, "Male", "0199", "2 Lake View", "Yearly", "2025-01-01", "2025-12-31"))
+    # 2025-03-03 is a Monday
+    add_sessions(repo, [
+        (member_id, "2025-03-03 07:10:00", "2025-03-03 08:10:00"),
+        (member_id, "2025-03-04 07:30:00", "2025-03-04 08:00:00"),
+        (other, "2025-03-03 18:00:00", "2025-03-03 19:30:00"),
+        (other, "2025-03-05 18:15:00", None),
+        (member_id, "2025-04-01 06:00:00", "2025-04-01 07:00:00"),
+    ])
+    return member_id, other
+
+
+def test_refresh_rolls_up_completed_days_once(repo, sessions):
+    assert analytics.refresh(repo.db, today=date(2025, 3, 5)) == 2
+    assert analytics.refresh(repo.db, today=date(2025, 3, 5)) == 0
+    rows = repo.db.execute("SELECT day, visits, closed, minutes FROM attendance_daily ORDER BY day").fetchall()
+    assert rows == [("2025-03-03", 2, 2, 150.0), ("2025-03-04", 1, 1, 30.0)]
+
+    # Only the new days are processed; the member-month rows are added to
+    assert analytics.refresh(repo.db, today=date(2025, 4, 2)) == 28
+    member_id, other = sessions
+    assert repo.db.execute("""
+        SELECT member_id, month, visits, closed, minutes FROM attendance_member_monthly ORDER BY member_id, month
+    """).fetchall() == [
+        (member_id, "2025-03", 2, 2, 90.0),
+        (member_id, "2025-04", 1, 1, 60.0),
+        (other, "2025-03", 2, 1, 90.0),
+    ]
+
+
+def test_report(repo, sessions):
+    member_id, other = sessions
+    analytics.refresh(repo.db, today=date(2025, 4, 2))
+    report = analytics.build_report(repo.db, start="2025-03-01", end="2025-04-01", refresh_first=False)
+
+    # Rollups start on the first day with a visit
+    assert (report.days, report.visits) == (29, 4)
+    assert report.heatmap.sum() == 4
+    assert report.heatmap[0, 7] == 1 and report.heatmap[0, 18] == 1 and report.heatmap[1, 7] == 1
+    assert report.heatmap[2, 18] == 1
+    assert report.weekday_minutes[0] == 75 and report.weekday_minutes[1] == 30
+    assert np.isnan(report.weekday_minutes[2])
+    assert report.frequency.tolist() == [0, 2, 0, 0, 0, 0]
+    assert [(m, n, v) for m, n, v, _ in report.top_members] == [(member_id, "Jane Doe", 2), (other, "John Roe", 2)]
+    assert "Busiest" in analytics.format_report(report)
+
+
+def test_rebuild_picks_up_edited_sessions(repo, sessions):
+    analytics.refresh(repo.db, today=date(2025, 4, 2))
+    repo.db.execute("UPDATE attendance SET checkout_time = '2025-03-05 19:15:00' WHERE checkout_time IS NULL")
+    analytics.refresh(repo.db, today=date(2025, 4, 2), rebuild=True)
+    assert repo.db.execute(
+        "SELECT closed, minutes FROM attendance_daily WHERE day = '2025-03-05'"
+    ).fetchone() == (1, 60.0)
+
+
+def test_refresh_merges_member_chunks(repo, member_id, monkeypatch):
+    monkeypatch.setattr(analytics, "CHUNK_SIZE", 3)
+    monkeypatch.setattr(analytics, "REDUCE_AT", 2)
+    add_sessions(repo, [(member_id, f"2025-03-{day:02d} 10:00:00", f"2025-03-{day:02d} 11:00:00")
+                        for day in range(1, 11)])
+    analytics.refresh(repo.db, today=date(2025, 3, 11))
+    assert repo.db.execute("SELECT visits, minutes FROM attendance_member_monthly").fetchall() == [(10, 600.0)]
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+import analytics
+import archive
+import export
+
+TODAY = date(2025, 6, 1)
+
+
+def seed(repo, member_id):
+    sessions = [
+        (member_id, f"{year}-{month:02d}-10 09:00:00", f"{year}-{month:02d}-10 10:30:00")
+        for year in (2022, 2023, 2024, 2025) for month in (1, 4, 7, 10) if (year, month) < (2025, 6)
+    ]
+    # An old session that was never closed stays in the hot table
+    sessions.append((member_id, "2023-02-01 09:00:00", None))
+    with repo.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO attendance (member_id, checkin_time, checkout_time) VALUES (?, ?, ?)", sessions
+        )
+    return len(sessions)
+
+
+def test_closed_sessions_move_to_yearly_files(repo, member_id, db_path):
+    total = seed(repo, member_id)
+    progress = []
+
+    moved = archive.archive(repo.db, 365, today=TODAY, batch_size=3,
+                            progress=lambda year, count: progress.append((year, count)))
+
+    assert moved == {2022: 4, 2023: 4, 2024: 2}
+    assert progress[:2] == [(2022, 3), (2022, 4)]
+    info = archive.status(repo.db)
+    assert info["hot_sessions"] == total - 10
+    assert info["oldest_hot"] == "2023-02-01 09:00:00"
+    assert info["archives"][2024] == ("gym-attendance-2024.db", 2, "2024-06-01")
+    assert os.path.exists(os.path.join(os.path.dirname(db_path), "gym-attendance-2022.db"))
+
+    # Nothing left to move; a later run only takes what crossed the horizon since
+    assert archive.archive(repo.db, 365, today=TODAY) == {}
+    assert archive.archive(repo.db, 365, today=date(2025, 8, 1)) == {2024: 1}
+    assert archive.status(repo.db)["archives"][2024][1:] == (3, "2024-08-01")
+
+
+def test_interrupted_move_is_finished_without_duplicates(repo, member_id):
+    seed(repo, member_id)
+    assert archive.archive(repo.db, 365, today=date(2024, 3, 1))[2023] == 1
+    conn = repo.db.connection()
+    # As if the archive committed the next batch's copy and the crash hit before its delete
+    conn.execute("""
+        INSERT INTO archive_2023.attendance (id, member_id, checkin_time, checkout_time)
+        SELECT id, member_id, checkin_time, checkout_time FROM main.attendance WHERE checkin_time LIKE '2023-04-%'
+    """)
+
+    assert archive.archive(repo.db, 365, today=TODAY)[2023] == 3
+    assert conn.execute("SELECT COUNT(*) FROM archive_2023.attendance").fetchone()[0] == 4
+    assert archive.status(repo.db)["archives"][2023][1] == 4
+
+
+def test_crash_between_copy_and_delete_counts_each_session_once(repo, member_id, monkeypatch):
+    seed(repo, member_id)
+    with monkeypatch.context() as patched:
+        # The archive commits its copy, then the hot table's transaction fails
+        patched.setattr(archive, "REMOVE_SQL", "DELETE FROM {schema}.missing_table")
+        with pytest.raises(sqlite3.OperationalError):
+            archive.archive(repo.db, 365, today=TODAY)
+    conn = repo.db.connection()
+    assert conn.execute("SELECT COUNT(*) FROM archive_2022.attendance").fetchone()[0] > 0
+
+    assert archive.archive(repo.db, 365, today=TODAY)[2022] == 4
+    assert conn.execute("SELECT COUNT(*) FROM archive_2022.attendance").fetchone()[0] == 4
+    assert archive.status(repo.db)["archives"][2022][1] == 4
+
+
+def test_union_only_reaches_archives_the_range_needs(repo, member_id):
+    seed(repo, member_id)
+    archive.archive(repo.db, 365, today=TODAY)
+    conn = repo.db.connection()
+
+    assert archive.sources(conn, "2025-01-01", "2025-02-01") == ["main.attendance"]
+    assert archive.sources(conn, "2023-06-01", "2024-01-01") == ["archive_2023.attendance", "main.attendance"]
+    sql, params = archive.union(
+        conn, "SELECT checkin_time FROM {attendance} WHERE checkin_time >= ? AND checkin_time < ?",
+        ("2023-06-01", "2024-06-01"), "2023-06-01", "2024-06-01"
+    )
+    assert len(params) == 6
+    assert sorted(row[0][:7] for row in conn.execute(sql, params)) == [
+        "2023-07", "2023-10", "2024-01", "2024-04"
+    ]
+
+
+def test_exports_and_analytics_read_through_the_archives(repo, member_id, tmp_path):
+    total = seed(repo, member_id)
+    analytics.refresh(repo.db, today=TODAY)
+    before = repo.db.execute("SELECT SUM(visits), SUM(minutes) FROM attendance_daily").fetchone()
+
+    archive.archive(repo.db, 365, today=TODAY)
+
+    analytics.refresh(repo.db, today=TODAY, rebuild=True)
+    assert repo.db.execute("SELECT SUM(visits), SUM(minutes) FROM attendance_daily").fetchone() == before
+    rows = list(export.iter_rows(repo.db, "attendance"))
+    assert len(rows) == total
+    assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+    ranged = list(export.iter_rows(repo.db, "attendance", "2022-06-01", "2023-06-01"))
+    assert [row[3][:7] for row in ranged] == ["2022-07", "2022-10", "2023-01", "2023-02", "2023-04"]
+
+
+def test_cli(db_path, capsys):
+    assert archive.main(["status", "--db", db_path]) == 0
+    assert "Hot table: 0 sessions" in capsys.readouterr().out
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from background import BackgroundExecutor, UIStallMonitor
+
+
+class FakeOwner:
+    def __init__(self):
+        self.cursor = ""
+        self.bindings = []
+
+    def configure(self, cursor):
+        self.cursor = cursor
+
+    def bind(self, sequence, func, add=None):
+        self.bindings.append(func)
+
+
+class FakeEvent:
+    def __init__(self, widget):
+        self.widget = widget
+
+
+def wait_for(executor, count=1):
+    """Block until count finished jobs are queued for delivery"""
+    deadline = time.monotonic() + 5
+    while executor.results.qsize() < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_result_delivered_only_when_drained():
+    executor = BackgroundExecutor()
+    results = []
+    ui_thread = threading.get_ident()
+    executor.submit(threading.get_ident, on_success=results.append)
+    wait_for(executor)
+    assert results == []
+
+    executor.drain()
+    assert len(results) == 1 and results[0] != ui_thread
+    executor.shutdown()
+
+
+def test_errors_go_to_on_error():
+    executor = BackgroundExecutor()
+    errors = []
+    executor.submit(lambda: 1 / 0, on_error=errors.append)
+    wait_for(executor)
+    executor.drain()
+    assert isinstance(errors[0], ZeroDivisionError)
+    executor.shutdown()
+
+
+def test_owner_busy_cursor_and_cancel_on_destroy():
+    executor = BackgroundExecutor(workers=1)
+    owner = FakeOwner()
+    release = threading.Event()
+    results = []
+    executor.submit(release.wait, owner=owner, on_success=results.append)
+    assert owner.cursor == "watch" and executor.busy(owner)
+
+    owner.bindings[0](FakeEvent(owner))
+    release.set()
+    wait_for(executor)
+    executor.drain()
+    assert results == [] and not executor.busy(owner)
+    executor.shutdown()
+
+
+def test_quiet_jobs_leave_the_cursor_alone():
+    executor = BackgroundExecutor(workers=1)
+    owner = FakeOwner()
+    release = threading.Event()
+    executor.submit(release.wait, owner=owner, quiet=True)
+    assert owner.cursor != "watch" and not executor.busy(owner)
+    executor.submit(release.wait, owner=owner)
+    assert owner.cursor == "watch"
+
+    release.set()
+    wait_for(executor)
+    executor.drain()
+    assert owner.cursor == "" and not executor.pending
+    executor.shutdown()
+
+
+def test_stall_monitor_counts_over_budget():
+    monitor = UIStallMonitor(budget_ms=16)
+    for stall in (2, 5, 40):
+        monitor.record(stall)
+    snapshot = monitor.snapshot()
+    assert snapshot["max_stall_ms"] == 40
+    assert snapshot["over_budget"] == 1 and snapshot["samples"] == 3
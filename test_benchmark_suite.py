@@ -0,0 +1,52 @@
+import json
+import sqlite3
+
+import pytest
+
+from benchmarks import datagen, suite
+import stats
+
+
+@pytest.fixture
+def bench_db(tmp_path):
+    return datagen.generate(str(tmp_path / "bench.db"), members=200, attendance=3000, transactions=500,
+                            days=60, log=lambda line: None)
+
+
+def test_datagen_row_counts_and_counters(bench_db):
+    conn = sqlite3.connect(bench_db)
+    counts = [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("members", "attendance", "transactions")]
+    assert counts == [200, 3000, 500]
+    assert stats.reconcile(conn, fix=False) == []
+    # Triggers and indexes dropped for the load are back
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert {"trg_members_fts_insert", "trg_attendance_open_insert", "idx_attendance_checkin"} <= names
+    indexed = conn.execute("SELECT COUNT(*) FROM members_fts WHERE members_fts MATCH 'Road'").fetchone()[0]
+    assert indexed == conn.execute("SELECT COUNT(*) FROM members WHERE address LIKE '%Road%'").fetchone()[0] > 0
+    conn.close()
+
+
+def test_datagen_is_deterministic(tmp_path):
+    def sample(name):
+        path = datagen.generate(str(tmp_path / name), 50, 400, 100, days=30, seed=3, log=lambda line: None)
+        conn = sqlite3.connect(path)
+        rows = conn.execute("SELECT name, membership_type, start_date FROM members ORDER BY id").fetchall()
+        conn.close()
+        return rows
+
+    assert sample("a.db") == sample("b.db")
+
+
+def test_suite_runs_every_query(bench_db, tmp_path):
+    results = suite.run(bench_db, iterations=3, log=lambda line: None)
+    assert set(results["queries"]) == set(suite.QUERIES)
+    assert results["meta"]["rows"]["members"] == 200
+    json.dumps(results)
+
+
+def test_compare_flags_slower_paths():
+    old = {"queries": {"a": {"median_ms": 1.0}, "b": {"median_ms": 1.0}, "c": {"median_ms": 0.01}}}
+    new = {"queries": {"a": {"median_ms": 1.1}, "b": {"median_ms": 2.0}, "c": {"median_ms": 0.05},
+                       "d": {"median_ms": 9.0}}}
+    assert [name for name, *_ in suite.compare(old, new)] == ["b"]
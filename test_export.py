@@ -0,0 +1,108 @@
+import csv
+import gzip
+import json
+import tracemalloc
+
+import pytest
+
+import export
+
+
+def seed(repo, member_id):
+    other = repo.members.add(["John Roe", "40", "Male", "0199", "Road 2", "Yearly", "2024-01-01", "2025-01-01"])
+    with repo.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO transactions (member_id, amount_paid, date, membership_type, payment_method) "
+            "VALUES (?, ?, ?, 'Monthly', 'Cash')",
+            [(member_id, 30.0, "2025-01-05"), (other, 40.0, "2025-01-20"),
+             (member_id, 50.0, "2025-02-01"), (other, 60.0, "2024-12-31")],
+        )
+        conn.executemany(
+            "INSERT INTO attendance (member_id, checkin_time, checkout_time) VALUES (?, ?, ?)",
+            [(member_id, f"2025-01-{day:02d} 09:00:00", f"2025-01-{day:02d} 10:00:00") for day in range(1, 11)],
+        )
+    return other
+
+
+def test_date_and_member_filters_are_pushed_into_sql(repo, member_id):
+    other = seed(repo, member_id)
+    sql, params = export.build_query("transactions", "2025-01-01", "2025-02-01", [member_id])
+    assert "t.date >= ?" in sql and "json_each" in sql
+
+    january = list(export.iter_rows(repo.db, "transactions", "2025-01-01", "2025-02-01"))
+    assert [(row[1], row[3]) for row in january] == [(member_id, 30.0), (other, 40.0)]
+    mine = list(export.iter_rows(repo.db, "transactions", member_ids=[member_id], fetch_size=1))
+    assert [row[3] for row in mine] == [30.0, 50.0]
+    assert len(list(export.iter_rows(repo.db, "attendance", "2025-01-03", "2025-01-05"))) == 2
+
+
+def test_csv_gzip_and_progress(repo, member_id, tmp_path):
+    seed(repo, member_id)
+    repo.db.execute("UPDATE attendance SET auto_closed = 1 WHERE id = (SELECT MAX(id) FROM attendance)")
+    progress = []
+    path = tmp_path / "attendance.csv.gz"
+
+    result = export.export("attendance", str(path), db=repo.db, progress=progress.append, progress_every=4)
+
+    assert result.rows == 10
+    assert progress == [4, 8, 10]
+    with gzip.open(path, "rt", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 10 and rows[0]["name"] == "Jane Doe"
+    assert rows[0]["checkin_time"] == "2025-01-01 09:00:00"
+    assert [row["auto_closed"] for row in rows].count("1") == 1
+
+
+def test_jsonl(repo, member_id, tmp_path):
+    path = tmp_path / "members.jsonl"
+    assert export.export("members", str(path), db=repo.db).rows == 1
+    record = json.loads(path.read_text().splitlines()[0])
+    assert record["name"] == "Jane Doe" and record["membership_type"] == "Monthly"
+
+
+def test_xlsx_rolls_over_to_new_sheets(repo, member_id, tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    seed(repo, member_id)
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 5)
+    path = tmp_path / "attendance.xlsx"
+
+    assert export.export("attendance", str(path), db=repo.db).rows == 10
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["attendance", "attendance (2)", "attendance (3)"]
+    first = list(workbook["attendance"].values)
+    assert first[0] == export.DATASETS["attendance"].columns and len(first) == 5
+
+
+def test_format_errors(tmp_path):
+    assert export.detect_format("ledger.CSV.gz") == ("csv", True)
+    with pytest.raises(ValueError):
+        export.detect_format("ledger.txt")
+    with pytest.raises(ValueError):
+        export.export("transactions", str(tmp_path / "ledger.xlsx.gz"))
+
+
+def test_memory_does_not_grow_with_rows(repo, member_id, tmp_path):
+    def peak(rows):
+        with repo.db.transaction() as conn:
+            conn.execute("DELETE FROM attendance")
+            conn.executemany(
+                "INSERT INTO attendance (member_id, checkin_time, checkout_time) VALUES (?, ?, ?)",
+                ((member_id, "2025-01-01 09:00:00", "2025-01-01 10:00:00") for _ in range(rows)),
+            )
+        tracemalloc.start()
+        export.export("attendance", str(tmp_path / "attendance.jsonl"), db=repo.db, fetch_size=100)
+        result = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result
+
+    # Both sizes span several fetchmany batches
+    small, large = peak(1_000), peak(10_000)
+    assert large < small * 1.2
+
+
+def test_cli(db_path, tmp_path, capsys):
+    path = tmp_path / "ledger.csv"
+    assert export.main(["transactions", str(path), "--from", "2025-01-01", "--db", db_path]) == 0
+    assert "Exported 0 transactions rows" in capsys.readouterr().out
+    assert path.read_text().startswith("id,member_id,name,amount_paid")
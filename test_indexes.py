@@ -0,0 +1,46 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from maintenance import CLOSE_STALE_SQL, STATUS_SQL
+from repository import (
+    ACTIVE_TODAY_SQL, CLOSED_ATTENDANCE_SQL, NEW_ATTENDANCE_SQL, NEW_TRANSACTIONS_SQL, OPEN_SESSION_SQL,
+    RECENT_ATTENDANCE_SQL, RECENT_TRANSACTIONS_SQL, REVENUE_RANGE_SQL, day_bounds, month_bounds,
+)
+
+
+def query_plan(repo, sql, params):
+    return " | ".join(row[3] for row in repo.db.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+@pytest.mark.parametrize("sql, params, expected", [
+    (OPEN_SESSION_SQL, (1, 1735689600, 1735776000), "idx_attendance_open_session (member_id=? AND checkout_at=? AND checkin_at>? AND checkin_at<?)"),
+    (ACTIVE_TODAY_SQL, (1735689600, 1735776000), "idx_attendance_stale (checkin_at>? AND checkin_at<?)"),
+    (RECENT_ATTENDANCE_SQL, (100,), "SCAN a USING INDEX idx_attendance_checkin"),
+    (RECENT_TRANSACTIONS_SQL, (100,), "SCAN t USING INDEX idx_transactions_date"),
+    (REVENUE_RANGE_SQL, ("2025-01-01", "2025-02-01"), "USING INDEX idx_transactions_date"),
+    (NEW_ATTENDANCE_SQL, (500, 100), "SEARCH a USING INTEGER PRIMARY KEY (rowid>?)"),
+    (CLOSED_ATTENDANCE_SQL, ("[1, 2]",), "SEARCH a USING INTEGER PRIMARY KEY (rowid=?)"),
+    (NEW_TRANSACTIONS_SQL, (500, 100), "SEARCH t USING INTEGER PRIMARY KEY (rowid>?)"),
+    (CLOSE_STALE_SQL, ("2025-01-02 08:00:00", 1735689600, 500), "idx_attendance_stale (checkin_at<?)"),
+    (STATUS_SQL, ("expired", "active", "", "2025-01-01", 500),
+     "idx_members_status_end (membership_status=? AND end_date>? AND end_date<?)"),
+])
+def test_hot_queries_use_indexes(repo, sql, params, expected):
+    plan = query_plan(repo, sql, params)
+    assert expected in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_day_and_month_bounds():
+    assert day_bounds(date(2024, 12, 31)) == (1735603200, 1735689600)
+    assert month_bounds(date(2024, 2, 29)) == ("2024-02-01", "2024-03-01")
+    assert month_bounds(date(2024, 12, 15)) == ("2024-12-01", "2025-01-01")
+
+
+def test_open_session_ignores_previous_days(repo, member_id):
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+    with repo.db.transaction() as conn:
+        conn.execute("INSERT INTO attendance (member_id, checkin_time) VALUES (?, ?)", (member_id, yesterday))
+    assert repo.attendance.find_open_session_today(member_id) is None
+    assert repo.attendance.count_active_today() == 0
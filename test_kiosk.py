@@ -0,0 +1,49 @@
+from kiosk import CHECKED_IN, CHECKED_OUT, OpenSessionIndex
+from repository import NOT_FOUND
+
+
+def test_toggle_checks_in_then_out(repo, member_id):
+    index = OpenSessionIndex(repo.db)
+    assert index.toggle(str(member_id)) == (CHECKED_IN, "Jane Doe")
+    assert index.is_checked_in(member_id)
+    assert repo.dashboard_stats().checked_in == 1
+
+    assert index.toggle(member_id) == (CHECKED_OUT, "Jane Doe")
+    assert not index.is_checked_in(member_id)
+    assert repo.db.execute("SELECT COUNT(*) FROM attendance WHERE checkout_time IS NOT NULL").fetchone()[0] == 1
+
+
+def test_unknown_members(repo):
+    index = OpenSessionIndex(repo.db)
+    assert index.toggle(424242) == (NOT_FOUND, None)
+    assert index.toggle("abc") == (NOT_FOUND, None)
+
+
+def test_loads_existing_open_sessions(repo, member_id):
+    repo.attendance.check_in(member_id)
+    index = OpenSessionIndex(repo.db)
+    assert index.is_checked_in(member_id)
+    assert index.toggle(member_id)[0] == CHECKED_OUT
+
+
+def test_picks_up_writes_from_other_connections(repo, member_id):
+    index = OpenSessionIndex(repo.db)
+    repo.check_in_member(member_id)
+    assert index.toggle(member_id)[0] == CHECKED_OUT
+    assert repo.attendance.find_open_session_today(member_id) is None
+
+    index.toggle(member_id)
+    repo.check_out_member(member_id)
+    assert index.toggle(member_id)[0] == CHECKED_IN
+
+
+def test_sessions_left_open_yesterday_are_ignored(repo, member_id):
+    repo.db.execute(
+        "INSERT INTO attendance (member_id, checkin_time) VALUES (?, datetime('now', 'localtime', '-1 day'))",
+        (member_id,)
+    )
+    index = OpenSessionIndex(repo.db)
+    assert not index.is_checked_in(member_id)
+    # Same answer as the check-in window: a new session today
+    assert index.toggle(member_id)[0] == CHECKED_IN
+    assert repo.attendance.find_open_session_today(member_id)
@@ -0,0 +1,61 @@
+from live_table import LiveTable
+
+
+class FakeTree:
+    """The few Treeview calls LiveTable makes, on a plain list"""
+
+    def __init__(self):
+        self.rows = []
+
+    def get_children(self):
+        return tuple(iid for iid, _ in self.rows)
+
+    def exists(self, iid):
+        return any(row_iid == iid for row_iid, _ in self.rows)
+
+    def item(self, iid, values):
+        self.rows = [(row_iid, values if row_iid == iid else row) for row_iid, row in self.rows]
+
+    def insert(self, parent, index, iid, values):
+        self.rows.insert(index, (iid, values))
+
+    def delete(self, *iids):
+        self.rows = [(iid, row) for iid, row in self.rows if iid not in iids]
+
+
+def session(session_id, checkout=None):
+    return (session_id, 1, "Jane Doe", f"2025-06-01 09:{session_id:02d}:00", checkout, None)
+
+
+def live_table(tree, limit=3):
+    return LiveTable(None, tree, load=None, changes=None, limit=limit, is_pending=lambda row: row[4] is None)
+
+
+def test_apply_inserts_updates_and_trims():
+    tree = FakeTree()
+    table = live_table(tree)
+    table.apply([session(2), session(1, "10:00")], replace=True)
+    assert tree.get_children() == ("2", "1")
+    assert (table.high_water, table.pending_ids) == (2, {2})
+
+    # Newest-first changes: two new sessions and the open one now closed
+    assert table.apply([session(4), session(3), session(2, "11:00")]) == (2, 1)
+    assert tree.get_children() == ("4", "3", "2")
+    assert dict(tree.rows)["2"][4] == "11:00"
+    assert (table.high_water, table.pending_ids) == (4, {3, 4})
+
+    table.apply([session(5, "12:00")])
+    assert tree.get_children() == ("5", "4", "3")
+    table.apply([session(7), session(6)], replace=False)
+    assert tree.get_children() == ("7", "6", "5")
+    # Trimmed rows are no longer followed
+    assert table.pending_ids == {6, 7}
+
+
+def test_replace_starts_over():
+    tree = FakeTree()
+    table = live_table(tree)
+    table.apply([session(3), session(2)])
+    table.apply([session(1)], replace=True)
+    assert tree.get_children() == ("1",)
+    assert (table.high_water, table.pending_ids) == (1, {1})
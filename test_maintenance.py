@@ -0,0 +1,99 @@
+import logging
+from datetime import date, datetime
+
+import analytics
+import maintenance
+
+NOW = datetime(2025, 6, 2, 8, 0)
+
+
+def add_member(repo, name, end_date):
+    return repo.members.add((name, 30, "Female", "0", "x", "Monthly", "2025-01-01", end_date))
+
+
+def statuses(repo):
+    return dict(repo.db.execute("SELECT name, membership_status FROM members"))
+
+
+def test_stale_sessions_are_closed_and_flagged(repo, member_id):
+    with repo.db.transaction() as conn:
+        conn.executemany("INSERT INTO attendance (member_id, checkin_time, checkout_time) VALUES (?, ?, ?)", [
+            (member_id, "2025-05-30 18:00:00", None),
+            (member_id, "2025-06-01 17:00:00", None),
+            (member_id, "2025-06-01 09:00:00", "2025-06-01 10:00:00"),
+            (member_id, "2025-06-02 07:00:00", None),
+        ])
+    assert repo.dashboard_stats().checked_in == 3
+
+    assert maintenance.close_stale_sessions(repo.db, 12, now=NOW, batch_size=1) == 2
+    rows = repo.db.execute("SELECT checkin_time, checkout_time, auto_closed FROM attendance ORDER BY id").fetchall()
+    assert rows == [
+        ("2025-05-30 18:00:00", "2025-06-02 08:00:00", 1),
+        ("2025-06-01 17:00:00", "2025-06-02 08:00:00", 1),
+        ("2025-06-01 09:00:00", "2025-06-01 10:00:00", 0),
+        ("2025-06-02 07:00:00", None, 0),
+    ]
+    assert repo.dashboard_stats().checked_in == 1
+    assert [row[5] for row in repo.attendance.recent()] == ["Active", "Auto-closed", "60 min", "Auto-closed"]
+    assert maintenance.close_stale_sessions(repo.db, 12, now=NOW) == 0
+
+    # Auto-closed sessions are visits without a duration
+    analytics.refresh(repo.db, today=date(2025, 6, 2))
+    assert repo.db.execute("SELECT visits, closed FROM attendance_daily WHERE day = '2025-06-01'").fetchone() == (2, 1)
+
+
+def test_membership_sweep_moves_members_between_statuses(repo):
+    for name, end_date in [("lapsed", "2025-05-31"), ("due", "2025-06-05"), ("paid", "2025-12-31"), ("open", None)]:
+        add_member(repo, name, end_date)
+    today = date(2025, 6, 1)
+
+    moved = maintenance.sweep_memberships(repo.db, today, expiring_days=7, batch_size=1)
+    assert moved == {"expired": 1, "expiring": 1, "active": 0}
+    assert statuses(repo) == {"lapsed": "expired", "due": "expiring", "paid": "active", "open": "active"}
+    assert maintenance.sweep_memberships(repo.db, today) == {"expired": 0, "expiring": 0, "active": 0}
+
+    # Renewals and time passing
+    with repo.db.transaction() as conn:
+        conn.execute("UPDATE members SET end_date = '2026-05-31' WHERE name = 'lapsed'")
+    moved = maintenance.sweep_memberships(repo.db, date(2025, 6, 6), expiring_days=7)
+    assert moved == {"expired": 1, "expiring": 0, "active": 1}
+    assert statuses(repo) == {"lapsed": "active", "due": "expired", "paid": "active", "open": "active"}
+
+
+def test_scheduler_runs_due_jobs_and_records_them(repo, member_id, caplog):
+    calls = []
+    jobs = [
+        maintenance.Job("often", lambda db: (calls.append("often") or 3, {"n": 3}), 10),
+        maintenance.Job("rarely", lambda db: (calls.append("rarely") or 0, {}), 100),
+    ]
+    scheduler = maintenance.Scheduler(repo.db, jobs)
+    with caplog.at_level(logging.INFO, logger="maintenance"):
+        assert scheduler.run_pending(now=1000) == ["often", "rarely"]
+    assert "often changed 3 rows" in caplog.text
+    assert scheduler.run_pending(now=1005) == []
+    assert scheduler.run_pending(now=1010) == ["often"]
+    assert calls == ["often", "rarely", "often"]
+
+    runs = repo.db.execute("SELECT job, rows, detail FROM maintenance_runs ORDER BY id").fetchall()
+    assert runs == [("often", 3, '{"n": 3}'), ("rarely", 0, "{}"), ("often", 3, '{"n": 3}')]
+    assert set(maintenance.last_runs(repo.db)) == {"often", "rarely"}
+
+
+def test_failed_job_does_not_stop_the_others(repo, caplog):
+    def fail(db):
+        raise RuntimeError("database is locked")
+
+    scheduler = maintenance.Scheduler(repo.db, [
+        maintenance.Job("broken", fail, 10),
+        maintenance.Job("fine", lambda db: (0, {}), 10),
+    ])
+    assert scheduler.run_pending(now=0) == ["broken", "fine"]
+    assert "broken failed" in caplog.text
+    assert maintenance.last_runs(repo.db).keys() == {"fine"}
+
+
+def test_cli(db_path, capsys):
+    assert maintenance.main(["run", "--db", db_path]) == 0
+    out = capsys.readouterr().out
+    assert "close_stale_sessions: 0 rows changed" in out
+    assert "sweep_memberships      last run" in out
@@ -0,0 +1,77 @@
+from datetime import date
+
+import archive
+from member_detail import HistoryPager
+from repository import MEMBER_SUMMARY_SQL, MEMBER_VISITS_ARM
+
+TODAY = date(2025, 6, 1)
+
+
+def seed(repo, member_id):
+    sessions = [
+        (member_id, f"{year}-{month:02d}-10 09:00:00", f"{year}-{month:02d}-10 10:30:00", 0)
+        for year in (2023, 2024, 2025) for month in range(1, 13) if (year, month) < (2025, 6)
+    ]
+    sessions += [
+        (member_id, "2025-05-20 09:00:00", "2025-05-20 23:59:59", 1),   # auto-closed: no length
+        (member_id, "2025-05-31 18:00:00", None, 0),                    # still in the gym
+    ]
+    with repo.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO attendance (member_id, checkin_time, checkout_time, auto_closed) VALUES (?, ?, ?, ?)",
+            sessions
+        )
+        conn.executemany(
+            "INSERT INTO transactions (member_id, amount_paid, date, payment_method) VALUES (?, ?, ?, ?)",
+            [(member_id, 30.0, f"2025-0{month}-01", "Cash") for month in range(1, 6)] + [
+                (member_id, 5.0, "2025-05-01", "Card"),
+            ]
+        )
+    return len(sessions)
+
+
+def test_summary_covers_archived_visits(repo, member_id):
+    total = seed(repo, member_id)
+    before = repo.member_summary(member_id)
+    archive.archive(repo.db, 365, today=TODAY)
+
+    summary = repo.member_summary(member_id)
+    assert summary == before
+    assert (summary.name, summary.membership_status) == ("Jane Doe", "active")
+    assert (summary.visits, summary.last_visit, summary.avg_session_minutes) == (total, "2025-05-31 18:00:00", 90)
+    assert (summary.payments, summary.total_paid) == (6, 155.0)
+    # Same-day payments: the later one wins
+    assert (summary.last_payment_amount, summary.last_payment_date) == (5.0, "2025-05-01")
+
+    new = repo.members.add(("New", 20, "Male", "0", "x", "Monthly", "2025-01-01", "2025-12-31"))
+    assert repo.member_summary(new)[9:] == (0, None, None, 0, 0, None, None)
+    assert repo.member_summary(999) is None
+
+
+def test_summary_reads_indexes(repo, member_id):
+    conn = repo.db.connection()
+    visits, params = archive.union(conn, MEMBER_VISITS_ARM, (member_id,))
+    sql = MEMBER_SUMMARY_SQL.format(visits=visits)
+    plan = " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, (*params, member_id, member_id)))
+    assert "COVERING INDEX idx_attendance_member_history (member_id=?)" in plan
+    assert "idx_transactions_member (member_id=?)" in plan
+    assert "SCAN attendance" not in plan and "SCAN transactions" not in plan
+
+
+def test_history_pages_walk_through_archives(repo, member_id):
+    total = seed(repo, member_id)
+    archive.archive(repo.db, 365, today=TODAY)
+
+    pager = HistoryPager(repo.member_visits, member_id, page_size=7)
+    rows = []
+    while pager.has_more:
+        rows += pager.apply_next(pager.fetch_next())
+    assert len(rows) == total and len({row[0] for row in rows}) == total
+    assert [row[1] for row in rows] == sorted((row[1] for row in rows), reverse=True)
+    assert rows[0][3] == "Active" and rows[1][3] == "Auto-closed" and rows[2][3] == "90 min"
+
+    pager = HistoryPager(repo.member_payments, member_id, page_size=4)
+    first, second = pager.apply_next(pager.fetch_next()), pager.apply_next(pager.fetch_next())
+    assert [row[1:3] for row in first] == [("2025-05-01", 5.0), ("2025-05-01", 30.0), ("2025-04-01", 30.0),
+                                          ("2025-03-01", 30.0)]
+    assert len(second) == 2 and not pager.has_more and pager.fetch_next() == []
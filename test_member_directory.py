@@ -0,0 +1,67 @@
+from view_member import MemberPager
+
+
+def add_members(repo, count):
+    with repo.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO members (name, membership_type) VALUES (?, ?)",
+            [(f"Member {i}", "Monthly" if i % 2 else "Yearly") for i in range(count)]
+        )
+
+
+def test_pages_walk_down_and_back_up(repo):
+    add_members(repo, 50)
+    pager = MemberPager(repo.members, page_size=10, max_rows=25)
+
+    rows = pager.reset()
+    assert [row[0] for row in rows] == list(range(50, 40, -1))
+
+    pager.next_page()
+    rows, trimmed = pager.next_page()
+    assert trimmed == 5 and len(pager.ids) == 25
+    assert pager.ids[0] == 45 and pager.ids[-1] == 21 and pager.has_newer
+
+    rows, trimmed = pager.previous_page()
+    assert [row[0] for row in rows] == list(range(50, 45, -1))
+    assert trimmed == 5 and pager.ids[0] == 50 and pager.ids[-1] == 26
+    assert not pager.has_newer and pager.has_older
+
+
+def test_last_page_stops_paging(repo):
+    add_members(repo, 15)
+    pager = MemberPager(repo.members, page_size=10)
+    pager.reset()
+    rows, _ = pager.next_page()
+    assert len(rows) == 5 and not pager.has_older
+    assert pager.next_page() == ([], 0)
+
+
+def test_filters_are_pushed_into_sql(repo):
+    add_members(repo, 30)
+    pager = MemberPager(repo.members, page_size=100)
+    rows = pager.reset(membership_type="Yearly", search="Member 2")
+    assert {row[0] - 1 for row in rows} == {2, 20, 22, 24, 26, 28}
+    assert repo.members.count() == 30
+    assert repo.members.count("Monthly") == 15
+
+
+def test_search_matches_name_phone_and_address(repo):
+    repo.members.add(("Alice Smith", 30, "Female", "01711000000", "12 Lake Road", "Monthly", "2025-01-01", "2025-12-31"))
+    repo.members.add(("Bob Stone", 40, "Male", "01822000000", "9 Hill Street", "Yearly", "2025-01-01", "2025-12-31"))
+
+    def names(**filters):
+        return [row[1] for row in repo.members.page(**filters)]
+
+    assert names(search="smi") == ["Alice Smith"]
+    assert names(search="822") == ["Bob Stone"]
+    assert names(search="hill") == ["Bob Stone"]
+    assert names(search="o") == ["Bob Stone", "Alice Smith"]
+    assert names(search="stone", membership_type="Monthly") == []
+
+
+def test_search_index_follows_deletes(repo):
+    member_id = repo.members.add(("Carol Jones", 25, "Female", "0", "x", "Monthly", "2025-01-01", "2025-12-31"))
+    assert repo.members.has_search_index()
+    assert repo.members.page(search="Carol")
+    repo.members.delete(member_id)
+    assert repo.members.page(search="Carol") == []
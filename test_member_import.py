@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+
+import pytest
+
+import member_import
+
+HEADER = ["Name", "Age", "Gender", "Phone", "Address", "Membership Type", "Start Date", "End Date"]
+GOOD = ["Ann", "30", "Female", "017", "Road 1", "Monthly", "2025-01-01", "2025-02-01"]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def test_csv_import_in_chunks_with_rejections(repo, tmp_path):
+    source = tmp_path / "members.csv"
+    bad_age = GOOD[:1] + ["abc"] + GOOD[2:]
+    bad_type = GOOD[:5] + ["Weekly"] + GOOD[6:]
+    bad_dates = GOOD[:6] + ["2025-03-01", "2025-02-01"]
+    write_csv(source, [GOOD] * 5 + [bad_age, bad_type, bad_dates])
+    progress = []
+
+    result = member_import.import_members(
+        str(source), chunk_size=3, db=repo.db, progress=lambda *counts: progress.append(counts)
+    )
+
+    assert result.imported == 5 and result.rejected == 3
+    assert progress == [(3, 0), (5, 1), (5, 3)]
+    assert repo.dashboard_stats().total_members == 5
+    assert repo.members.page(search="Ann")[0][2] == 30
+    with open(result.error_path) as f:
+        rejected = list(csv.DictReader(f))
+    assert [row["line"] for row in rejected] == ["7", "8", "9"]
+    assert "unknown membership type" in rejected[1]["reason"]
+
+
+def test_json_array_and_json_lines(repo, tmp_path):
+    record = dict(zip(member_import.FIELDS, GOOD))
+    array = tmp_path / "members.json"
+    array.write_text(json.dumps([record, {**record, "age": 151}, record], indent=2))
+    lines = tmp_path / "members.jsonl"
+    lines.write_text(json.dumps(record) + "\nnot json\n")
+
+    assert member_import.import_members(str(array), db=repo.db)[:2] == (2, 1)
+    assert member_import.import_members(str(lines), db=repo.db)[:2] == (1, 1)
+    assert repo.members.count() == 3
+
+
+def test_json_array_is_streamed(monkeypatch, tmp_path):
+    monkeypatch.setattr(member_import, "JSON_READ_SIZE", 7)
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps([{"name": "a" * 20}, {"name": "b, ]}"}, [1, 2], 1234567890]))
+    items = [item for _, item in member_import.read_records(str(path))]
+    assert items == [{"name": "a" * 20}, {"name": "b, ]}"}, [1, 2], 1234567890]
+
+
+def test_malformed_json_item_is_rejected_without_reading_on(monkeypatch):
+    monkeypatch.setattr(member_import, "JSON_READ_SIZE", 16)
+    reads = []
+
+    class Source(io.StringIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    text = '[{"name": "a"}, {"name": b}, ' + ", ".join(['{"name": "c"}'] * 10_000) + "]"
+    items = member_import._iter_json_array(Source(text))
+    assert next(items) == {"name": "a"}
+    assert next(items).startswith("invalid JSON")
+    assert len(reads) < 5
+    assert next(items) == {"name": "c"}
+
+
+def test_bad_json_array_items_end_up_in_the_error_file(repo, tmp_path):
+    good = json.dumps(dict(zip(member_import.FIELDS, GOOD)))
+    for text, counts, bad_item in (
+        (f"[{good}, {good}, {{\"name\": nope}}, {good}]", (3, 1), "3"),
+        (f"[{good}, {good}, {{\"name\": ", (2, 1), "3"),
+    ):
+        path = tmp_path / "members.json"
+        path.write_text(text)
+        result = member_import.import_members(str(path), chunk_size=1, db=repo.db)
+        assert result[:2] == counts
+        with open(result.error_path, newline="") as f:
+            rejected = list(csv.DictReader(f))
+        assert [row["line"] for row in rejected] == [bad_item]
+        assert rejected[0]["reason"].startswith("invalid JSON")
+    assert repo.members.count() == 5
+
+
+def test_cli(db_path, tmp_path, capsys):
+    source = tmp_path / "members.csv"
+    write_csv(source, [GOOD])
+    assert member_import.main([str(source), "--db", db_path]) == 0
+    assert "1 imported, 0 rejected" in capsys.readouterr().out
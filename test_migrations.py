@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+import db
+import stats
+from db import SCHEMA_VERSION, connect_db, get_database, migrate
+from repository import GymRepository
+
+
+def legacy_database(path):
+    """A database from before schema versioning, with the loose data it allowed"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE members (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, age TEXT, gender TEXT,
+            phone TEXT, address TEXT, membership_type TEXT, start_date TEXT, end_date TEXT);
+        CREATE TABLE attendance (id INTEGER PRIMARY KEY AUTOINCREMENT, member_id INTEGER,
+            checkin_time TEXT, checkout_time TEXT);
+        CREATE TABLE transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, member_id INTEGER,
+            amount_paid REAL, date TEXT);
+        INSERT INTO members (name, age, start_date, end_date) VALUES
+            ('Jane', '30', '2025-01-01', '2025-12-31'), ('Gone', '41', '2025-01-01', '2025-12-31'),
+            ('Odd', 'thirty', '01/01/2025', '2025-12-31');
+        DELETE FROM members WHERE name = 'Gone';
+        INSERT INTO attendance (member_id, checkin_time, checkout_time) VALUES
+            (1, '2025-06-01 09:00:00', '2025-06-01 10:30:00'),
+            (2, '2025-06-01 11:00:00', NULL),
+            (1, '2025-06-02 09:00:00', '2025-06-02 08:00:00'),
+            (1, 'yesterday morning', NULL);
+        INSERT INTO transactions (member_id, amount_paid, date) VALUES (1, 30, '2025-06-01'), (2, 15, '2025-06-01');
+    """)
+    conn.commit()
+    conn.close()
+
+
+def test_new_database_is_created_at_the_latest_version(repo, member_id):
+    conn = repo.db.connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+    with pytest.raises(sqlite3.IntegrityError):
+        repo.members.add(("Kid", "abc", "Male", "0", "x", "Monthly", "2025-01-01", "2025-12-31"))
+    with pytest.raises(sqlite3.IntegrityError):
+        repo.members.add(("Kid", 12, "Male", "0", "x", "Monthly", "01/01/2025", "2025-12-31"))
+    with pytest.raises(sqlite3.IntegrityError):
+        repo.attendance.check_in(999)
+    with pytest.raises(sqlite3.IntegrityError):
+        repo.transactions.add(member_id, -5)
+
+
+def test_warm_start_runs_no_create_statements(db_path):
+    connect_db(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert migrate(conn) == SCHEMA_VERSION
+    assert statements == ["PRAGMA user_version"]
+    conn.close()
+
+
+def test_legacy_database_is_migrated_and_cleaned(db_path):
+    legacy_database(db_path)
+    repo = GymRepository(get_database(db_path))
+    conn = repo.db.connection()
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("SELECT name, age, start_date FROM members ORDER BY id").fetchall() == [
+        ("Jane", 30, "2025-01-01"), ("Odd", None, None)
+    ]
+    assert conn.execute(
+        "SELECT member_id, checkout_time, checkin_at, checkout_at - checkin_at FROM attendance ORDER BY id"
+    ).fetchall() == [
+        (1, "2025-06-01 10:30:00", 1748768400, 5400),
+        (None, None, 1748775600, None),
+        (1, "2025-06-02 09:00:00", 1748854800, 0),
+    ]
+    assert [row[1] for row in conn.execute("SELECT id, member_id FROM transactions ORDER BY id")] == [1, None]
+    # The session with an unreadable check-in is set aside, not lost
+    assert conn.execute("SELECT id, checkin_time FROM attendance_rejected").fetchall() == [(4, "yesterday morning")]
+    assert stats.reconcile(conn, fix=False) == []
+    # Triggers, search index and id sequence survive the rebuild
+    assert repo.dashboard_stats().total_members == 2
+    assert repo.members.page(search="Jane")[0][1] == "Jane"
+    assert repo.members.add(("New", 20, "Male", "0", "x", "Monthly", "2025-01-01", "2025-12-31")) == 4
+
+
+def test_deleting_a_member_keeps_their_history(repo, member_id):
+    repo.attendance.check_in(member_id)
+    repo.transactions.add(member_id, 30.0)
+    repo.members.delete(member_id)
+    assert repo.db.execute("SELECT member_id FROM attendance").fetchall() == [(None,)]
+    assert repo.dashboard_stats().revenue_today == 30
+
+
+def test_migrations_apply_in_order(db_path):
+    connect_db(db_path, 1)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert "checkin_at" not in {row[1] for row in conn.execute("PRAGMA table_xinfo(attendance)")}
+    assert migrate(conn) == SCHEMA_VERSION
+    assert "checkin_at" in {row[1] for row in conn.execute("PRAGMA table_xinfo(attendance)")}
+
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError, match="newer than this app"):
+        migrate(conn)
+    conn.close()
+
+
+def test_failed_migration_rolls_back(db_path, monkeypatch):
+    connect_db(db_path, 1)
+
+    def broken(conn):
+        conn.execute("DROP TABLE transactions")
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(db, "MIGRATIONS", [db.MIGRATIONS[0], broken])
+    with pytest.raises(sqlite3.OperationalError):
+        connect_db(db_path, 2)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,94 @@
+import pytest
+
+pytest.importorskip("reportlab")
+
+import receipt_generator  # noqa: E402
+from repository import NOT_FOUND, OK  # noqa: E402
+
+
+def test_get_profiles_single_query(repo, member_id):
+    assert repo.members.get_profiles([member_id, str(member_id), 999]) == {
+        member_id: ("Jane Doe", "0123456789", "Monthly")
+    }
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_renders_one_pdf_per_payment(default_db, repo, member_id, tmp_path, workers):
+    payments = [(member_id, 50, "Cash"), (member_id, 20.5, "Card"), (404, 10, "Cash")]
+    files = receipt_generator.generate_receipts_batch(payments, output_dir=str(tmp_path), workers=workers)
+
+    assert len(set(files)) == 3
+    for filename in files:
+        with open(filename, "rb") as f:
+            assert f.read(4) == b"%PDF"
+
+
+def test_single_receipt(default_db, repo, member_id, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    filename = receipt_generator.generate_receipt_pdf(member_id, 75.0)
+    assert (tmp_path / filename).exists()
+
+
+def test_receipt_numbers_are_monotonic_and_linked(repo, member_id):
+    first = repo.record_payment_with_receipt(member_id, 30.0, payment_method="Cash")[2]
+    status, name, second = repo.record_payment_with_receipt(member_id, 45.0)
+    assert (status, name) == (OK, "Jane Doe")
+    assert second.number > first.number
+    assert second.label == f"GF-{second.issued_at[:4]}-{second.number:06d}"
+    assert repo.record_payment_with_receipt(999, 10.0) == (NOT_FOUND, None, None)
+
+    transaction_ids = [row[0] for row in repo.transactions.recent()]
+    assert {first.transaction_id, second.transaction_id} == set(transaction_ids)
+    assert repo.receipts.find(member_id=member_id) == [second, first]
+    assert repo.receipts.find(number=second.label) == [second]
+    assert repo.receipts.find(transaction_id=first.transaction_id) == [first]
+    day = second.issued_at[:10]
+    assert len(repo.receipts.find(start=day, end="9999-12-31")) == 2
+    assert repo.receipts.find(end=day) == []
+    # Unknown members get a number but no member link
+    assert repo.receipts.issue(404, 5.0).member_id is None
+
+
+def test_receipt_pdfs_are_content_addressed(repo, member_id):
+    receipts = repo.receipts.issue_many([(member_id, 10.0, "Cash"), (member_id, 10.0, "Cash")])
+    hashes = repo.receipts.store_pdfs([(receipt.number, b"%PDF same") for receipt in receipts])
+    assert hashes[0] == hashes[1]
+    assert repo.db.execute("SELECT COUNT(*) FROM receipt_blobs").fetchone()[0] == 1
+    assert repo.receipts.pdf(receipts[1].label) == b"%PDF same"
+    assert repo.receipts.pdf(receipts[1].number + 1) is None
+
+
+def test_payment_receipt_is_stored_and_reprinted(default_db, repo, member_id, tmp_path, monkeypatch):
+    import transaction
+
+    status, _, receipt = transaction.record_payment_with_receipt(member_id, 30.0, None, "Cash")
+    assert status == OK
+    stored = repo.receipts.pdf(receipt.number)
+    assert stored.startswith(b"%PDF")
+    assert receipt_generator.render_receipt(receipt, repo.members.get_profile(member_id)) == stored
+
+    # A reprint of the same member and amount reads the stored PDF
+    monkeypatch.setattr(receipt_generator, "render_receipt", None)
+    path = tmp_path / "copy.pdf"
+    assert transaction.reprint_receipt(member_id, 30.0, "Cash", str(path)) == receipt
+    assert path.read_bytes() == stored
+
+
+def test_failed_receipt_keeps_the_payment_and_reprints(default_db, repo, member_id, tmp_path, monkeypatch):
+    import transaction
+
+    def broken(receipt, member):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(receipt_generator, "render_receipt", broken)
+        with pytest.raises(transaction.ReceiptFailed, match="disk full") as failed:
+            transaction.record_payment_with_receipt(member_id, 30.0, None, "Cash")
+    assert failed.value.name == "Jane Doe"
+    assert repo.db.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 1
+
+    # Generate Receipt renders the same receipt number instead of issuing another
+    path = tmp_path / "receipt.pdf"
+    receipt = transaction.reprint_receipt(member_id, 30.0, "Cash", str(path))
+    assert receipt.number == failed.value.receipt.number and receipt.pdf_sha256
+    assert path.read_bytes().startswith(b"%PDF")
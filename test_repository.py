@@ -0,0 +1,151 @@
+import sqlite3
+import threading
+
+from db import get_database
+from repository import ProfileCache
+
+
+def test_connection_is_wal_and_reused(repo):
+    conn = repo.db.connection()
+    assert conn is repo.db.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+
+def test_connections_are_per_thread(repo):
+    seen = []
+    worker = threading.Thread(target=lambda: seen.append(repo.db.connection()))
+    worker.start()
+    worker.join()
+    assert seen[0] is not repo.db.connection()
+
+
+def test_shared_database_per_path(db_path):
+    assert get_database(db_path) is get_database(db_path)
+
+
+def test_check_in_and_out(repo, member_id):
+    assert repo.members.get_name(member_id) == "Jane Doe"
+    assert repo.attendance.find_open_session_today(member_id) is None
+
+    attendance_id = repo.attendance.check_in(member_id)
+    assert repo.attendance.find_open_session_today(member_id) == attendance_id
+    assert repo.dashboard_stats().checked_in == 1
+
+    repo.attendance.check_out(attendance_id)
+    assert repo.attendance.find_open_session_today(member_id) is None
+    assert repo.attendance.recent()[0][0] == attendance_id
+
+
+def test_payment_and_stats(repo, member_id):
+    repo.transactions.add(member_id, 40.0)
+    repo.transactions.add(member_id, 10.0)
+    assert repo.dashboard_stats() == (1, 0, 50.0, 50.0)
+    assert [row[3] for row in repo.transactions.recent()] == [10.0, 40.0]
+
+
+def test_failed_transaction_rolls_back(repo, member_id):
+    try:
+        with repo.db.transaction() as conn:
+            conn.execute("DELETE FROM members WHERE id=?", (member_id,))
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert repo.members.get_name(member_id) == "Jane Doe"
+
+
+def test_delete_member(repo, member_id):
+    repo.members.delete(member_id)
+    assert repo.members.list_all() == []
+
+
+def test_front_desk_actions_report_status(repo, member_id):
+    from repository import ALREADY_CHECKED_IN, NO_OPEN_SESSION, NOT_FOUND, OK
+
+    assert repo.check_in_member(9999) == (NOT_FOUND, None)
+    assert repo.check_in_member(member_id) == (OK, "Jane Doe")
+    assert repo.check_in_member(member_id) == (ALREADY_CHECKED_IN, "Jane Doe")
+    assert repo.check_out_member(member_id) == OK
+    assert repo.check_out_member(member_id) == NO_OPEN_SESSION
+    assert repo.record_payment(member_id, 30.0) == (OK, "Jane Doe")
+    assert repo.record_payment(9999, 30.0) == (NOT_FOUND, None)
+
+
+def test_changes_since_high_water_mark(repo, member_id):
+    first = repo.attendance.check_in(member_id)
+    payment = repo.transactions.add(member_id, 30.0)
+    version = repo.data_version()
+    assert repo.data_version() == version
+
+    second = repo.attendance.check_in(member_id)
+    repo.attendance.check_out(first)
+    repo.transactions.add(member_id, 10.0)
+    assert repo.data_version() != version
+
+    changes = repo.attendance.changes(first, [first])
+    assert [row[0] for row in changes] == [second, first]
+    assert changes[1][4] is not None
+    assert repo.attendance.changes(second, [second]) == []
+    assert [row[3] for row in repo.transactions.since(payment)] == [10.0]
+
+
+def test_profile_cache_serves_check_in_payment_and_receipt(repo, member_id):
+    repo.members.profiles.reset_counters()
+    repo.check_in_member(member_id)
+    repo.record_payment(member_id, 30.0)
+    assert repo.members.get_profile(str(member_id)) == ("Jane Doe", "0123456789", "Monthly")
+    assert repo.members.get_profiles([member_id]) == {member_id: ("Jane Doe", "0123456789", "Monthly")}
+    cache = repo.diagnostics()["profile_cache"]
+    assert (cache["misses"], cache["hits"]) == (1, 3)
+    # Unknown members are not cached
+    assert repo.members.get_name("nobody") is None
+    assert repo.members.get_name(999) is None
+
+
+def test_profile_cache_invalidation(repo, member_id):
+    assert repo.members.get_name(member_id) == "Jane Doe"
+    other = sqlite3.connect(repo.db.path)
+    # A commit that touches no member keeps the cache
+    other.execute("INSERT INTO attendance (member_id, checkin_time) VALUES (?, '2025-06-01 09:00:00')", (member_id,))
+    other.commit()
+    assert repo.members.get_name(member_id) == "Jane Doe"
+    assert repo.members.profiles.stats()["invalidations"] == 0
+    # Another process renaming the member does not
+    other.execute("UPDATE members SET name = 'Jane Roe' WHERE id = ?", (member_id,))
+    other.commit()
+    other.close()
+    assert repo.members.get_name(member_id) == "Jane Roe"
+    assert repo.members.profiles.stats()["invalidations"] == 1
+
+    repo.members.delete(member_id)
+    assert repo.members.get_profile(member_id) is None
+
+
+def test_profile_cache_drops_a_load_that_raced_a_rename(repo, member_id):
+    cache = repo.members.profiles
+
+    def load(member_id):
+        profile = repo.members._load_profile(member_id)
+        # Another connection renames the member and a second reader sees the commit before this load is stored
+        other = sqlite3.connect(repo.db.path)
+        other.execute("UPDATE members SET name = 'Janet' WHERE id = ?", (member_id,))
+        other.commit()
+        other.close()
+        thread = threading.Thread(target=cache.get, args=(member_id, repo.members._load_profile))
+        thread.start()
+        thread.join()
+        return profile
+
+    assert cache.get(member_id, load)[0] == "Jane Doe"
+    assert repo.members.get_name(member_id) == "Janet"
+
+
+def test_profile_cache_is_bounded(repo):
+    repo.members.profiles = ProfileCache(repo.db, size=2)
+    ids = [repo.members.add((f"Member {i}", 30, "Female", "0", "x", "Monthly", "2025-01-01", "2025-12-31"))
+           for i in range(3)]
+    for member_id in ids + ids[:1]:
+        repo.members.get_name(member_id)
+    cache = repo.members.profiles.stats()
+    assert cache["size"] == 2
+    assert cache["misses"] == 4
@@ -0,0 +1,77 @@
+import sqlite3
+
+import revenue
+import stats
+from db import connect_db, get_database
+from repository import OK
+
+
+def add_payments(repo, rows):
+    with repo.db.transaction() as conn:
+        conn.executemany("""
+            INSERT INTO transactions (member_id, amount_paid, date, membership_type, payment_method)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+
+
+def test_record_payment_updates_breakdown(repo, member_id):
+    assert repo.record_payment(member_id, 30.0, payment_method="Cash") == (OK, "Jane Doe")
+    assert repo.record_payment(member_id, 80.0, "Quarterly", "Credit Card") == (OK, "Jane Doe")
+    rows = revenue.revenue_report(repo.db, by=("membership_type", "payment_method"))
+    assert [(row.key, row.payments, row.amount) for row in rows] == [
+        (("Monthly", "Cash"), 1, 30.0),
+        (("Quarterly", "Credit Card"), 1, 80.0),
+    ]
+    assert repo.transactions.recent(1)[0][5:] == ("Quarterly", "Credit Card")
+
+
+def test_report_ranges_and_groupings(repo, member_id):
+    add_payments(repo, [
+        (member_id, 10, "2024-12-31", "Monthly", "Cash"),
+        (member_id, 20, "2025-01-15", "Monthly", "Cash"),
+        (member_id, 30, "2025-01-20", "Yearly", "Bank Transfer"),
+        (member_id, 40, "2025-02-01", "Monthly", "Cash"),
+    ])
+    by_month = revenue.revenue_report(repo.db, "2025-01-01", "2025-03-01", by="month")
+    assert [(row.key, row.payments, row.amount) for row in by_month] == [
+        (("2025-01",), 2, 50.0), (("2025-02",), 1, 40.0)
+    ]
+    by_method = revenue.revenue_report(repo.db, "2025-01-01", by="payment_method")
+    assert {row.key[0]: row.amount for row in by_method} == {"Bank Transfer": 30.0, "Cash": 60.0}
+    assert revenue.revenue_total(repo.db, end="2025-01-20") == (2, 30.0)
+    assert [row.key for row in revenue.revenue_report(repo.db, by="year")] == [("2024",), ("2025",)]
+
+
+def test_breakdown_follows_updates_and_deletes(repo, member_id):
+    add_payments(repo, [(member_id, 10, "2025-01-01", "Monthly", "Cash"),
+                        (member_id, 5, "2025-01-01", "Monthly", "Cash")])
+    with repo.db.transaction() as conn:
+        conn.execute("UPDATE transactions SET payment_method = 'Debit Card' WHERE amount_paid = 10")
+        conn.execute("DELETE FROM transactions WHERE amount_paid = 5")
+    rows = revenue.revenue_report(repo.db, by="payment_method")
+    assert [(row.key, row.payments, row.amount) for row in rows] == [(("Debit Card",), 1, 10.0)]
+    with repo.db.transaction() as conn:
+        assert stats.reconcile(conn, fix=False) == []
+
+
+def test_membership_types_are_only_backfilled_on_request(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE members (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, age INTEGER, gender TEXT,
+            phone TEXT, address TEXT, membership_type TEXT, start_date TEXT, end_date TEXT);
+        CREATE TABLE transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, member_id INTEGER,
+            amount_paid REAL, date TEXT);
+        INSERT INTO members (name, membership_type) VALUES ('a', 'Yearly');
+        INSERT INTO transactions (member_id, amount_paid, date) VALUES (1, 300, '2024-05-01'), (2, 15, '2024-05-02');
+    """)
+    conn.close()
+
+    connect_db(db_path)
+    assert revenue.main(["report", "--db", db_path, "--by", "membership_type"]) == 0
+    assert revenue.main(["rebuild", "--db", db_path]) == 0
+    rows = revenue.revenue_report(get_database(db_path), by="membership_type")
+    assert [(row.key, row.amount) for row in rows] == [(("Unknown",), 315.0)]
+
+    assert revenue.main(["backfill-types", "--db", db_path]) == 0
+    rows = revenue.revenue_report(get_database(db_path), by="membership_type")
+    assert [(row.key, row.amount) for row in rows] == [(("Unknown",), 15.0), (("Yearly",), 300.0)]
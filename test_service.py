@@ -0,0 +1,196 @@
+import contextlib
+import sqlite3
+import threading
+
+import pytest
+
+import repository
+import sql_stats
+from db import get_database
+from repository import ALREADY_CHECKED_IN, CHECKED_IN, CHECKED_OUT, NO_OPEN_SESSION, NOT_FOUND, OK
+from service import ServiceClient, ServiceError, WriteQueue, start_server, stop_server
+
+
+@pytest.fixture
+def client(db_path):
+    server = start_server(get_database(db_path), port=0)
+    client = ServiceClient(server.url)
+    yield client
+    client.close()
+    stop_server(server)
+
+
+def test_front_desk_actions(client, member_id):
+    assert client.check_in_member(member_id) == (OK, "Jane Doe")
+    assert client.check_in_member(str(member_id)) == (ALREADY_CHECKED_IN, "Jane Doe")
+    assert client.check_out_member(member_id) == OK
+    assert client.check_out_member(member_id) == NO_OPEN_SESSION
+    assert client.record_payment(member_id, 30) == (OK, "Jane Doe")
+    assert client.record_payment(999, 30) == (NOT_FOUND, None)
+    assert client.toggle_member(member_id) == (CHECKED_IN, "Jane Doe")
+    assert client.toggle_member(member_id) == (CHECKED_OUT, "Jane Doe")
+
+    stats = client.dashboard_stats()
+    assert (stats.total_members, stats.checked_in, stats.revenue_today) == (1, 0, 30)
+    assert [row[1] for row in client.attendance.recent(10)] == [member_id, member_id]
+    assert client.transactions.recent(10)[0][1:4] == (member_id, "Jane Doe", 30)
+
+    sessions = client.attendance.recent(10)
+    version = client.data_version()
+    assert client.attendance.changes(sessions[0][0]) == []
+    client.check_in_member(member_id)
+    assert client.data_version() != version
+    assert [row[0] for row in client.attendance.changes(sessions[0][0])] == [sessions[0][0] + 1]
+    assert client.transactions.since(0)[0][3] == 30
+
+
+def test_members(client, member_id):
+    new_id = client.members.add(("John Roe", "41", "Male", "0199", "2 Lake View", "Yearly",
+                                 "2025-01-01", "2025-12-31"))
+    assert [row[0] for row in client.members.page()] == [new_id, member_id]
+    assert [row[0] for row in client.members.page(search="Lake")] == [new_id]
+    assert [row[0] for row in client.members.page(membership_type="Monthly")] == [member_id]
+    assert client.members.count() == 2
+    assert client.members.get_profile(member_id) == ("Jane Doe", "0123456789", "Monthly")
+    assert client.members.get_profiles([member_id, 999]) == {member_id: ("Jane Doe", "0123456789", "Monthly")}
+    client.members.delete(new_id)
+    assert client.members.get_profile(new_id) is None
+
+
+def test_errors(client):
+    with pytest.raises(ServiceError) as e:
+        client.request("GET", "/nowhere")
+    assert e.value.status == 404
+    with pytest.raises(ServiceError) as e:
+        client.request("POST", "/payments", {"member_id": 1})
+    assert e.value.status == 400
+
+
+def test_concurrent_desks_never_lock(client, repo):
+    ids = [repo.members.add((f"M{i}", 20, "Male", "0", "x", "Monthly", "2025-01-01", "2025-12-31"))
+           for i in range(20)]
+    errors = []
+
+    def desk(desk_ids):
+        desk_client = ServiceClient(f"http://{client.host}:{client.port}")
+        try:
+            for member_id in desk_ids:
+                desk_client.check_in_member(member_id)
+                desk_client.record_payment(member_id, 10)
+                desk_client.check_out_member(member_id)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            desk_client.close()
+
+    threads = [threading.Thread(target=desk, args=(ids[i::4],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert client.dashboard_stats().revenue_today == 200
+
+
+def test_get_repository_returns_client(monkeypatch):
+    monkeypatch.setattr(repository, "SERVICE_URL", "http://127.0.0.1:1")
+    assert isinstance(repository.get_repository(), ServiceClient)
+
+
+def test_diagnostics(client, member_id):
+    client.dashboard_stats()
+    snapshot = client.diagnostics()
+    assert any(row["statement"].startswith("SELECT") for row in snapshot["statements"])
+    client.reset_diagnostics()
+    assert client.diagnostics()["slow_queries"] == []
+
+
+def test_group_commit_batches_writes_and_isolates_failures(repo, member_id):
+    writer = WriteQueue(repo.db, batch_ms=50, batch_ops=4)
+    sql_stats.reset()
+
+    def fail():
+        repo.db.execute("INSERT INTO transactions (member_id, amount_paid) VALUES (?, 99)", (member_id,))
+        raise ValueError("rejected")
+
+    try:
+        futures = [writer.submit(repo.record_payment, member_id, 10.0) for _ in range(2)]
+        futures.insert(1, writer.submit(fail))
+        futures.append(writer.submit(repo.check_in_member, member_id))
+        assert futures[0].result()[0] == OK
+        with pytest.raises(ValueError):
+            futures[1].result()
+        assert [future.result()[0] for future in futures[2:]] == [OK, OK]
+    finally:
+        writer.close()
+    commits = [row["calls"] for row in sql_stats.snapshot()["statements"] if row["statement"] == "COMMIT"]
+
+    # Four jobs, one batch, and the failed job's insert rolled back alone
+    assert commits == [1]
+    assert repo.db.execute("SELECT COUNT(*), SUM(amount_paid) FROM transactions").fetchone() == (2, 20)
+    assert repo.attendance.find_open_session_today(member_id)
+
+
+def test_group_commit_reports_a_failed_begin(repo, member_id, monkeypatch):
+    @contextlib.contextmanager
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+        yield
+
+    writer = WriteQueue(repo.db, batch_ms=0)
+    try:
+        with monkeypatch.context() as patched:
+            patched.setattr(repo.db, "transaction", locked)
+            future = writer.submit(repo.check_in_member, member_id)
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                future.result(timeout=5)
+        # The writer carries on once the lock is gone
+        assert writer.submit(repo.check_in_member, member_id).result(timeout=5)[0] == OK
+    finally:
+        writer.close()
+
+
+def test_group_commit_service(db_path, repo):
+    member_ids = [repo.members.add((f"Member {i}", 30, "Female", "0123456789", "1 Main Road", "Monthly",
+                                    "2025-01-01", "2025-12-31")) for i in range(8)]
+    server = start_server(get_database(db_path), port=0, group_commit_ms=0)
+    try:
+        def desk(member_id):
+            client = ServiceClient(server.url)
+            assert client.check_in_member(member_id) == (OK, f"Member {member_ids.index(member_id)}")
+            client.close()
+
+        threads = [threading.Thread(target=desk, args=(member_id,)) for member_id in member_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        stop_server(server)
+    assert repo.attendance.count_active_today() == 8
+
+
+def test_receipts(client, member_id):
+    status, name, receipt = client.record_payment_with_receipt(member_id, 30.0, payment_method="Cash")
+    assert (status, name, receipt.amount, receipt.member_id) == (OK, "Jane Doe", 30.0, member_id)
+    sha256 = client.receipts.store_pdf(receipt.number, b"%PDF test")
+    assert client.receipts.find(number=receipt.label)[0].pdf_sha256 == sha256
+    assert client.receipts.pdf(receipt.number) == b"%PDF test"
+    extra = client.receipts.issue(member_id, 5.0)
+    assert [r.number for r in client.receipts.find(member_id=member_id)] == [extra.number, receipt.number]
+    assert [r.number for r in client.receipts.find(transaction_id=receipt.transaction_id)] == [receipt.number]
+
+
+def test_member_detail(client, member_id):
+    for _ in range(3):
+        client.toggle_member(member_id)
+    client.record_payment(member_id, 30.0, payment_method="Cash")
+    summary = client.member_summary(member_id)
+    assert (summary.name, summary.visits, summary.payments, summary.total_paid) == ("Jane Doe", 2, 1, 30.0)
+    assert client.member_summary(999) is None
+
+    first = client.member_visits(member_id, limit=1)
+    second = client.member_visits(member_id, before=(first[0][1], first[0][0]), limit=1)
+    assert first[0][3] == "Active" and second[0][0] < first[0][0]
+    assert client.member_visits(member_id, before=(second[0][1], second[0][0])) == []
+    assert client.member_payments(member_id)[0][2:] == (30.0, "Monthly", "Cash")
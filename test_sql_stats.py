@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+
+import pytest
+
+import sql_stats
+from db import get_database
+
+
+@pytest.fixture(autouse=True)
+def stats():
+    sql_stats.reset()
+    yield sql_stats.STATS
+    sql_stats.reset()
+
+
+def statement(snapshot, prefix):
+    return next(row for row in snapshot["statements"] if row["statement"].startswith(prefix))
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    assert sql_stats.fingerprint("SELECT *\n  FROM members WHERE id = 42 AND name = 'O''Neil'") == (
+        "SELECT * FROM members WHERE id = ? AND name = ?"
+    )
+    assert sql_stats.fingerprint("SELECT id FROM members WHERE id IN (?, ?, ?)") == (
+        sql_stats.fingerprint("SELECT id FROM members WHERE id IN (1,2)")
+    )
+    # Digits inside identifiers are kept
+    assert sql_stats.fingerprint("SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+
+
+def test_statements_are_timed_with_rows(repo, member_id):
+    for _ in range(3):
+        repo.db.execute("SELECT name, phone, membership_type FROM members WHERE id=?", (member_id,)).fetchone()
+    list(repo.db.execute("SELECT id FROM members"))
+    snapshot = repo.diagnostics()
+
+    profile = statement(snapshot, "SELECT name, phone, membership_type FROM members")
+    assert profile["calls"] == 3
+    assert profile["rows"] == 3
+    assert sum(profile["histogram"]) == 3
+    assert 0 < profile["p50_ms"] <= profile["p99_ms"]
+    assert statement(snapshot, "SELECT id FROM members")["rows"] == 1
+    # Writes count the rows they changed
+    assert statement(snapshot, "INSERT INTO members")["rows"] == 1
+    json.dumps(snapshot)
+
+
+def test_errors_are_counted(repo):
+    with pytest.raises(Exception):
+        repo.db.execute("SELECT nope FROM members")
+    assert statement(repo.diagnostics(), "SELECT nope")["errors"] == 1
+
+
+def test_slow_queries_are_logged_with_their_plan(repo, member_id, stats, monkeypatch, caplog):
+    monkeypatch.setattr(stats, "slow_ms", 0)
+    repo.members.get_profile(member_id)
+    slow = [entry for entry in repo.diagnostics()["slow_queries"] if entry["statement"].startswith("SELECT name")]
+    assert slow
+    assert any("members" in step for step in slow[0]["plan"])
+    assert "slow query" in caplog.text
+
+
+def test_lock_waits(db_path, stats):
+    db = get_database(db_path)
+    db.execute("CREATE TABLE t (x)")
+    holder = db.open_connection()
+    holder.execute("BEGIN IMMEDIATE")
+    timer = threading.Timer(0.05, lambda: holder.execute("COMMIT"))
+    timer.start()
+    start = time.perf_counter()
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+    waited_ms = (time.perf_counter() - start) * 1000
+    timer.join()
+
+    waits = sql_stats.snapshot()["lock_waits"]
+    assert waits["count"] >= 1
+    assert 20 <= waits["max_ms"] <= waited_ms + 1
+
+
+def test_dump_and_reset(repo, member_id, tmp_path):
+    path = sql_stats.dump(str(tmp_path / "stats.json"))
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["statements"]
+    repo.reset_diagnostics()
+    assert repo.diagnostics()["statements"] == []
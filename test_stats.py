@@ -0,0 +1,85 @@
+import sqlite3
+
+import stats
+from db import connect_db
+
+
+def test_counters_follow_writes(repo, member_id):
+    other = repo.members.add(("John", 40, "Male", "1", "x", "Yearly", "2025-01-01", "2025-12-31"))
+    first = repo.attendance.check_in(member_id)
+    repo.attendance.check_in(other)
+    repo.attendance.check_out(first)
+    repo.transactions.add(member_id, 25.0)
+    repo.members.delete(other)
+
+    assert repo.dashboard_stats() == (1, 1, 25.0, 25.0)
+
+
+def test_revenue_buckets_by_day_and_month(repo, member_id):
+    with repo.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO transactions (member_id, amount_paid, date) VALUES (?, ?, ?)",
+            [(member_id, 10, "2025-03-01"), (member_id, 5, "2025-03-02"), (member_id, 7, "2025-04-01")]
+        )
+        conn.execute("UPDATE transactions SET amount_paid = 20 WHERE date = '2025-03-01'")
+        conn.execute("DELETE FROM transactions WHERE date = '2025-03-02'")
+    assert dict(repo.db.execute("SELECT month, amount FROM revenue_monthly")) == {"2025-03": 20, "2025-04": 7}
+    assert dict(repo.db.execute("SELECT day, amount FROM revenue_daily WHERE amount != 0")) == {
+        "2025-03-01": 20, "2025-04-01": 7
+    }
+
+
+def test_payments_without_a_date_stay_reconciled(repo, member_id):
+    with repo.db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO transactions (member_id, amount_paid, date) VALUES (?, ?, NULL)",
+            [(member_id, 10), (member_id, 5), (member_id, 3)]
+        )
+        conn.execute("UPDATE transactions SET amount_paid = 4 WHERE amount_paid = 3")
+        conn.execute("DELETE FROM transactions WHERE amount_paid = 5")
+        assert stats.reconcile(conn, fix=False) == []
+    assert repo.db.execute("SELECT day, amount FROM revenue_daily").fetchall() == [("", 14)]
+    assert repo.db.execute("SELECT month, amount FROM revenue_monthly").fetchall() == [("", 14)]
+
+    with repo.db.transaction() as conn:
+        stats.rebuild(conn)
+        conn.execute("DELETE FROM transactions WHERE amount_paid = 10")
+        assert stats.reconcile(conn, fix=False) == []
+
+
+def test_reconcile_reports_and_fixes_drift(repo, member_id):
+    repo.transactions.add(member_id, 12.5)
+    with repo.db.transaction() as conn:
+        assert stats.reconcile(conn) == []
+        conn.execute("UPDATE stats_counters SET value = 99 WHERE name = 'members_total'")
+        conn.execute("DELETE FROM revenue_monthly")
+
+    with repo.db.transaction() as conn:
+        drift = stats.reconcile(conn, fix=True)
+    assert ("counter", "members_total", 99, 1) in drift
+    assert any(kind == "revenue_monthly" for kind, *_ in drift)
+
+    with repo.db.transaction() as conn:
+        assert stats.reconcile(conn) == []
+    assert repo.dashboard_stats().total_members == 1
+
+
+def test_counters_seeded_for_existing_database(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE members (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, age INTEGER, gender TEXT,
+            phone TEXT, address TEXT, membership_type TEXT, start_date TEXT, end_date TEXT);
+        INSERT INTO members (name) VALUES ('a'), ('b');
+    """)
+    conn.close()
+
+    connect_db(path)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT value FROM stats_counters WHERE name = 'members_total'").fetchone()[0] == 2
+    conn.close()
+
+
+def test_cli_dry_run(db_path, capsys):
+    assert stats.main(["reconcile", "--db", db_path, "--dry-run"]) == 0
+    assert "consistent" in capsys.readouterr().out
@@ -0,0 +1,140 @@
+import pytest
+
+import sync
+from db import close_databases, get_database
+from repository import GymRepository
+
+BRANCHES = ("north", "south", "east")
+
+
+@pytest.fixture
+def branches(tmp_path):
+    repos = {}
+    for name in BRANCHES:
+        db = get_database(str(tmp_path / f"{name}.db"))
+        sync.set_branch(name, db)
+        repos[name] = GymRepository(db)
+    yield repos
+    close_databases()
+
+
+def send(branches, source, target, tmp_path):
+    """Export what target has not acknowledged from source and import it there"""
+    path = str(tmp_path / f"{source}-to-{target}.delta")
+    sync.export_delta(path, branches[source].db, to=target)
+    return sync.import_delta(path, branches[target].db)
+
+
+def member_id(repo, name):
+    row = repo.db.execute("SELECT id FROM members WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def visits(repo, name):
+    return repo.db.execute("""
+        SELECT a.checkin_time, a.checkout_time, a.auto_closed FROM attendance a JOIN members m ON m.id = a.member_id
+        WHERE m.name = ? ORDER BY a.checkin_time
+    """, (name,)).fetchall()
+
+
+def add(repo, name):
+    return repo.members.add((name, 30, "Female", "0", "x", "Monthly", "2025-01-01", "2025-12-31"))
+
+
+def test_members_visits_and_payments_reach_every_branch(branches, tmp_path):
+    north, south, east = branches["north"], branches["south"], branches["east"]
+    add(south, "Sam")
+    jane = add(north, "Jane")
+    assert send(branches, "north", "south", tmp_path)[sync.APPLIED] == 1
+
+    # Jane trains and pays at south, where she has south's id
+    jane_south = member_id(south, "Jane")
+    assert jane_south != jane
+    south.check_in_member(jane_south)
+    south.check_out_member(jane_south)
+    south.record_payment(jane_south, 30.0, payment_method="Cash")
+    assert send(branches, "south", "north", tmp_path)[sync.APPLIED] == 3
+
+    assert north.member_summary(jane)[9:14] == (1, visits(south, "Jane")[0][0], 0.0, 1, 30.0)
+    assert member_id(north, "Sam") is not None
+
+    # East hears from south first: the session and payment wait for Jane, then find her
+    send(branches, "south", "east", tmp_path)
+    assert sync.status(east.db)["pending_members"] == 2
+    send(branches, "north", "east", tmp_path)
+    assert sync.status(east.db)["pending_members"] == 0
+    assert visits(east, "Jane") == visits(south, "Jane")
+    assert east.member_summary(member_id(east, "Jane")).total_paid == 30.0
+
+
+def test_import_is_idempotent_and_incremental(branches, tmp_path):
+    north, south = branches["north"], branches["south"]
+    for name in ("A", "B", "C"):
+        add(north, name)
+    path = str(tmp_path / "north.delta")
+    assert sync.export_delta(path, north.db)["changes"] == 3
+
+    assert sync.import_delta(path, south.db) == {sync.APPLIED: 3, sync.SKIPPED: 0, sync.SUPERSEDED: 0}
+    assert sync.import_delta(path, south.db) == {sync.APPLIED: 0, sync.SKIPPED: 3, sync.SUPERSEDED: 0}
+    assert south.db.execute("SELECT COUNT(*) FROM members").fetchone()[0] == 3
+
+    # Once south's delta acknowledges them, north only sends what changed since
+    send(branches, "south", "north", tmp_path)
+    north.db.execute("UPDATE members SET phone = '555' WHERE name = 'B'")
+    header = sync.export_delta(path, north.db, to="south")
+    assert (header["since"], header["changes"]) == (3, 1)
+    sync.import_delta(path, south.db)
+    assert south.db.execute("SELECT phone FROM members WHERE name = 'B'").fetchone()[0] == "555"
+
+    # A delta that skips changes south has not seen is refused
+    north.db.execute("UPDATE members SET phone = '556' WHERE name = 'C'")
+    north.db.execute("UPDATE members SET phone = '557' WHERE name = 'A'")
+    sync.export_delta(path, north.db, since=5)
+    with pytest.raises(sync.SyncError):
+        sync.import_delta(path, south.db)
+    with pytest.raises(sync.SyncError):
+        sync.import_delta(path, north.db)
+
+
+def test_conflicts_resolve_the_same_on_every_branch(branches, tmp_path):
+    north, south, east = branches["north"], branches["south"], branches["east"]
+    jane = add(north, "Jane")
+    add(north, "Old Name")
+    for target in ("south", "east"):
+        send(branches, "north", target, tmp_path)
+
+    # Renamed at north and south at the same moment: the tie goes to the branch that sorts last
+    north.db.execute("UPDATE members SET phone = 'north' WHERE id = ?", (jane,))
+    south.db.execute("UPDATE members SET phone = 'south' WHERE name = 'Jane'")
+    # Deleted at south after north renamed it: the delete wins
+    north.db.execute("UPDATE members SET name = 'New Name' WHERE name = 'Old Name'")
+    south.db.execute("DELETE FROM members WHERE name = 'Old Name'")
+    for repo in (north, south):
+        repo.db.execute("UPDATE change_log SET changed_at = '2030-01-01 00:00:00.000' WHERE table_name = 'members'")
+        repo.db.execute("""
+            UPDATE change_log SET changed_at = '2030-01-01 00:00:01.000'
+            WHERE table_name = 'members' AND op = 'delete'
+        """)
+
+    send(branches, "north", "east", tmp_path)
+    send(branches, "south", "east", tmp_path)
+    send(branches, "south", "north", tmp_path)
+    send(branches, "north", "south", tmp_path)
+    for repo in (north, south, east):
+        assert repo.db.execute("SELECT name, phone FROM members").fetchall() == [("Jane", "south")]
+
+
+def test_checkout_beats_an_auto_closed_copy(branches, tmp_path):
+    north, south = branches["north"], branches["south"]
+    jane = add(north, "Jane")
+    north.check_in_member(jane)
+    send(branches, "north", "south", tmp_path)
+
+    # South's maintenance closes the session it never saw end, after north's desk checked Jane out
+    north.check_out_member(jane)
+    checkout = visits(north, "Jane")[0][1]
+    south.db.execute("UPDATE attendance SET checkout_time = '2099-01-01 00:00:00', auto_closed = 1")
+
+    send(branches, "south", "north", tmp_path)
+    assert send(branches, "north", "south", tmp_path)[sync.APPLIED] == 1
+    assert visits(north, "Jane") == visits(south, "Jane") == [(visits(north, "Jane")[0][0], checkout, 0)]
@@ -0,0 +1,74 @@
+import pytest
+
+from benchmarks import bench_startup
+import windows
+
+
+class FakeWindow:
+    created = 0
+
+    def __init__(self, parent):
+        FakeWindow.created += 1
+        self.parent = parent
+        self.exists = True
+        self.raised = 0
+        self.bindings = []
+
+    def winfo_exists(self):
+        return self.exists
+
+    def bind(self, sequence, func, add=None):
+        self.bindings.append(func)
+
+    def state(self):
+        return "normal"
+
+    def lift(self):
+        self.raised += 1
+
+    def focus_force(self):
+        pass
+
+
+class Event:
+    def __init__(self, widget):
+        self.widget = widget
+
+
+def test_open_window_is_raised_instead_of_rebuilt():
+    FakeWindow.created = 0
+    registry = windows.WindowRegistry("root", {"fake": ("test_windows", "FakeWindow")})
+
+    first = registry.open("fake")
+    assert registry.open("fake") is first
+    assert FakeWindow.created == 1 and first.raised == 1
+
+    # A child widget being destroyed does not forget the window
+    first.bindings[0](Event(object()))
+    assert registry.get("fake") is first
+    first.bindings[0](Event(first))
+    assert registry.get("fake") is None
+    second = registry.open("fake")
+    assert second is not first and FakeWindow.created == 2
+
+    second.exists = False
+    assert registry.open("fake") is not second
+
+
+def test_registry_names_real_windows():
+    pytest.importorskip("numpy")
+    pytest.importorskip("PIL")
+    registry = windows.WindowRegistry(None)
+    for key, (_, name) in windows.WINDOWS.items():
+        assert registry.window_class(key).__name__ == name
+
+
+def test_main_imports_no_heavy_modules():
+    assert bench_startup.measure_import()["loaded"] == []
+
+
+def test_budget():
+    results = {"import_ms": 40.0, "first_frame_ms": None, "loaded_at_startup": []}
+    assert bench_startup.over_budget(results) == []
+    results.update(import_ms=400.0, first_frame_ms=2500.0, loaded_at_startup=["reportlab"])
+    assert len(bench_startup.over_budget(results)) == 3
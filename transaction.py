@@ -1,10 +1,23 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
-import sqlite3
-from datetime import datetime
-from receipt_generator import generate_receipt_pdf
+from tkinter import filedialog, messagebox, ttk
+from background import run_in_background
+from export import export
+from live_table import ROW_LIMIT, LiveTable
+from repository import NOT_FOUND, OK, PAYMENT_METHODS, SERVICE_URL, get_repository
 from styles import ModernStyles
 
+# How many of a member's latest receipts a reprint looks through for the amount
+REPRINT_SEARCH = 50
+
+
+class ReceiptFailed(Exception):
+    """The payment was recorded but its receipt could not be rendered or stored"""
+
+    def __init__(self, name, receipt, error):
+        super().__init__(f"receipt {receipt.label} failed: {error}")
+        self.name = name
+        self.receipt = receipt
+
 class TransactionWindow(tk.Toplevel):
     def __init__(self, parent):
         super().__init__(parent)
@@ -94,9 +107,28 @@ class TransactionWindow(tk.Toplevel):
         )
         payment_combo.grid(row=2, column=1, padx=10, pady=10, sticky="w")
         
+        # Payment method
+        tk.Label(
+            input_frame,
+            text="Payment Method:",
+            font=('Segoe UI', 12),
+            bg=ModernStyles.COLORS['surface'],
+            fg=ModernStyles.COLORS['text_primary']
+        ).grid(row=3, column=0, padx=10, pady=10, sticky="e")
+        
+        self.payment_method = tk.StringVar(value=PAYMENT_METHODS[0])
+        method_combo = ttk.Combobox(
+            input_frame,
+            textvariable=self.payment_method,
+            values=PAYMENT_METHODS,
+            state="readonly",
+            font=('Segoe UI', 12)
+        )
+        method_combo.grid(row=3, column=1, padx=10, pady=10, sticky="w")
+        
         # Buttons
         button_frame = tk.Frame(input_frame, bg=ModernStyles.COLORS['surface'])
-        button_frame.grid(row=3, column=0, columnspan=2, pady=20)
+        button_frame.grid(row=4, column=0, columnspan=2, pady=20)
         
         add_payment_btn = tk.Button(
             button_frame,
@@ -130,6 +162,24 @@ class TransactionWindow(tk.Toplevel):
         )
         generate_receipt_btn.pack(side="left", padx=5)
         
+        export_btn = tk.Button(
+            button_frame,
+            text="📤 Export",
+            command=self.export_transactions,
+            # Exports read the database file, which a thin client of the service does not have
+            state="disabled" if SERVICE_URL else "normal",
+            font=('Segoe UI', 12, 'bold'),
+            bg=ModernStyles.COLORS['primary'],
+            fg=ModernStyles.COLORS['surface'],
+            activebackground=ModernStyles.COLORS['primary'],
+            activeforeground=ModernStyles.COLORS['surface'],
+            bd=0,
+            padx=20,
+            pady=10,
+            cursor="hand2"
+        )
+        export_btn.pack(side="left", padx=5)
+        
         # Transactions table
         table_frame = tk.Frame(self, bg=ModernStyles.COLORS['surface'])
         table_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -139,7 +189,7 @@ class TransactionWindow(tk.Toplevel):
         scrollbar.pack(side="right", fill="y")
         
         # Create treeview
-        cols = ("ID", "Member ID", "Member Name", "Amount", "Date", "Payment Type")
+        cols = ("ID", "Member ID", "Member Name", "Amount", "Date", "Payment Type", "Method")
         self.tree = ttk.Treeview(
             table_frame,
             columns=cols,
@@ -156,7 +206,8 @@ class TransactionWindow(tk.Toplevel):
             "Member Name": 150,
             "Amount": 100,
             "Date": 100,
-            "Payment Type": 100
+            "Payment Type": 100,
+            "Method": 100
         }
         
         for col in cols:
@@ -171,6 +222,7 @@ class TransactionWindow(tk.Toplevel):
         member_id = self.member_id_entry.get()
         amount = self.amount_entry.get()
         payment_type = self.payment_type.get()
+        payment_method = self.payment_method.get()
         
         if not member_id or not amount:
             messagebox.showerror("Error", "Please fill all fields")
@@ -185,42 +237,45 @@ class TransactionWindow(tk.Toplevel):
             messagebox.showerror("Error", "Please enter a valid amount")
             return
         
-        try:
-            # Check if member exists
-            conn = sqlite3.connect("gym.db")
-            cur = conn.cursor()
-            
-            cur.execute("SELECT name FROM members WHERE id=?", (member_id,))
-            member = cur.fetchone()
-            
-            if not member:
-                messagebox.showerror("Error", "Member not found")
-                conn.close()
-                return
-            
-            # Add transaction
-            cur.execute(
-                "INSERT INTO transactions (member_id, amount_paid, date) VALUES (?, ?, ?)",
-                (member_id, amount, datetime.now().strftime("%Y-%m-%d"))
-            )
-            conn.commit()
-            conn.close()
-            
-            # Generate receipt
-            generate_receipt_pdf(member_id, amount)
-            
-            messagebox.showinfo("Success", f"Payment recorded for {member[0]}")
-            self.load_transactions()
-            
-            # Clear fields
-            self.member_id_entry.delete(0, tk.END)
-            self.amount_entry.delete(0, tk.END)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add payment: {str(e)}")
+        run_in_background(
+            self, record_payment_with_receipt, member_id, amount, payment_type, payment_method,
+            on_success=self.on_payment_recorded,
+            on_error=self.on_payment_failed
+        )
+    
+    def on_payment_recorded(self, result):
+        """Report the payment outcome (runs on the UI thread)"""
+        status, name, receipt = result
+        if status == NOT_FOUND:
+            messagebox.showerror("Error", "Member not found")
+            return
+        
+        messagebox.showinfo("Success", f"Payment recorded for {name}\nReceipt {receipt.label}")
+        self.clear_payment()
+    
+    def on_payment_failed(self, error):
+        """Report a failed payment, or a recorded payment whose receipt failed (runs on the UI thread)"""
+        if not isinstance(error, ReceiptFailed):
+            messagebox.showerror("Error", f"Failed to add payment: {str(error)}")
+            return
+        
+        # The payment is in the ledger: entering it again would charge the member twice
+        messagebox.showwarning(
+            "Receipt Failed",
+            f"Payment recorded for {error.name}, but receipt {error.receipt.label} could not be generated:\n"
+            f"{error.__cause__}\n\nUse Generate Receipt to print it; do not enter the payment again."
+        )
+        self.clear_payment()
+    
+    def clear_payment(self):
+        self.live.refresh()
+        
+        # Clear fields
+        self.member_id_entry.delete(0, tk.END)
+        self.amount_entry.delete(0, tk.END)
     
     def generate_receipt_for_member(self):
-        """Generate receipt for entered member"""
+        """Save the member's stored receipt for the amount, issuing one if there is none"""
         member_id = self.member_id_entry.get()
         amount = self.amount_entry.get()
         
@@ -230,34 +285,95 @@ class TransactionWindow(tk.Toplevel):
         
         try:
             amount = float(amount)
-            generate_receipt_pdf(member_id, amount)
-            messagebox.showinfo("Success", "Receipt generated successfully")
-            
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid amount")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title="Save Receipt",
+            defaultextension=".pdf",
+            filetypes=[("PDF", "*.pdf")]
+        )
+        if not path:
+            return
+        
+        run_in_background(
+            self, reprint_receipt, member_id, amount, self.payment_method.get(), path,
+            on_success=lambda receipt: messagebox.showinfo("Success", f"Receipt {receipt.label} saved"),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to generate receipt: {str(e)}")
+        )
+    
+    def export_transactions(self):
+        """Stream the whole ledger to a CSV, JSON Lines or Excel file"""
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title="Export Transactions",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Compressed CSV", "*.csv.gz"), ("JSON Lines", "*.jsonl"), ("Excel", "*.xlsx")]
+        )
+        if not path:
+            return
+        
+        run_in_background(
+            self, export, "transactions", path,
+            on_success=lambda result: messagebox.showinfo(
+                "Export Complete", f"Exported {result.rows} rows to {result.path}", parent=self
+            ),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to export transactions: {str(e)}")
+        )
     
     def load_transactions(self):
-        """Load transaction history"""
+        """Load the latest payments, then follow new ones"""
+        repo = get_repository()
+        # Payments never change once recorded, so only rows above the high-water mark are fetched
+        self.live = LiveTable(
+            self, self.tree,
+            load=lambda: repo.transactions.recent(ROW_LIMIT),
+            changes=lambda after, pending: repo.transactions.since(after, ROW_LIMIT),
+            version=repo.data_version,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load transactions: {str(e)}")
+        )
+        self.live.reload()
+        self.live.start_polling()
+    
+    def destroy(self):
+        self.live.stop_polling()
+        super().destroy()
+
+
+# These run on a worker thread, so reportlab is first imported off the UI thread
+
+def reprint_receipt(member_id, amount, payment_method, path):
+    """Save the member's latest receipt for amount to path, issuing a new one if there is none"""
+    from receipt_generator import issue_receipt, save_receipt, store_receipt
+    repo = get_repository()
+    receipt = next(
+        (receipt for receipt in repo.receipts.find(member_id=member_id, limit=REPRINT_SEARCH)
+         if receipt.amount == amount),
+        None
+    )
+    if receipt is None:
+        receipt = issue_receipt(member_id, amount, payment_method, repo)
+    elif not receipt.pdf_sha256:
+        # Its payment was recorded but rendering failed (ReceiptFailed); render it under the same number
+        receipt = store_receipt(receipt, repo)
+    save_receipt(receipt.number, path, repo)
+    return receipt
+
+
+def record_payment_with_receipt(member_id, amount, payment_type=None, payment_method=None):
+    """Record the payment with its receipt number, then render and store the receipt.
+
+    The payment is committed before rendering starts; if rendering or storing
+    fails, raises ReceiptFailed so the desk does not take the payment again.
+    """
+    from receipt_generator import store_receipt
+    repo = get_repository()
+    status, name, receipt = repo.record_payment_with_receipt(member_id, amount, payment_type, payment_method)
+    if status == OK:
         try:
-            conn = sqlite3.connect("gym.db")
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT t.id, t.member_id, m.name, t.amount_paid, t.date
-                FROM transactions t
-                JOIN members m ON t.member_id = m.id
-                ORDER BY t.date DESC, t.id DESC
-                LIMIT 100
-            """)
-            rows = cur.fetchall()
-            conn.close()
-            
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Add new items
-            for row in rows:
-                self.tree.insert("", "end", values=row)
-                
+            receipt = store_receipt(receipt, repo)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load transactions: {str(e)}")
+            raise ReceiptFailed(name, receipt, e) from e
+    return status, name, receipt
@@ -1,8 +1,113 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
+from collections import deque
+from background import run_in_background
+from member_detail import MemberDetailWindow
+from repository import get_repository
 from styles import ModernStyles
 
+# Directory paging: rows fetched per page and the most rows kept in the Treeview
+PAGE_SIZE = 200
+MAX_RESIDENT_ROWS = 1000
+# Fraction of the scroll range from either end at which the next page is fetched
+SCROLL_THRESHOLD = 0.1
+# Pause after the last keystroke before the search query runs
+SEARCH_DELAY_MS = 250
+
+
+class MemberPager:
+    """Sliding window of directory rows fetched by keyset pagination on id.
+
+    Rows are ordered newest first. ``next_page`` extends the window downwards
+    and ``previous_page`` upwards; whenever the window grows beyond max_rows
+    the rows at the opposite end are trimmed, so memory stays bounded no
+    matter how far the user scrolls.
+
+    Each step is split into a ``fetch_*`` query, which is safe to run on a
+    worker thread, and an ``apply_*`` update of the window state, which the
+    UI thread performs when the rows arrive.
+    """
+
+    def __init__(self, members, page_size=PAGE_SIZE, max_rows=MAX_RESIDENT_ROWS):
+        self.members = members
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.filters = {}
+        self.ids = deque()
+        self.has_older = True
+        self.has_newer = False
+
+    def fetch_first(self, **filters):
+        return self.members.page(limit=self.page_size, **filters)
+
+    def apply_first(self, rows, **filters):
+        """Start again from the newest matching member"""
+        self.filters = filters
+        self.ids.clear()
+        self.has_newer = False
+        self.has_older = True
+        self.apply_next(rows)
+        return rows
+
+    def reset(self, **filters):
+        """Start again from the newest matching member and return the first page"""
+        return self.apply_first(self.fetch_first(**filters), **filters)
+
+    def fetch_next(self):
+        if not self.has_older:
+            return []
+        before_id = self.ids[-1] if self.ids else None
+        return self.members.page(before_id=before_id, limit=self.page_size, **self.filters)
+
+    def apply_next(self, rows):
+        """Append older rows; returns the number of rows trimmed from the top"""
+        self.has_older = len(rows) == self.page_size
+        self.ids.extend(row[0] for row in rows)
+        trimmed = max(0, len(self.ids) - self.max_rows)
+        for _ in range(trimmed):
+            self.ids.popleft()
+        if trimmed:
+            self.has_newer = True
+        return trimmed
+
+    def next_page(self):
+        """Fetch older rows; returns (rows to append, number of rows trimmed from the top)"""
+        rows = self.fetch_next()
+        if not rows and not self.has_older:
+            return [], 0
+        return rows, self.apply_next(rows)
+
+    def fetch_previous(self):
+        if not self.has_newer or not self.ids:
+            return []
+        return self.members.page(after_id=self.ids[0], limit=self.page_size, **self.filters)
+
+    def apply_previous(self, rows):
+        """Prepend newer rows; returns the number of rows trimmed from the bottom"""
+        self.has_newer = len(rows) == self.page_size
+        self.ids.extendleft(row[0] for row in reversed(rows))
+        trimmed = max(0, len(self.ids) - self.max_rows)
+        for _ in range(trimmed):
+            self.ids.pop()
+        if trimmed:
+            self.has_older = True
+        return trimmed
+
+    def previous_page(self):
+        """Fetch newer rows; returns (rows to prepend, number of rows trimmed from the bottom)"""
+        if not self.has_newer or not self.ids:
+            return [], 0
+        rows = self.fetch_previous()
+        return rows, self.apply_previous(rows)
+
+    def discard(self, member_id):
+        """Forget a row removed from the view (e.g. after a delete)"""
+        try:
+            self.ids.remove(member_id)
+        except ValueError:
+            pass
+
+
 class ViewMemberWindow(tk.Toplevel):
     def __init__(self, parent):
         super().__init__(parent)
@@ -13,6 +118,8 @@ class ViewMemberWindow(tk.Toplevel):
         # Configure modern styles
         ModernStyles.configure_styles()
         
+        self._search_job = None
+        self._generation = 0
         self.create_widgets()
         self.load_members()
     
@@ -46,7 +153,7 @@ class ViewMemberWindow(tk.Toplevel):
         search_label.pack(side="left", padx=10)
         
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', self.filter_members)
+        self.search_var.trace('w', self.schedule_search)
         search_entry = tk.Entry(
             search_frame,
             textvariable=self.search_var,
@@ -113,9 +220,12 @@ class ViewMemberWindow(tk.Toplevel):
             columns=cols,
             show="headings",
             height=15,
-            yscrollcommand=scrollbar.set,
+            yscrollcommand=self.on_tree_scroll,
             style='Modern.Treeview'
         )
+        self.scrollbar = scrollbar
+        self.pager = MemberPager(get_repository().members)
+        self._loading = False
         
         # Configure columns
         column_widths = {
@@ -134,6 +244,7 @@ class ViewMemberWindow(tk.Toplevel):
             self.tree.column(col, width=column_widths.get(col, 100), anchor="center")
         
         self.tree.pack(side="left", fill="both", expand=True)
+        self.tree.bind("<Double-1>", lambda e: self.show_details())
         scrollbar.config(command=self.tree.yview)
         
         # Action buttons
@@ -156,6 +267,30 @@ class ViewMemberWindow(tk.Toplevel):
         )
         refresh_btn.pack(side="left", padx=5)
         
+        self.count_label = tk.Label(
+            button_frame,
+            text="",
+            font=('Segoe UI', 11),
+            bg=ModernStyles.COLORS['background'],
+            fg=ModernStyles.COLORS['text_secondary']
+        )
+        self.count_label.pack(side="left", padx=15)
+        
+        details_btn = tk.Button(
+            button_frame,
+            text="👤 Details",
+            command=self.show_details,
+            font=('Segoe UI', 12, 'bold'),
+            bg=ModernStyles.COLORS['primary'],
+            fg=ModernStyles.COLORS['surface'],
+            activebackground=ModernStyles.COLORS['accent'],
+            activeforeground=ModernStyles.COLORS['surface'],
+            bd=0,
+            padx=20,
+            pady=10,
+            cursor="hand2"
+        )
+        
         delete_btn = tk.Button(
             button_frame,
             text="🗑️ Delete",
@@ -171,58 +306,132 @@ class ViewMemberWindow(tk.Toplevel):
             cursor="hand2"
         )
         delete_btn.pack(side="right", padx=5)
+        details_btn.pack(side="right", padx=5)
     
     def load_members(self):
-        """Load members from database"""
-        try:
-            conn = sqlite3.connect("gym.db")
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT id, name, age, gender, phone, membership_type, start_date, end_date 
-                FROM members 
-                ORDER BY id DESC
-            """)
-            rows = cur.fetchall()
-            conn.close()
-            
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Add new items
-            for row in rows:
-                self.tree.insert("", "end", values=row)
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load members: {str(e)}")
+        """Load the first page of members from database"""
+        membership_type = self.filter_var.get()
+        filters = {
+            "membership_type": None if membership_type == "All" else membership_type,
+            "search": self.search_var.get().strip() or None,
+        }
+        # Results of older loads (e.g. a previous search term) are ignored
+        self._generation += 1
+        generation = self._generation
+        self._loading = True
+        run_in_background(
+            self, self.fetch_directory, filters,
+            on_success=lambda result: self.show_members(generation, filters, *result),
+            on_error=self.on_load_error
+        )
+    
+    def fetch_directory(self, filters):
+        """First page plus the total count (runs on a worker thread)"""
+        rows = self.pager.fetch_first(**filters)
+        total = None if filters["search"] else get_repository().members.count(filters["membership_type"])
+        return rows, total
+    
+    def show_members(self, generation, filters, rows, total):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self.pager.apply_first(rows, **filters)
+        
+        # Clear existing items
+        self.tree.delete(*self.tree.get_children())
+        
+        # Add new items
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row[0]), values=row)
+        
+        self.tree.yview_moveto(0)
+        if total is None:
+            more = "+" if self.pager.has_older else ""
+            self.count_label.config(text=f"{len(rows)}{more} matching members")
+        else:
+            self.count_label.config(text=f"{total} members")
+    
+    def on_load_error(self, e):
+        self._loading = False
+        messagebox.showerror("Error", f"Failed to load members: {str(e)}")
+    
+    def on_tree_scroll(self, first, last):
+        """Update the scrollbar and fetch another page near either end"""
+        self.scrollbar.set(first, last)
+        if self._loading:
+            return
+        generation = self._generation
+        if float(last) > 1 - SCROLL_THRESHOLD and self.pager.has_older:
+            self._loading = True
+            run_in_background(
+                self, self.pager.fetch_next,
+                on_success=lambda rows: self.show_next_page(generation, rows),
+                on_error=self.on_load_error
+            )
+        elif float(first) < SCROLL_THRESHOLD and self.pager.has_newer:
+            self._loading = True
+            run_in_background(
+                self, self.pager.fetch_previous,
+                on_success=lambda rows: self.show_previous_page(generation, rows),
+                on_error=self.on_load_error
+            )
+    
+    def show_next_page(self, generation, rows):
+        """Append older members, trimming rows from the top"""
+        if generation != self._generation:
+            return
+        self._loading = False
+        top = self._top_index()
+        trimmed = self.pager.apply_next(rows)
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row[0]), values=row)
+        if trimmed:
+            self.tree.delete(*self.tree.get_children()[:trimmed])
+            self._scroll_to_index(top - trimmed)
+    
+    def show_previous_page(self, generation, rows):
+        """Prepend newer members, trimming rows from the bottom"""
+        if generation != self._generation:
+            return
+        self._loading = False
+        top = self._top_index()
+        trimmed = self.pager.apply_previous(rows)
+        for index, row in enumerate(rows):
+            self.tree.insert("", index, iid=str(row[0]), values=row)
+        if trimmed:
+            self.tree.delete(*self.tree.get_children()[-trimmed:])
+        if rows:
+            self._scroll_to_index(top + len(rows))
+    
+    def _top_index(self):
+        """Index of the first visible row"""
+        first, _ = self.tree.yview()
+        return int(round(first * len(self.tree.get_children())))
+    
+    def _scroll_to_index(self, index):
+        """Keep the same rows visible after rows were added or trimmed above them"""
+        count = len(self.tree.get_children())
+        if count:
+            self.tree.yview_moveto(max(0, index) / count)
+    
+    def schedule_search(self, *args):
+        """Debounce keystrokes so only the final search term hits the database"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self.filter_members)
     
     def filter_members(self, *args):
         """Filter members based on search and membership type"""
-        search_term = self.search_var.get().lower()
-        membership_filter = self.filter_var.get()
-        
-        # Get all items
-        items = self.tree.get_children()
-        
-        for item in items:
-            values = self.tree.item(item)['values']
-            name = str(values[1]).lower()
-            membership_type = str(values[5])
-            
-            # Apply filters
-            show_item = True
-            
-            if search_term and search_term not in name:
-                show_item = False
-            
-            if membership_filter != "All" and membership_type != membership_filter:
-                show_item = False
-            
-            if show_item:
-                self.tree.item(item, tags=())
-                self.tree.item(item, values=values)
-            else:
-                self.tree.detach(item)
+        self._search_job = None
+        self.load_members()
+    
+    def show_details(self):
+        """Open the detail panel of the selected member"""
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showwarning("Warning", "Please select a member")
+            return
+        MemberDetailWindow(self, self.tree.item(selected[0])['values'][0])
     
     def delete_member(self):
         """Delete selected member"""
@@ -232,16 +441,15 @@ class ViewMemberWindow(tk.Toplevel):
             return
         
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this member?"):
-            try:
-                member_id = self.tree.item(selected[0])['values'][0]
-                conn = sqlite3.connect("gym.db")
-                cur = conn.cursor()
-                cur.execute("DELETE FROM members WHERE id=?", (member_id,))
-                conn.commit()
-                conn.close()
-                
-                self.tree.delete(selected[0])
-                messagebox.showinfo("Success", "Member deleted successfully")
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete member: {str(e)}")
+            member_id = self.tree.item(selected[0])['values'][0]
+            run_in_background(
+                self, get_repository().members.delete, member_id,
+                on_success=lambda _: self.on_member_deleted(member_id),
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to delete member: {str(e)}")
+            )
+    
+    def on_member_deleted(self, member_id):
+        if self.tree.exists(str(member_id)):
+            self.tree.delete(str(member_id))
+        self.pager.discard(member_id)
+        messagebox.showinfo("Success", "Member deleted successfully")
@@ -0,0 +1,65 @@
+"""Sidebar windows, imported on first use and reused while they are open.
+
+``main.py`` only names the windows. A window's module (and whatever it
+pulls in: NumPy for analytics, Pillow for About, reportlab once a receipt is
+rendered) is imported the first time its button is clicked, so the main
+window draws without them. Clicking the button of a window that is already
+open raises it instead of building a second copy.
+"""
+import importlib
+
+# Sidebar key -> (module, window class)
+WINDOWS = {
+    "add_member": ("add_member", "AddMemberWindow"),
+    "view_member": ("view_member", "ViewMemberWindow"),
+    "attendance": ("attendance", "AttendanceWindow"),
+    "kiosk": ("kiosk", "KioskWindow"),
+    "transaction": ("transaction", "TransactionWindow"),
+    "analytics": ("analytics", "AnalyticsWindow"),
+    "diagnostics": ("diagnostics", "DiagnosticsWindow"),
+    "about": ("about", "AboutWindow"),
+}
+
+
+class WindowRegistry:
+    """At most one open window per key, created on demand"""
+
+    def __init__(self, parent, windows=None):
+        self.parent = parent
+        self.windows = WINDOWS if windows is None else windows
+        self.open_windows = {}
+
+    def window_class(self, key):
+        module, name = self.windows[key]
+        return getattr(importlib.import_module(module), name)
+
+    def get(self, key):
+        """The open window for key, or None"""
+        window = self.open_windows.get(key)
+        if window is not None and not window.winfo_exists():
+            del self.open_windows[key]
+            window = None
+        return window
+
+    def open(self, key):
+        """Raise the open window for key, or import and build it"""
+        window = self.get(key)
+        if window is not None:
+            self.raise_window(window)
+            return window
+        window = self.window_class(key)(self.parent)
+        self.open_windows[key] = window
+        window.bind("<Destroy>", lambda e: self._on_destroy(key, window, e), add="+")
+        return window
+
+    @staticmethod
+    def raise_window(window):
+        if window.state() == "iconic":
+            window.deiconify()
+        window.lift()
+        window.focus_force()
+
+    def _on_destroy(self, key, window, event):
+        # Child widgets report <Destroy> through the toplevel's bindings too
+        if event.widget is window and self.open_windows.get(key) is window:
+            del self.open_windows[key]